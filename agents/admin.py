@@ -0,0 +1,19 @@
+import hmac
+import os
+
+# ========================
+# 🔐 ADMIN ROUTES
+# ========================
+# Routes that change what the server runs (POST /models/reload) need
+# Authorization: Bearer $ELDERLY_CARE_ADMIN_TOKEN. With no token configured
+# they only answer clients on the same host; behind a reverse proxy every
+# client looks local, so set a token there.
+ADMIN_TOKEN = os.environ.get("ELDERLY_CARE_ADMIN_TOKEN")
+LOCAL_HOSTS = {'127.0.0.1', '::1', 'localhost'}
+
+
+def allowed(authorization, client_host):
+    if ADMIN_TOKEN:
+        scheme, _, token = (authorization or '').partition(' ')
+        return scheme.lower() == 'bearer' and hmac.compare_digest(token.strip().encode(), ADMIN_TOKEN.encode())
+    return client_host in LOCAL_HOSTS
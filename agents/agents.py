@@ -1,22 +1,18 @@
-from flask import Flask, jsonify, request
-import psycopg2
-import joblib
-import pandas as pd
+from flask import Flask, Response, jsonify, request
+import math
+import os
+import signal
+import sys
 from datetime import datetime
 
-app = Flask(__name__)
+from agents import (admin, alerts, cache, db, detect, fleet, history, metrics, realtime, reminders, respond, scoring,
+                    summary)
+from agents.registry import registry
+from agents.records import health_record, reminder_record, safety_record
 
-# ========================
-# 🔌 DATABASE CONNECTION
-# ========================
-def get_db_connection():
-    return psycopg2.connect(
-        dbname="elderly_care",
-        user="postgres",
-        password="system",
-        host="localhost",
-        port="5432"
-    )
+app = Flask(__name__)
+metrics.instrument_flask(app)
+respond.init_flask(app)
 
 # ========================
 # 🏠 HOME ROUTE
@@ -26,268 +22,494 @@ def home():
     return "👵👴 Welcome to Unified Elderly Care System API"
 
 # ========================
-# 🩺 HEALTH AGENT
+# 🔌 DATABASE POOL STATUS
 # ========================
-health_model = joblib.load('models/health_alert.pkl')
+@app.route('/db/stats', methods=['GET'])
+def db_stats():
+    # ?check=1 pings every idle connection before reporting
+    check = request.args.get('check', '0') in ('1', 'true', 'yes')
+    return jsonify({'pool': db.pool_stats(check=check)})
 
-@app.route('/health', methods=['GET'])
-def health_data():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM health_monitoring ORDER BY timestamp DESC LIMIT 10;")
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+# ========================
+# 📏 METRICS & PROFILING
+# ========================
+@app.route('/metrics', methods=['GET'])
+def metrics_export():
+    # Prometheus text format: per-route latency and span histograms, pool gauges
+    return Response(metrics.render(pool=db.pool_stats()), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/debug/slow_queries', methods=['GET'])
+def debug_slow_queries():
+    try:
+        limit = max(1, int(request.args.get('limit', 100)))
+    except ValueError:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+    return jsonify({'threshold_ms': 1000 * metrics.SLOW_QUERY_SECONDS, 'slow_queries': metrics.slow_queries(limit)})
+
+@app.route('/debug/profile', methods=['GET'])
+def debug_profile():
+    # ?seconds=10 samples every thread for that long; folded stacks for flamegraph.pl/speedscope
+    if not metrics.PROFILING:
+        return jsonify({"error": "profiling is off; start with ELDERLY_CARE_PROFILING=1"}), 404
+    try:
+        seconds = float(request.args.get('seconds', 5))
+    except ValueError:
+        return jsonify({"error": "seconds must be a number"}), 400
+    return Response(metrics.profile_window(seconds).folded(), mimetype='text/plain')
+
+@app.route('/debug/profile/<int:profile_id>', methods=['GET'])
+def debug_request_profile(profile_id):
+    # The stacks of a request made with ?profile=1 (its X-Profile-Id header)
+    kept = metrics.get_profile(profile_id)
+    if kept is None:
+        return jsonify({"error": f"no profile {profile_id}"}), 404
+    return Response(kept[1], mimetype='text/plain', headers={'X-Profile-Route': kept[0]})
+
+# ========================
+# 🏷️ CONDITIONAL GET
+# ========================
+# Read routes tag their responses with an ETag built from the rows behind
+# them, or from their newest timestamps and data versions where the rows are
+# not read yet; a client sending it back in If-None-Match gets 304 Not
+# Modified and no body while the data is unchanged.
+def fresh(tag):
+    return respond.matches(request.headers.get('If-None-Match'), tag)
+
+def not_modified(tag):
+    return Response(status=304, headers={'ETag': tag, 'Cache-Control': 'no-cache'})
+
+def tagged(response, tag):
+    # no-cache: keep the copy but revalidate it on every poll
+    response.headers['ETag'] = tag
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def readings_response(table, key, rows, record):
+    # The newest rows of a table; tagged by their contents, so flags updated in place change it
+    tag = respond.etag(table, tuple(tuple(row) for row in rows))
+    if fresh(tag):
+        return not_modified(tag)
+    return tagged(jsonify({key: [record(row) for row in rows]}), tag)
+
+def reading_response(agent, key, result):
+    # One user's latest reading; tagged by its contents (the row is at hand already)
+    tag = respond.etag(agent, result)
+    if fresh(tag):
+        return not_modified(tag)
+    return tagged(jsonify({key: result}), tag)
+
+# ========================
+# 🗃️ LATEST-READING CACHE
+# ========================
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify({'latest_reading_cache': cache.latest.stats()})
+
+@app.route('/cache/invalidate', methods=['POST'])
+def cache_invalidate():
+    # For loaders running outside this process: {"agent": "health", "user_ids": ["D1000", ...]}
+    data = request.get_json(silent=True) or {}
+    agents = [data['agent']] if data.get('agent') else list(fleet.TABLES)
+    if data.get('user_ids'):
+        for agent in agents:
+            cache.latest.invalidate(agent, data['user_ids'])
+    else:
+        cache.latest.clear()
+    return jsonify({'latest_reading_cache': cache.latest.stats()})
+
+# ========================
+# 📦 MODEL REGISTRY
+# ========================
+@app.route('/models', methods=['GET'])
+def models_status():
+    return jsonify(registry.status())
+
+@app.route('/models/reload', methods=['POST'])
+def models_reload():
+    # {"agent": "health", "path": "health_alert_v2.pkl"}, a file in the model directory;
+    # no path re-reads the current file. Admin only (agents/admin.py).
+    if not admin.allowed(request.headers.get('Authorization'), request.remote_addr):
+        return jsonify({"error": "admin token required"}), 403
+    data = request.get_json(silent=True) or {}
+    agents = [data['agent']] if data.get('agent') else list(registry.files)
+    unknown = [agent for agent in agents if agent not in registry.files]
+    if unknown:
+        return jsonify({"error": f"unknown agent: {', '.join(unknown)}"}), 404
+    try:
+        path = registry.resolve(data['path']) if data.get('path') is not None else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        for agent in agents:
+            registry.load(agent, path)
+    except (OSError, ValueError) as e:
+        return jsonify({"error": str(e)}), 409
+    return jsonify(registry.status())
+
+@app.route('/models/warm_up', methods=['POST'])
+def models_warm_up():
+    return jsonify({'warmup_ms': registry.warm_up(), 'models': registry.status()['models']})
+
+# ========================
+# 🧮 BATCH PREDICTION
+# ========================
+def batch_predict(model, label):
+    try:
+        df = scoring.batch_frame(request.get_json(silent=True))
+        predictions, probabilities = scoring.score_frame(model, scoring.model_inputs(model, df))
+    except scoring.BatchError as e:
+        return jsonify({"error": str(e)}), e.status
 
     result = [{
-        'user_id': row[0],
-        'timestamp': row[1].strftime('%Y-%m-%d %H:%M:%S'),
-        'heart_rate': row[2],
-        'temperature': row[3],
-        'bp_systolic': row[4],
-        'bp_diastolic': row[5],
-        'abnormal': bool(row[6])
-    } for row in rows]
+        'user_id': user_id,
+        label: int(prediction),
+        'probability': round(float(probability), 4)
+    } for user_id, prediction, probability in zip(scoring.user_keys(df), predictions, probabilities)]
+    return jsonify({'count': len(result), 'predictions': result})
 
-    return jsonify({'health_monitoring': result})
+# ========================
+# 🛰️ FLEET PREDICTION
+# ========================
+def fleet_predict(agent, model, filter_name, keep_value):
+    # Latest reading of every user in one query, scored in one model call, streamed as NDJSON
+    options = dict(request.args)
+    options.update(request.get_json(silent=True) or {})
+    only_flagged = str(options.get(filter_name, '')).lower() in ('1', 'true', 'yes')
+
+    latest = fleet.fetch_fleet_latest(agent)
+    if latest.empty:
+        return Response('', mimetype='application/x-ndjson')
+    scored = fleet.score_latest(agent, model, latest)
+    return Response(fleet.iter_ndjson(scored, keep_value if only_flagged else None),
+                    mimetype='application/x-ndjson')
+
+# ========================
+# 📥 REAL-TIME INGESTION
+# ========================
+def ingest_readings(agent):
+    # One reading or a batch; buffered and written with its prediction in the next micro-batch
+    batcher = realtime.batcher(agent)
+    try:
+        readings = realtime.readings_frame(agent, request.get_json(silent=True))
+        pending = batcher.submit(readings)
+    except scoring.BatchError as e:
+        return jsonify({"error": str(e)}), e.status
+    except realtime.Backpressure as e:
+        return jsonify({"error": str(e)}), 503, {'Retry-After': str(math.ceil(e.retry_after))}
+
+    # ?flush=1 writes the buffer before answering, for callers that need read-after-write
+    if request.args.get('flush', '0') in ('1', 'true', 'yes'):
+        try:
+            batcher.flush()
+        except (db.PoolTimeout,) + db.DB_ERRORS as e:
+            return jsonify({"error": f"accepted but not yet written: {e}"}), 503
+        return jsonify({'accepted': len(readings), 'pending': 0}), 201
+    return jsonify({'accepted': len(readings), 'pending': pending}), 202
+
+@app.route('/ingest/stats', methods=['GET'])
+def ingest_stats():
+    return jsonify({'ingest': realtime.stats()})
+
+# ========================
+# 🚨 STREAMING DETECTION
+# ========================
+@app.route('/detect/events', methods=['GET'])
+def detect_events():
+    # Newest first; ?agent=health&user_id=D1000&limit=100
+    try:
+        limit = max(1, int(request.args.get('limit', 100)))
+    except ValueError:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+    events = detect.recent_events(request.args.get('agent'), request.args.get('user_id'), limit)
+    return jsonify({'count': len(events), 'events': events})
+
+@app.route('/detect/stats', methods=['GET'])
+def detect_stats():
+    return jsonify({'detectors': detect.stats()})
+
+# ========================
+# 📣 ALERT DISPATCH
+# ========================
+@app.route('/alerts', methods=['GET'])
+def alerts_list():
+    # Queued alerts, newest first; ?status=pending|sending|sent|failed&user_id=D1000&limit=100
+    try:
+        limit = max(1, int(request.args.get('limit', 100)))
+    except ValueError:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+    queued = alerts.recent(request.args.get('status'), request.args.get('user_id'), limit)
+    return jsonify({'count': len(queued), 'alerts': queued})
+
+@app.route('/alerts/stats', methods=['GET'])
+def alerts_stats():
+    return jsonify({'alerts': alerts.stats()})
+
+# ========================
+# 👤 USER SUMMARY
+# ========================
+@app.route('/user/<user_id>/summary', methods=['GET'])
+def user_summary(user_id):
+    # Latest health, safety and reminder rows in one query; ?predict=1 adds the model predictions
+    predict = summary.wants_predictions(request.args)
+    newest = summary.fetch_newest(user_id)
+    if not summary.has_data(newest):
+        return jsonify({"error": "No data found for user"}), 404
+    tag = summary.summary_etag(user_id, newest, predict)
+    if fresh(tag):
+        return not_modified(tag)
+    result = summary.fetch_summaries([user_id], predict)[0]
+    return tagged(jsonify(result), tag)
+
+@app.route('/users/summary', methods=['POST'])
+def users_summary():
+    # {"user_ids": ["D1000", ...], "predict": true}; users without data come back with nulls
+    data = request.get_json(silent=True) or {}
+    try:
+        user_ids = summary.unique_ids(data.get('user_ids'))
+    except scoring.BatchError as e:
+        return jsonify({"error": str(e)}), e.status
+    result = summary.fetch_summaries(user_ids, summary.wants_predictions(data))
+    return jsonify({'count': len(result), 'summaries': result})
+
+# ========================
+# 📈 HISTORY
+# ========================
+def agent_history(agent, user_id, not_found):
+    # ?start=&end= (or ?days=), ?bucket=1m|1h|1d|auto, ?max_points= to downsample each series
+    tag = history.history_etag(agent, user_id, request.args, history.fetch_newest(agent, user_id))
+    if fresh(tag):
+        return not_modified(tag)
+    try:
+        result = history.fetch_history(agent, user_id, request.args)
+    except scoring.BatchError as e:
+        return jsonify({"error": str(e)}), e.status
+    if result is None:
+        return jsonify({"error": not_found}), 404
+    return tagged(jsonify(result), tag)
+
+# ========================
+# 🩺 HEALTH AGENT
+# ========================
+@app.route('/health', methods=['GET'])
+def health_data():
+    with db.cursor() as cur:
+        cur.execute("SELECT * FROM health_monitoring ORDER BY timestamp DESC LIMIT 10;")
+        rows = cur.fetchall()
+
+    return readings_response('health_monitoring', 'health_monitoring', rows, health_record)
 
 @app.route('/health/user/<user_id>', methods=['GET'])
 def health_data_user(user_id):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM health_monitoring WHERE user_id = %s ORDER BY timestamp DESC LIMIT 1;", (user_id,))
-    row = cur.fetchone()
-    cur.close()
-    conn.close()
+    cached = cache.latest.get('health', user_id)
+    if cached is not None:
+        return reading_response('health', 'health_monitoring', cached)
+
+    with db.cursor() as cur:
+        cur.execute("SELECT * FROM health_monitoring WHERE user_id = %s ORDER BY timestamp DESC LIMIT 1;", (user_id,))
+        row = cur.fetchone()
 
     if not row:
         return jsonify({"error": "No health data found"}), 404
 
-    result = {
-        'user_id': row[0],
-        'timestamp': row[1].strftime('%Y-%m-%d %H:%M:%S'),
-        'heart_rate': row[2],
-        'temperature': row[3],
-        'bp_systolic': row[4],
-        'bp_diastolic': row[5],
-        'abnormal': bool(row[6])
-    }
-    return jsonify({'health_monitoring': result})
+    result = health_record(row)
+    cache.latest.put('health', user_id, result)
+    return reading_response('health', 'health_monitoring', result)
 
 @app.route('/health/predict', methods=['POST'])
 def predict_health():
     data = request.get_json()
-    input_df = pd.DataFrame([data])
-    prediction = health_model.predict(input_df)
-    return jsonify({'abnormal_prediction': int(prediction[0])})
+    try:
+        prediction = scoring.predict_record('health', data)
+    except scoring.BatchError as e:
+        return jsonify({"error": str(e)}), e.status
+    return jsonify({'abnormal_prediction': prediction})
+
+@app.route('/health/batch_predict', methods=['POST'])
+def predict_health_batch():
+    return batch_predict(registry.get('health'), 'abnormal_prediction')
 
 @app.route('/health/auto_predict', methods=['POST'])
 def auto_predict_health():
     data = request.get_json()
     user_id = data.get("user_id")
 
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT heart_rate, temperature, bp_systolic, bp_diastolic
-        FROM health_monitoring
-        WHERE user_id = %s
-        ORDER BY timestamp DESC LIMIT 1;
-    """, (user_id,))
-    row = cur.fetchone()
-    cur.close()
-    conn.close()
-
-    if row:
-        df = pd.DataFrame([{
-            'heart_rate': row[0],
-            'temperature': row[1],
-            'bp_systolic': row[2],
-            'bp_diastolic': row[3]
-        }])
-        prediction = health_model.predict(df)[0]
-        return jsonify({"user_id": user_id, "abnormal_prediction": int(prediction)})
+    latest = fleet.fetch_user_latest_record('health', user_id)
+
+    if latest is not None:
+        prediction = scoring.predict_reading('health', latest)
+        return jsonify({"user_id": user_id, "abnormal_prediction": prediction})
     else:
         return jsonify({"error": "No health data found"}), 404
 
+@app.route('/health/fleet_predict', methods=['GET', 'POST'])
+def fleet_predict_health():
+    return fleet_predict('health', registry.get('health'), 'only_abnormal', 1)
+
+@app.route('/health/ingest', methods=['POST'])
+def ingest_health():
+    return ingest_readings('health')
+
+@app.route('/health/history/<user_id>', methods=['GET'])
+def health_history(user_id):
+    return agent_history('health', user_id, "No health data found")
+
 # ========================
 # 🛡️ SAFETY AGENT
 # ========================
-safety_model = joblib.load('models/safety_alert.pkl')
-
 @app.route('/safety', methods=['GET'])
 def safety_data():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM safety_monitoring ORDER BY timestamp DESC LIMIT 10;")
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
-
-    result = [{
-        'user_id': row[0],
-        'timestamp': row[1].strftime('%Y-%m-%d %H:%M:%S'),
-        'event_type': row[2],
-        'location': row[3],
-        'emergency_call': bool(row[4]),
-        'unsafe': bool(row[5])
-    } for row in rows]
+    with db.cursor() as cur:
+        cur.execute("SELECT * FROM safety_monitoring ORDER BY timestamp DESC LIMIT 10;")
+        rows = cur.fetchall()
 
-    return jsonify({'safety_monitoring': result})
+    return readings_response('safety_monitoring', 'safety_monitoring', rows, safety_record)
 
 @app.route('/safety/user/<user_id>', methods=['GET'])
 def safety_data_user(user_id):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT * FROM safety_monitoring 
-        WHERE user_id = %s 
-        ORDER BY timestamp DESC LIMIT 1;
-    """, (user_id,))
-    row = cur.fetchone()
-    cur.close()
-    conn.close()
+    cached = cache.latest.get('safety', user_id)
+    if cached is not None:
+        return reading_response('safety', 'safety_monitoring', cached)
+
+    with db.cursor() as cur:
+        cur.execute("""
+            SELECT * FROM safety_monitoring 
+            WHERE user_id = %s 
+            ORDER BY timestamp DESC LIMIT 1;
+        """, (user_id,))
+        row = cur.fetchone()
 
     if not row:
         return jsonify({"error": "No safety data found"}), 404
 
-    result = {
-        'user_id': row[0],
-        'timestamp': row[1].strftime('%Y-%m-%d %H:%M:%S'),
-        'event_type': row[2],
-        'location': row[3],
-        'emergency_call': bool(row[4]),
-        'unsafe': bool(row[5])
-    }
-    return jsonify({'safety_monitoring': result})
+    result = safety_record(row)
+    cache.latest.put('safety', user_id, result)
+    return reading_response('safety', 'safety_monitoring', result)
 
 @app.route('/safety/predict', methods=['POST'])
 def predict_safety():
     data = request.get_json()
-    input_df = pd.DataFrame([data])
-    prediction = safety_model.predict(input_df)
-    return jsonify({'unsafe_prediction': int(prediction[0])})
+    try:
+        prediction = scoring.predict_record('safety', data)
+    except scoring.BatchError as e:
+        return jsonify({"error": str(e)}), e.status
+    return jsonify({'unsafe_prediction': prediction})
+
+@app.route('/safety/batch_predict', methods=['POST'])
+def predict_safety_batch():
+    return batch_predict(registry.get('safety'), 'unsafe_prediction')
 
 @app.route('/safety/auto_predict', methods=['POST'])
 def auto_predict_safety():
     data = request.get_json()
     user_id = data.get("user_id")
 
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT event_type, location, emergency_call
-        FROM safety_monitoring
-        WHERE user_id = %s
-        ORDER BY timestamp DESC LIMIT 1;
-    """, (user_id,))
-    row = cur.fetchone()
-    cur.close()
-    conn.close()
-
-    if row:
-        df = pd.DataFrame([{
-            'event_type': row[0],
-            'location': row[1],
-            'emergency_call': row[2]
-        }])
-        prediction = safety_model.predict(df)[0]
-        return jsonify({"user_id": user_id, "unsafe_prediction": int(prediction)})
+    latest = fleet.fetch_user_latest_record('safety', user_id)
+
+    if latest is not None:
+        prediction = scoring.predict_reading('safety', latest)
+        return jsonify({"user_id": user_id, "unsafe_prediction": prediction})
     else:
         return jsonify({"error": "No safety data found"}), 404
 
+@app.route('/safety/fleet_predict', methods=['GET', 'POST'])
+def fleet_predict_safety():
+    return fleet_predict('safety', registry.get('safety'), 'only_unsafe', 1)
+
+@app.route('/safety/ingest', methods=['POST'])
+def ingest_safety():
+    return ingest_readings('safety')
+
+@app.route('/safety/history/<user_id>', methods=['GET'])
+def safety_history(user_id):
+    return agent_history('safety', user_id, "No safety data found")
+
 # ========================
 # ⏰ REMINDER AGENT
 # ========================
-reminder_model = joblib.load('models/daily_reminder.pkl')
-
 @app.route('/reminders', methods=['GET'])
 def reminders_data():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM daily_reminder ORDER BY timestamp DESC LIMIT 10;")
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+    with db.cursor() as cur:
+        cur.execute("SELECT * FROM daily_reminder ORDER BY timestamp DESC LIMIT 10;")
+        rows = cur.fetchall()
 
-    result = [{
-        'user_id': row[0],
-        'timestamp': row[1].strftime('%Y-%m-%d %H:%M:%S'),
-        'reminder_type': row[2],
-        'start_time': str(row[3]),
-        'schedule_time': str(row[3]),
-        'reminder_sent': bool(row[4]),
-        'acknowledged': bool(row[5])
-    } for row in rows]
-
-    return jsonify({'reminder_monitoring': result})
+    return readings_response('daily_reminder', 'reminder_monitoring', rows, reminder_record)
 
 @app.route('/reminders/user/<user_id>', methods=['GET'])
 def reminder_data_user(user_id):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT * FROM daily_reminder 
-        WHERE user_id = %s 
-        ORDER BY timestamp DESC LIMIT 1;
-    """, (user_id,))
-    row = cur.fetchone()
-    cur.close()
-    conn.close()
+    cached = cache.latest.get('reminders', user_id)
+    if cached is not None:
+        return reading_response('reminders', 'daily_reminders', cached)
+
+    with db.cursor() as cur:
+        cur.execute("""
+            SELECT * FROM daily_reminder 
+            WHERE user_id = %s 
+            ORDER BY timestamp DESC LIMIT 1;
+        """, (user_id,))
+        row = cur.fetchone()
 
     if not row:
         return jsonify({"error": "No reminders found"}), 404
 
-    result = {
-        'user_id': row[0],
-        'timestamp': row[1].strftime('%Y-%m-%d %H:%M:%S'),
-        'reminder_type': row[2],
-        'start_time': str(row[3]),
-        'schedule_time': str(row[3]),
-        'reminder_sent': bool(row[4]),
-        'acknowledged': bool(row[5])
-    }
-    return jsonify({'daily_reminders': result})
+    result = reminder_record(row)
+    cache.latest.put('reminders', user_id, result)
+    return reading_response('reminders', 'daily_reminders', result)
 
 @app.route('/reminders/predict', methods=['POST'])
 def predict_reminder():
     data = request.get_json()
-    input_df = pd.DataFrame([data])
-    prediction = reminder_model.predict(input_df)
-    return jsonify({'acknowledged_prediction': int(prediction[0])})
+    try:
+        prediction = scoring.predict_record('reminders', data)
+    except scoring.BatchError as e:
+        return jsonify({"error": str(e)}), e.status
+    return jsonify({'acknowledged_prediction': prediction})
+
+@app.route('/reminders/batch_predict', methods=['POST'])
+def predict_reminder_batch():
+    return batch_predict(registry.get('reminders'), 'acknowledged_prediction')
 
 @app.route('/reminders/auto_predict', methods=['POST'])
 def auto_predict_reminder():
     data = request.get_json()
     user_id = data.get("user_id")
 
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT reminder_type, schedule_time
-        FROM daily_reminder
-        WHERE user_id = %s AND reminder_sent = TRUE
-        ORDER BY timestamp DESC LIMIT 1;
-    """, (user_id,))
-    row = cur.fetchone()
-    cur.close()
-    conn.close()
-
-    if row:
-        df = pd.DataFrame([{
-            'reminder_type': row[0],
-            'schedule_time': row[1]
-        }])
-        prediction = reminder_model.predict(df)[0]
-        return jsonify({"user_id": user_id, "acknowledged_prediction": int(prediction)})
+    latest = fleet.fetch_user_latest_record('reminders', user_id)
+
+    if latest is not None:
+        prediction = scoring.predict_reading('reminders', latest)
+        return jsonify({"user_id": user_id, "acknowledged_prediction": prediction})
     else:
         return jsonify({"error": "No reminders found"}), 404
 
+@app.route('/reminders/fleet_predict', methods=['GET', 'POST'])
+def fleet_predict_reminder():
+    return fleet_predict('reminders', registry.get('reminders'), 'only_unacknowledged', 0)
+
+@app.route('/reminders/ingest', methods=['POST'])
+def ingest_reminders():
+    return ingest_readings('reminders')
+
+@app.route('/reminders/history/<user_id>', methods=['GET'])
+def reminders_history(user_id):
+    return agent_history('reminders', user_id, "No reminders found")
+
+@app.route('/reminders/scheduler', methods=['GET'])
+def reminders_scheduler():
+    return jsonify({'scheduler': reminders.stats()})
+
 
 # ========================
 # Run the app
 # ========================
+# Start from the project root: python -m agents.agents
 if __name__ == '__main__':
+    # SIGTERM exits through atexit so buffered readings are flushed
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    # Reminders fire, and spilled readings are recovered, from the debug reloader's
+    # serving process only, not its file watcher
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        reminders.start()
+        realtime.start()
     print("✅ API running on: http://127.0.0.1:5001")
     app.run(debug=True, port=5001)
 
@@ -0,0 +1,100 @@
+import asyncio
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from agents import db, metrics
+
+# ========================
+# ⚡ ASYNC DATA LAYER
+# ========================
+# asyncpg pool for the async app (agents/asgi.py). Same DSN and pool sizes as
+# agents/db.py; queries keep psycopg2's %s placeholders and are numbered here.
+# The SQLite stand-in has no async driver, so it runs the pooled sync layer on
+# a bounded thread executor instead.
+_PLACEHOLDER = re.compile(r'%s')
+
+_pool = None
+_executor = None
+pool_metrics = db.PoolMetrics()
+
+
+def _numbered(query):
+    counter = iter(range(1, 10_000))
+    return _PLACEHOLDER.sub(lambda _: f"${next(counter)}", query)
+
+
+def _connect_kwargs(dsn):
+    # asyncpg takes URLs only; translate libpq "key=value" strings
+    if '://' in dsn:
+        return {'dsn': dsn}
+    names = {'dbname': 'database', 'user': 'user', 'password': 'password', 'host': 'host', 'port': 'port'}
+    kwargs = {}
+    for part in dsn.split():
+        key, _, value = part.partition('=')
+        if key in names:
+            kwargs[names[key]] = int(value) if key == 'port' else value
+    return kwargs
+
+
+async def init():
+    global _pool, _executor
+    if db.backend() == 'sqlite':
+        _executor = ThreadPoolExecutor(max_workers=db.POOL_MAX, thread_name_prefix='db')
+        return
+    import asyncpg
+    _pool = await asyncpg.create_pool(min_size=db.POOL_MIN, max_size=db.POOL_MAX,
+                                      timeout=db.POOL_TIMEOUT, **_connect_kwargs(db.DSN))
+
+
+async def close():
+    global _pool, _executor
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+        db.close_pool()
+
+
+def _fetch_sync(query, params):
+    with db.cursor() as cur:
+        cur.execute(query, params)
+        return [desc[0] for desc in cur.description], cur.fetchall()
+
+
+async def fetch(query, params=()):
+    # Returns (columns, rows); rows index like tuples. Columns are empty when no rows came back.
+    if _pool is None:
+        return await asyncio.get_running_loop().run_in_executor(_executor, metrics.bind(_fetch_sync), query,
+                                                                tuple(params))
+
+    start = time.monotonic()
+    try:
+        async with _pool.acquire(timeout=db.POOL_TIMEOUT) as conn:
+            pool_metrics.record_wait(time.monotonic() - start)
+            query_start = time.monotonic()
+            # conn.fetch goes through the connection's prepared-statement cache
+            rows = await conn.fetch(_numbered(query), *params)
+            elapsed = time.monotonic() - query_start
+            pool_metrics.record_query(elapsed)
+            metrics.record_query(query, params, elapsed)
+            return (list(rows[0].keys()) if rows else []), rows
+    except asyncio.TimeoutError:
+        pool_metrics.incr('timeouts')
+        raise db.PoolTimeout(f"no database connection free after {db.POOL_TIMEOUT}s")
+
+
+async def fetchrow(query, params=()):
+    _, rows = await fetch(query, params)
+    return rows[0] if rows else None
+
+
+def stats():
+    if _pool is None:
+        return db.pool_stats()
+    size, idle = _pool.get_size(), _pool.get_idle_size()
+    stats = {'size': size, 'idle': idle, 'in_use': size - idle, 'max': db.POOL_MAX}
+    stats.update(pool_metrics.snapshot())
+    return stats
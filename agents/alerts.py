@@ -0,0 +1,577 @@
+import asyncio
+import atexit
+import importlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import urllib.request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from agents import cache, db, detect, ingest
+
+# ========================
+# 📣 ALERT DISPATCH
+# ========================
+# Alerts (flagged readings from the ingestion flush and streaming detector
+# events) are written to a local SQLite queue file and answered straight
+# away; request handlers never wait on an outbound call. A background event
+# loop claims due alerts and sends them through a pluggable notifier with
+# WORKERS sends in flight. Repeats of the same rule for a resident within
+# DEDUP_SECONDS are dropped, each caregiver has a token-bucket rate limit
+# (critical alerts are never held back), failed sends are retried with
+# exponential backoff, and delivered alerts set caregiver_notified on their
+# readings in batched updates.
+ENABLED = os.environ.get("ELDERLY_CARE_ALERTS", "1") not in ('0', 'false', 'no')
+SPILL_DIR = os.environ.get("ELDERLY_CARE_SPILL_DIR", "spill")
+QUEUE_PATH = os.environ.get("ELDERLY_CARE_ALERT_QUEUE", os.path.join(SPILL_DIR, "alerts.sqlite3"))
+# 'local', 'webhook' or 'package.module:ClassName'
+NOTIFIER = os.environ.get("ELDERLY_CARE_NOTIFIER", "local")
+WORKERS = int(os.environ.get("ELDERLY_CARE_ALERT_WORKERS", "16"))
+DEDUP_SECONDS = int(os.environ.get("ELDERLY_CARE_ALERT_DEDUP", "1800"))
+# Per caregiver: BURST alerts at once, then RATE_PER_MINUTE
+RATE_PER_MINUTE = float(os.environ.get("ELDERLY_CARE_ALERT_RATE", "10"))
+BURST = int(os.environ.get("ELDERLY_CARE_ALERT_BURST", "5"))
+MIN_SEVERITY = os.environ.get("ELDERLY_CARE_ALERT_MIN_SEVERITY", "warning")
+DEFAULT_CAREGIVER = os.environ.get("ELDERLY_CARE_DEFAULT_CAREGIVER", "on-call")
+MAX_ATTEMPTS = 8
+BACKOFF_SECONDS = 2.0
+BACKOFF_MAX_SECONDS = 300.0
+SEND_TIMEOUT = 10.0
+CLAIM_BATCH = 200
+POLL_INTERVAL = 0.5
+WRITEBACK_INTERVAL = 1.0
+WRITEBACK_BATCH = 1000
+# A sent alert whose reading is still not stored after this long is not written back
+WRITEBACK_GIVE_UP_SECONDS = 3600
+# Delivered and failed alerts stay in the queue file this long
+RETAIN_SECONDS = 7 * 86400
+CAREGIVER_TTL = 300
+SHUTDOWN_SECONDS = 10.0
+
+SEVERITIES = {'warning': 0, 'critical': 1}
+# Stored readings alert when the device set alert_triggered or the model flagged them
+READING_ALERTS = {
+    'health': ('abnormal', 'warning'),
+    'safety': ('unsafe', 'critical'),
+}
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+EPOCH = datetime(1970, 1, 1)
+
+
+def _seconds(timestamp):
+    return (datetime.fromisoformat(timestamp) - EPOCH).total_seconds()
+
+
+# ========================
+# 🗃️ DURABLE QUEUE
+# ========================
+QUEUE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id INTEGER PRIMARY KEY,
+    agent TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    reading_ts TEXT NOT NULL,
+    rule TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    enqueued_at REAL NOT NULL,
+    sent_at REAL,
+    last_error TEXT,
+    written INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS alerts_due ON alerts (status, next_attempt);
+CREATE INDEX IF NOT EXISTS alerts_unwritten ON alerts (sent_at) WHERE status = 'sent' AND written = 0;
+"""
+
+
+class AlertQueue:
+    # A local SQLite file, so queued alerts outlive restarts and database outages.
+    # status: pending -> sending -> sent | pending (retry) | failed
+    def __init__(self, path=QUEUE_PATH):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.lock, self.conn:
+            self.conn.executescript(QUEUE_SCHEMA)
+            # Claimed by a process that stopped before settling them
+            self.conn.execute("UPDATE alerts SET status = 'pending' WHERE status = 'sending'")
+
+    def add(self, rows):
+        # rows of (agent, user_id, reading_ts, rule, severity, payload, enqueued_at)
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO alerts (agent, user_id, reading_ts, rule, severity, payload, next_attempt, enqueued_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", [row[:6] + (row[6], row[6]) for row in rows])
+
+    def claim(self, limit, now):
+        with self.lock, self.conn:
+            rows = self.conn.execute(
+                "SELECT id, agent, user_id, reading_ts, rule, severity, payload, attempts, enqueued_at FROM alerts "
+                "WHERE status = 'pending' AND next_attempt <= ? ORDER BY next_attempt LIMIT ?", (now, limit)).fetchall()
+            self.conn.executemany("UPDATE alerts SET status = 'sending' WHERE id = ?", [(row[0],) for row in rows])
+        return [{
+            'id': row[0], 'agent': row[1], 'user_id': row[2], 'timestamp': row[3], 'rule': row[4],
+            'severity': row[5], 'details': json.loads(row[6]), 'attempts': row[7], 'enqueued_at': row[8],
+        } for row in rows]
+
+    def settle(self, results):
+        # results of (status, next_attempt, sent_at, attempts, last_error, id)
+        with self.lock, self.conn:
+            self.conn.executemany("UPDATE alerts SET status = ?, next_attempt = ?, sent_at = ?, attempts = ?, "
+                                  "last_error = ? WHERE id = ?", results)
+
+    def unwritten(self, limit):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT id, agent, user_id, reading_ts, sent_at FROM alerts WHERE status = 'sent' AND written = 0 "
+                "ORDER BY sent_at LIMIT ?", (limit,)).fetchall()
+
+    def mark_written(self, ids, value=1):
+        # 1: caregiver_notified stored; -1: the reading never showed up
+        if ids:
+            with self.lock, self.conn:
+                self.conn.executemany("UPDATE alerts SET written = ? WHERE id = ?", [(value, i) for i in ids])
+
+    def prune(self, before):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM alerts WHERE enqueued_at < ? AND "
+                              "((status = 'sent' AND written != 0) OR status = 'failed')", (before,))
+
+    def last_alerts(self, since):
+        # (user_id, rule) -> newest reading time, to carry deduplication across restarts
+        with self.lock:
+            rows = self.conn.execute("SELECT user_id, rule, MAX(reading_ts) FROM alerts WHERE enqueued_at >= ? "
+                                     "GROUP BY user_id, rule", (since,)).fetchall()
+        return {(user_id, rule): _seconds(ts) for user_id, rule, ts in rows}
+
+    def depth(self):
+        with self.lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM alerts GROUP BY status").fetchall())
+
+    def unwritten_count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM alerts WHERE status = 'sent' AND written = 0").fetchone()[0]
+
+    def list(self, status=None, user_id=None, limit=100):
+        conditions, params = [], []
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        if user_id:
+            conditions.append("user_id = ?")
+            params.append(user_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self.lock:
+            cursor = self.conn.execute(f"SELECT * FROM alerts {where} ORDER BY id DESC LIMIT ?", params + [limit])
+            columns = [c[0] for c in cursor.description]
+            rows = cursor.fetchall()
+        return [dict(zip(columns, row), payload=json.loads(row[columns.index('payload')])) for row in rows]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+# ========================
+# 🔔 NOTIFIERS
+# ========================
+# A notifier is any object with `async def send(alert)` that raises on failure.
+class NotifierError(Exception):
+    pass
+
+
+class LocalNotifier:
+    # Stand-in backend for development, tests and the benchmarks: keeps the
+    # latest alerts in memory and appends each one to a JSON-lines file.
+    # latency and failure_rate simulate a slow or flaky service.
+    def __init__(self, path=os.environ.get("ELDERLY_CARE_NOTIFIER_LOG", os.path.join(SPILL_DIR, "notifications.jsonl")),
+                 latency=0.0, failure_rate=0.0, seed=None):
+        self.path = path
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.sent = deque(maxlen=1000)
+        self.count = 0
+        if path:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    async def send(self, alert):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failure_rate and self.random.random() < self.failure_rate:
+            raise NotifierError("simulated delivery failure")
+        self.sent.append(alert)
+        self.count += 1
+        if self.path:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(alert, default=str) + '\n')
+
+
+class WebhookNotifier:
+    # POSTs each alert as JSON; the blocking HTTP call runs on the notifier's own threads
+    def __init__(self, url=os.environ.get("ELDERLY_CARE_ALERT_WEBHOOK_URL"), timeout=SEND_TIMEOUT, threads=WORKERS):
+        if not url:
+            raise ValueError("ELDERLY_CARE_ALERT_WEBHOOK_URL is not set")
+        self.url = url
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='webhook')
+
+    def _post(self, alert):
+        request = urllib.request.Request(self.url, data=json.dumps(alert, default=str).encode(),
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            if response.status >= 300:
+                raise NotifierError(f"webhook answered {response.status}")
+
+    async def send(self, alert):
+        await asyncio.get_running_loop().run_in_executor(self.executor, self._post, alert)
+
+
+NOTIFIERS = {
+    'local': LocalNotifier,
+    'webhook': WebhookNotifier,
+}
+
+
+def make_notifier(spec=NOTIFIER):
+    if spec in NOTIFIERS:
+        return NOTIFIERS[spec]()
+    module, _, name = spec.partition(':')
+    return getattr(importlib.import_module(module), name)()
+
+
+class RateLimiter:
+    # Token bucket per caregiver; wait() is 0 when an alert may go now, else seconds until it may
+    def __init__(self, rate_per_minute=RATE_PER_MINUTE, burst=BURST):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.buckets = {}
+
+    def wait(self, caregiver, now):
+        if self.rate <= 0:
+            return 0.0
+        tokens, last = self.buckets.get(caregiver, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        if tokens >= 1:
+            self.buckets[caregiver] = (tokens - 1, now)
+            return 0.0
+        self.buckets[caregiver] = (tokens, now)
+        return (1 - tokens) / self.rate
+
+
+# ========================
+# 🚚 DISPATCHER
+# ========================
+class Dispatcher:
+    def __init__(self, queue=None, notifier=None, workers=WORKERS, limiter=None,
+                 dedup_seconds=DEDUP_SECONDS, backoff=BACKOFF_SECONDS):
+        self.queue = queue or AlertQueue()
+        self.notifier = notifier or make_notifier()
+        self.workers = workers
+        self.limiter = limiter or RateLimiter()
+        self.dedup_seconds = dedup_seconds
+        self.backoff = backoff
+        self.lock = threading.Lock()
+        self._last = self.queue.last_alerts(time.time() - max(dedup_seconds, 86400))
+        self._prune_at = 100000
+        self._caregivers = {}
+        self._caregivers_at = time.monotonic()
+        self._results = []   # settled by the loop in batches
+        self._thread = None
+        self._loop = None
+        self._wake = None
+        self._ready = threading.Event()
+        self._closed = False
+        self.enqueued = 0
+        self.suppressed = 0
+        self.below_severity = 0
+        self.sent = 0
+        self.retried = 0
+        self.deferred = 0
+        self.failed = 0
+        self.written = 0
+        self.writeback_errors = 0
+        self.latency = db.Timings()     # enqueued -> delivered
+        self.send_time = db.Timings()   # notifier call
+
+    # ---- producers (any thread) ----
+    def enqueue(self, alerts):
+        # alerts: dicts with agent, user_id, timestamp, rule, severity (+ details); returns how many were queued
+        now = time.time()
+        rows = []
+        with self.lock:
+            if self._closed:
+                return 0
+            for alert in alerts:
+                if SEVERITIES.get(alert['severity'], 0) < SEVERITIES[MIN_SEVERITY]:
+                    self.below_severity += 1
+                    continue
+                key, t = (alert['user_id'], alert['rule']), _seconds(alert['timestamp'])
+                last = self._last.get(key)
+                if last is not None and abs(t - last) < self.dedup_seconds:
+                    self.suppressed += 1
+                    continue
+                self._last[key] = t if last is None else max(t, last)
+                rows.append((alert['agent'], alert['user_id'], alert['timestamp'], alert['rule'],
+                             alert['severity'], json.dumps(alert, default=str), now))
+            self.enqueued += len(rows)
+            if len(self._last) > self._prune_at:
+                newest = max(self._last.values())
+                self._last = {k: t for k, t in self._last.items() if newest - t < self.dedup_seconds}
+                self._prune_at = max(100000, 2 * len(self._last))
+        if rows:
+            self.queue.add(rows)
+            self._start()
+            self._loop.call_soon_threadsafe(self._wake.set)
+        return len(rows)
+
+    def _start(self):
+        with self.lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=asyncio.run, args=(self._main(),),
+                                                name='alert-dispatch', daemon=True)
+                self._thread.start()
+        self._ready.wait()
+
+    # ---- event loop ----
+    async def _main(self):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._ready.set()
+        inbox = asyncio.Queue()
+        workers = [asyncio.create_task(self._worker(inbox)) for _ in range(self.workers)]
+        last_writeback = last_prune = time.monotonic()
+        while not self._closed:
+            claimed = []
+            if inbox.qsize() < self.workers:
+                claimed = self.queue.claim(CLAIM_BATCH, time.time())
+            if claimed:
+                caregivers = await self._off_loop(self._caregivers_for, [a['user_id'] for a in claimed])
+                for alert in claimed:
+                    alert['caregiver_id'] = caregivers[alert['user_id']]
+                    inbox.put_nowait(alert)
+            self._settle()
+            if time.monotonic() - last_writeback >= WRITEBACK_INTERVAL:
+                await self._off_loop(self.write_back)
+                last_writeback = time.monotonic()
+            if time.monotonic() - last_prune >= 60:
+                self.queue.prune(time.time() - RETAIN_SECONDS)
+                last_prune = time.monotonic()
+            if not claimed or inbox.qsize() >= self.workers:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+        # Closing: sends already claimed may finish; whatever is left is reclaimed on the next start
+        for _ in workers:
+            inbox.put_nowait(None)
+        await asyncio.wait(workers, timeout=SHUTDOWN_SECONDS)
+        self._settle()
+        # Called directly: at interpreter exit executors no longer take work
+        self.write_back()
+
+    async def _off_loop(self, fn, *args):
+        try:
+            return await self._loop.run_in_executor(None, fn, *args)
+        except RuntimeError:
+            # At interpreter exit the default executor is shut down before atexit hooks run
+            return fn(*args)
+
+    async def _worker(self, inbox):
+        while True:
+            alert = await inbox.get()
+            if alert is None:
+                return
+            now = time.time()
+            wait = 0.0 if alert['severity'] == 'critical' else self.limiter.wait(alert['caregiver_id'], now)
+            if wait:
+                self.deferred += 1
+                self._results.append(('pending', now + wait, None, alert['attempts'], 'rate limited', alert['id']))
+                self._wake.set()
+                continue
+            start = time.perf_counter()
+            try:
+                await asyncio.wait_for(self.notifier.send(alert), SEND_TIMEOUT)
+            except Exception as e:
+                attempts = alert['attempts'] + 1
+                if attempts >= MAX_ATTEMPTS:
+                    self.failed += 1
+                    self._results.append(('failed', now, None, attempts, str(e) or type(e).__name__, alert['id']))
+                else:
+                    self.retried += 1
+                    delay = min(BACKOFF_MAX_SECONDS, self.backoff * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+                    self._results.append(('pending', now + delay, None, attempts, str(e) or type(e).__name__,
+                                          alert['id']))
+            else:
+                done = time.time()
+                self.sent += 1
+                self.send_time.add(time.perf_counter() - start)
+                self.latency.add(done - alert['enqueued_at'])
+                self._results.append(('sent', now, done, alert['attempts'] + 1, None, alert['id']))
+            self._wake.set()
+
+    def _settle(self):
+        results, self._results = self._results, []
+        if results:
+            self.queue.settle(results)
+
+    def _caregivers_for(self, user_ids):
+        if time.monotonic() - self._caregivers_at > CAREGIVER_TTL:
+            self._caregivers, self._caregivers_at = {}, time.monotonic()
+        missing = sorted(set(user_ids) - set(self._caregivers))
+        if missing:
+            try:
+                with db.cursor() as cur:
+                    cur.execute(f"SELECT user_id, caregiver_id FROM users "
+                                f"WHERE user_id IN ({', '.join(['%s'] * len(missing))});", missing)
+                    found = dict(cur.fetchall())
+            except (db.PoolTimeout,) + db.DB_ERRORS:
+                # Sending does not wait for the database; these go to the default caregiver
+                return {user_id: self._caregivers.get(user_id, DEFAULT_CAREGIVER) for user_id in user_ids}
+            for user_id in missing:
+                self._caregivers[user_id] = found.get(user_id) or DEFAULT_CAREGIVER
+        return {user_id: self._caregivers[user_id] for user_id in user_ids}
+
+    # ---- caregiver_notified write-back ----
+    def write_back(self):
+        # One lookup and one batched UPDATE per table for delivered alerts. Readings
+        # still in the ingestion buffer are picked up by a later round.
+        rows = self.queue.unwritten(WRITEBACK_BATCH)
+        if not rows:
+            return 0
+        now = time.time()
+        by_agent = {}
+        for alert_id, agent, user_id, reading_ts, sent_at in rows:
+            by_agent.setdefault(agent, []).append((alert_id, (user_id, datetime.fromisoformat(reading_ts)), sent_at))
+        written, missing = [], []
+        try:
+            with db.cursor() as cur:
+                for agent, group in by_agent.items():
+                    table = ingest.SOURCES[agent]['table']
+                    keys = {key for _, key, _ in group}
+                    users = sorted({user_id for user_id, _ in keys})
+                    times = sorted({ts for _, ts in keys})
+                    cur.execute(f"SELECT user_id, timestamp FROM {table} "
+                                f"WHERE user_id IN ({', '.join(['%s'] * len(users))}) "
+                                f"AND timestamp IN ({', '.join(['%s'] * len(times))});", users + times)
+                    stored = keys & set(map(tuple, cur.fetchall()))
+                    if stored:
+                        cur.executemany(f"UPDATE {table} SET caregiver_notified = TRUE "
+                                        f"WHERE user_id = %s AND timestamp = %s;", sorted(stored))
+                        ingest.touch(cur, agent, sorted({user_id for user_id, _ in stored}))
+                    for alert_id, key, sent_at in group:
+                        if key in stored:
+                            written.append(alert_id)
+                        elif now - sent_at > WRITEBACK_GIVE_UP_SECONDS:
+                            missing.append(alert_id)
+                    cache.latest.invalidate(agent, sorted({user_id for user_id, _ in stored}))
+        except (db.PoolTimeout,) + db.DB_ERRORS as e:
+            self.writeback_errors += 1
+            print(f"⚠️ caregiver_notified write-back failed: {e}")
+            return 0
+        self.queue.mark_written(written, 1)
+        self.queue.mark_written(missing, -1)
+        self.written += len(written)
+        return len(written)
+
+    def close(self):
+        with self.lock:
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+            thread.join(SHUTDOWN_SECONDS + 5)
+        self.queue.close()
+
+    def stats(self):
+        depth = self.queue.depth()
+        return {
+            'queue_depth': depth.get('pending', 0) + depth.get('sending', 0),
+            'by_status': depth,
+            'enqueued': self.enqueued,
+            'suppressed_duplicates': self.suppressed,
+            'below_severity': self.below_severity,
+            'sent': self.sent,
+            'retried': self.retried,
+            'rate_limited': self.deferred,
+            'failed': self.failed,
+            'notified_written': self.written,
+            'writeback_pending': self.queue.unwritten_count(),
+            'writeback_errors': self.writeback_errors,
+            'dispatch_latency': self.latency.summary(),
+            'send_time': self.send_time.summary(),
+            'workers': self.workers,
+            'notifier': type(self.notifier).__name__,
+        }
+
+
+# ========================
+# 🔌 SHARED DISPATCHER
+# ========================
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def dispatcher():
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = Dispatcher()
+        return _dispatcher
+
+
+def enqueue_readings(agent, table_df):
+    # Called by agents/realtime.py once a micro-batch is stored
+    if not ENABLED or agent not in READING_ALERTS:
+        return 0
+    flag, severity = READING_ALERTS[agent]
+    flagged = table_df['alert_triggered'].astype(bool)
+    if flag in table_df.columns:
+        flagged = flagged | table_df[flag].astype(bool)
+    rows = table_df[flagged]
+    if rows.empty:
+        return 0
+    return dispatcher().enqueue([
+        {'agent': agent, 'user_id': user_id, 'timestamp': timestamp, 'severity': severity,
+         'rule': 'alert_triggered' if device else flag}
+        for user_id, timestamp, device in zip(rows['user_id'], rows['timestamp'].dt.strftime(TIMESTAMP_FORMAT),
+                                              rows['alert_triggered'].astype(bool))])
+
+
+def enqueue_events(events):
+    if ENABLED:
+        dispatcher().enqueue(events)
+
+
+def stats():
+    with _dispatcher_lock:
+        return _dispatcher.stats() if _dispatcher is not None else {}
+
+
+def recent(status=None, user_id=None, limit=100):
+    return dispatcher().queue.list(status, user_id, limit)
+
+
+def close():
+    global _dispatcher
+    with _dispatcher_lock:
+        current, _dispatcher = _dispatcher, None
+    if current is not None:
+        current.close()
+
+
+detect.subscribe(enqueue_events)
+atexit.register(close)
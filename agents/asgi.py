@@ -0,0 +1,457 @@
+import asyncio
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.responses import HTMLResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from agents import (admin, aiodb, alerts, cache, db, detect, fleet, history, metrics, partitions, realtime, reminders,
+                    respond, rollups, scoring, summary)
+from agents.records import RECORDS
+from agents.registry import registry
+
+# ========================
+# ⚡ ASYNC SERVING MODE
+# ========================
+# The agent API from agents/agents.py on an event loop: same routes, same
+# response bodies. Database calls go through asyncpg (agents/aiodb.py) and
+# model inference runs on a small thread pool so the loop never blocks on
+# CPU work. Launch with: python -m agents.serve --workers 4
+INFERENCE_THREADS = int(os.environ.get("ELDERLY_CARE_INFERENCE_THREADS", "2"))
+
+_inference = None
+
+
+class JSONResponse(Response):
+    # Byte-for-byte what the Flask app's jsonify sends (agents/respond.py)
+    media_type = 'application/json'
+
+    def render(self, content):
+        with metrics.span('serialize'):
+            return respond.dumps(content, newline=True)
+
+
+# Conditional GET as in agents/agents.py
+def fresh(request, tag):
+    return respond.matches(request.headers.get('if-none-match'), tag)
+
+
+def not_modified(tag):
+    return Response(status_code=304, headers={'ETag': tag, 'Cache-Control': 'no-cache'})
+
+
+def tagged(response, tag):
+    response.headers['ETag'] = tag
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+async def run_inference(fn, *args):
+    # bind() carries the request's route into the spans recorded on the pool thread
+    return await asyncio.get_running_loop().run_in_executor(_inference, metrics.bind(fn), *args)
+
+
+async def request_json(request):
+    # Like Flask's get_json(silent=True)
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+def _frame(columns, rows):
+    with metrics.span('dataframe'):
+        return pd.DataFrame([tuple(row) for row in rows], columns=columns)
+
+
+# ========================
+# 🤖 AGENTS
+# ========================
+AGENTS = {
+    'health': {
+        'list_key': 'health_monitoring',
+        'user_key': 'health_monitoring',
+        'not_found': "No health data found",
+        'fleet_filter': ('only_abnormal', 1),
+    },
+    'safety': {
+        'list_key': 'safety_monitoring',
+        'user_key': 'safety_monitoring',
+        'not_found': "No safety data found",
+        'fleet_filter': ('only_unsafe', 1),
+    },
+    'reminders': {
+        'list_key': 'reminder_monitoring',
+        'user_key': 'daily_reminders',
+        'not_found': "No reminders found",
+        'fleet_filter': ('only_unacknowledged', 0),
+    },
+}
+
+
+# Models are resolved on the inference threads, so a first-use load never blocks the loop
+def _predict_one(agent, data):
+    return scoring.predict_record(agent, data)
+
+
+def _predict_batch(agent, label, payload):
+    model = registry.get(agent)
+    df = scoring.batch_frame(payload)
+    predictions, probabilities = scoring.score_frame(model, scoring.model_inputs(model, df))
+    return [{
+        'user_id': user_id,
+        label: int(prediction),
+        'probability': round(float(probability), 4)
+    } for user_id, prediction, probability in zip(scoring.user_keys(df), predictions, probabilities)]
+
+
+def _predict_latest(agent, latest):
+    return scoring.predict_reading(agent, latest)
+
+
+def _score_latest(agent, latest):
+    return fleet.score_latest(agent, registry.get(agent), latest)
+
+
+def agent_routes(agent):
+    spec = AGENTS[agent]
+    table = fleet.TABLES[agent]
+    label = fleet.PREDICTION_LABELS[agent]
+    record = RECORDS[agent]
+
+    async def latest_readings(request):
+        _, rows = await aiodb.fetch(f"SELECT * FROM {table} ORDER BY timestamp DESC LIMIT 10;")
+        tag = respond.etag(table, tuple(tuple(row) for row in rows))
+        if fresh(request, tag):
+            return not_modified(tag)
+        return tagged(JSONResponse({spec['list_key']: [record(row) for row in rows]}), tag)
+
+    def reading_response(request, result):
+        tag = respond.etag(agent, result)
+        if fresh(request, tag):
+            return not_modified(tag)
+        return tagged(JSONResponse({spec['user_key']: result}), tag)
+
+    async def user_reading(request):
+        user_id = request.path_params['user_id']
+        cached = cache.latest.get(agent, user_id)
+        if cached is not None:
+            return reading_response(request, cached)
+        row = await aiodb.fetchrow(f"SELECT * FROM {table} WHERE user_id = %s ORDER BY timestamp DESC LIMIT 1;",
+                                   (user_id,))
+        if not row:
+            return JSONResponse({"error": spec['not_found']}, status_code=404)
+        result = record(row)
+        cache.latest.put(agent, user_id, result)
+        return reading_response(request, result)
+
+    async def predict(request):
+        try:
+            prediction = await run_inference(_predict_one, agent, await request_json(request))
+        except scoring.BatchError as e:
+            return JSONResponse({"error": str(e)}, status_code=e.status)
+        return JSONResponse({label: prediction})
+
+    async def batch_predict(request):
+        try:
+            result = await run_inference(_predict_batch, agent, label, await request_json(request))
+        except scoring.BatchError as e:
+            return JSONResponse({"error": str(e)}, status_code=e.status)
+        return JSONResponse({'count': len(result), 'predictions': result})
+
+    async def auto_predict(request):
+        data = await request_json(request)
+        if not isinstance(data, dict):
+            # Flask's get_json() answers a malformed body with 400 too
+            return JSONResponse({"error": "request body must be a JSON object"}, status_code=400)
+        user_id = data.get("user_id")
+        columns, rows = await aiodb.fetch(fleet.user_latest_query(agent), (user_id,))
+        if not rows:
+            return JSONResponse({"error": spec['not_found']}, status_code=404)
+        prediction = await run_inference(_predict_latest, agent, dict(zip(columns, rows[0])))
+        return JSONResponse({"user_id": user_id, label: prediction})
+
+    async def fleet_predict(request):
+        filter_name, keep_value = spec['fleet_filter']
+        options = dict(request.query_params)
+        if request.method == 'POST':
+            options.update(await request_json(request) or {})
+        only_flagged = str(options.get(filter_name, '')).lower() in ('1', 'true', 'yes')
+
+        columns, rows = await aiodb.fetch(fleet.fleet_latest_query(agent))
+        if not rows:
+            return Response('', media_type='application/x-ndjson')
+        scored = await run_inference(_score_latest, agent, _frame(columns, rows))
+        return StreamingResponse(fleet.iter_ndjson(scored, keep_value if only_flagged else None),
+                                 media_type='application/x-ndjson')
+
+    async def ingest(request):
+        batcher = realtime.batcher(agent)
+        try:
+            readings = realtime.readings_frame(agent, await request_json(request))
+            pending = batcher.submit(readings)
+        except scoring.BatchError as e:
+            return JSONResponse({"error": str(e)}, status_code=e.status)
+        except realtime.Backpressure as e:
+            return JSONResponse({"error": str(e)}, status_code=503,
+                                headers={'Retry-After': str(math.ceil(e.retry_after))})
+        if request.query_params.get('flush', '0') in ('1', 'true', 'yes'):
+            try:
+                await run_inference(batcher.flush)
+            except (db.PoolTimeout,) + db.DB_ERRORS as e:
+                return JSONResponse({"error": f"accepted but not yet written: {e}"}, status_code=503)
+            return JSONResponse({'accepted': len(readings), 'pending': 0}, status_code=201)
+        return JSONResponse({'accepted': len(readings), 'pending': pending}, status_code=202)
+
+    async def user_history(request):
+        user_id = request.path_params['user_id']
+        options = request.query_params
+        newest = await aiodb.fetchrow(history.newest_query(agent), (user_id, user_id))
+        tag = history.history_etag(agent, user_id, options, tuple(newest) if newest else None)
+        if fresh(request, tag):
+            return not_modified(tag)
+        latest = None
+        if not options.get('end'):
+            row = await aiodb.fetchrow(history.latest_query(agent), (user_id,))
+            latest = row[0] if row else None
+            if latest is None:
+                return JSONResponse({"error": spec['not_found']}, status_code=404)
+        try:
+            size, start, end, max_points = history.resolve_range(options, latest)
+        except scoring.BatchError as e:
+            return JSONResponse({"error": str(e)}, status_code=e.status)
+        _, rows = await aiodb.fetch(history.history_query(agent, size), (user_id, start, end))
+        if size not in rollups.ROLLUP_SIZES and partitions.overlaps(agent, start, end):
+            rows = await run_inference(history.with_archive, agent, user_id, size, start, end, rows)
+        result = await run_inference(history.build_history, agent, user_id, size, start, end, rows, max_points)
+        return tagged(JSONResponse(result), tag)
+
+    return [
+        Route(f'/{agent}', latest_readings, methods=['GET']),
+        Route(f'/{agent}/user/{{user_id}}', user_reading, methods=['GET']),
+        Route(f'/{agent}/predict', predict, methods=['POST']),
+        Route(f'/{agent}/batch_predict', batch_predict, methods=['POST']),
+        Route(f'/{agent}/auto_predict', auto_predict, methods=['POST']),
+        Route(f'/{agent}/fleet_predict', fleet_predict, methods=['GET', 'POST']),
+        Route(f'/{agent}/ingest', ingest, methods=['POST']),
+        Route(f'/{agent}/history/{{user_id}}', user_history, methods=['GET']),
+    ]
+
+
+# ========================
+# 👤 USER SUMMARY
+# ========================
+async def _summaries(user_ids, predict):
+    # One query on the pool; rows become records (and predictions) on the inference threads
+    _, rows = await aiodb.fetch(summary.summary_query(len(user_ids), predict), tuple(user_ids))
+    return await run_inference(summary.build_summaries, user_ids, rows, predict)
+
+
+async def user_summary(request):
+    user_id = request.path_params['user_id']
+    predict = summary.wants_predictions(request.query_params)
+    newest = tuple(await aiodb.fetchrow(summary.NEWEST_QUERY, summary.newest_params(user_id)))
+    if not summary.has_data(newest):
+        return JSONResponse({"error": "No data found for user"}, status_code=404)
+    # On the inference threads: the first predict=1 request may load the models
+    tag = await run_inference(summary.summary_etag, user_id, newest, predict)
+    if fresh(request, tag):
+        return not_modified(tag)
+    result = (await _summaries([user_id], predict))[0]
+    return tagged(JSONResponse(result), tag)
+
+
+async def users_summary(request):
+    data = await request_json(request) or {}
+    try:
+        user_ids = summary.unique_ids(data.get('user_ids'))
+    except scoring.BatchError as e:
+        return JSONResponse({"error": str(e)}, status_code=e.status)
+    result = await _summaries(user_ids, summary.wants_predictions(data))
+    return JSONResponse({'count': len(result), 'summaries': result})
+
+
+# ========================
+# 🏠 SERVICE ROUTES
+# ========================
+async def home(request):
+    return HTMLResponse("👵👴 Welcome to Unified Elderly Care System API")
+
+
+async def db_stats(request):
+    return JSONResponse({'pool': aiodb.stats()})
+
+
+async def metrics_export(request):
+    return Response(metrics.render(pool=aiodb.stats()), media_type=metrics.CONTENT_TYPE)
+
+
+async def debug_slow_queries(request):
+    try:
+        limit = max(1, int(request.query_params.get('limit', 100)))
+    except ValueError:
+        return JSONResponse({"error": "limit must be a positive integer"}, status_code=400)
+    return JSONResponse({'threshold_ms': 1000 * metrics.SLOW_QUERY_SECONDS, 'slow_queries': metrics.slow_queries(limit)})
+
+
+async def debug_profile(request):
+    if not metrics.PROFILING:
+        return JSONResponse({"error": "profiling is off; start with ELDERLY_CARE_PROFILING=1"}, status_code=404)
+    try:
+        seconds = float(request.query_params.get('seconds', 5))
+    except ValueError:
+        return JSONResponse({"error": "seconds must be a number"}, status_code=400)
+    sampler = await asyncio.get_running_loop().run_in_executor(None, metrics.profile_window, seconds)
+    return PlainTextResponse(sampler.folded())
+
+
+async def debug_request_profile(request):
+    profile_id = request.path_params['profile_id']
+    kept = metrics.get_profile(profile_id)
+    if kept is None:
+        return JSONResponse({"error": f"no profile {profile_id}"}, status_code=404)
+    return PlainTextResponse(kept[1], headers={'X-Profile-Route': kept[0]})
+
+
+async def cache_stats(request):
+    return JSONResponse({'latest_reading_cache': cache.latest.stats()})
+
+
+async def ingest_stats(request):
+    return JSONResponse({'ingest': realtime.stats()})
+
+
+async def detect_events(request):
+    options = request.query_params
+    try:
+        limit = max(1, int(options.get('limit', 100)))
+    except ValueError:
+        return JSONResponse({"error": "limit must be a positive integer"}, status_code=400)
+    events = detect.recent_events(options.get('agent'), options.get('user_id'), limit)
+    return JSONResponse({'count': len(events), 'events': events})
+
+
+async def detect_stats(request):
+    return JSONResponse({'detectors': detect.stats()})
+
+
+async def alerts_list(request):
+    options = request.query_params
+    try:
+        limit = max(1, int(options.get('limit', 100)))
+    except ValueError:
+        return JSONResponse({"error": "limit must be a positive integer"}, status_code=400)
+    queued = await run_inference(alerts.recent, options.get('status'), options.get('user_id'), limit)
+    return JSONResponse({'count': len(queued), 'alerts': queued})
+
+
+async def alerts_stats(request):
+    return JSONResponse({'alerts': await run_inference(alerts.stats)})
+
+
+async def reminders_scheduler(request):
+    return JSONResponse({'scheduler': await run_inference(reminders.stats)})
+
+
+async def models_status(request):
+    return JSONResponse(registry.status())
+
+
+async def models_reload(request):
+    if not admin.allowed(request.headers.get('authorization'), request.client.host if request.client else None):
+        return JSONResponse({"error": "admin token required"}, status_code=403)
+    data = await request_json(request) or {}
+    agents = [data['agent']] if data.get('agent') else list(registry.files)
+    unknown = [agent for agent in agents if agent not in registry.files]
+    if unknown:
+        return JSONResponse({"error": f"unknown agent: {', '.join(unknown)}"}, status_code=404)
+    try:
+        path = registry.resolve(data['path']) if data.get('path') is not None else None
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    try:
+        for agent in agents:
+            await run_inference(registry.load, agent, path)
+    except (OSError, ValueError) as e:
+        return JSONResponse({"error": str(e)}, status_code=409)
+    return JSONResponse(registry.status())
+
+
+async def models_warm_up(request):
+    timings = await run_inference(registry.warm_up)
+    return JSONResponse({'warmup_ms': timings, 'models': registry.status()['models']})
+
+
+async def cache_invalidate(request):
+    data = await request_json(request) or {}
+    agents = [data['agent']] if data.get('agent') else list(fleet.TABLES)
+    if data.get('user_ids'):
+        for agent in agents:
+            cache.latest.invalidate(agent, data['user_ids'])
+    else:
+        cache.latest.clear()
+    return JSONResponse({'latest_reading_cache': cache.latest.stats()})
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global _inference
+    _inference = ThreadPoolExecutor(max_workers=INFERENCE_THREADS, thread_name_prefix='inference')
+    await aiodb.init()
+    # Loads the schedules on its own thread; startup does not wait for it
+    reminders.start()
+    # Readings spilled by the last shutdown are recovered on their flusher threads
+    realtime.start()
+    try:
+        yield
+    finally:
+        # Buffered readings are written before the pools go away
+        await asyncio.get_running_loop().run_in_executor(None, realtime.close_all)
+        await asyncio.get_running_loop().run_in_executor(None, reminders.close)
+        # ...and the alerts they raised are sent or left in the queue file
+        await asyncio.get_running_loop().run_in_executor(None, alerts.close)
+        await aiodb.close()
+        _inference.shutdown(wait=True)
+
+
+routes = [
+    Route('/', home),
+    Route('/db/stats', db_stats, methods=['GET']),
+    Route('/metrics', metrics_export, methods=['GET']),
+    Route('/debug/slow_queries', debug_slow_queries, methods=['GET']),
+    Route('/debug/profile', debug_profile, methods=['GET']),
+    Route('/debug/profile/{profile_id:int}', debug_request_profile, methods=['GET']),
+    Route('/cache/stats', cache_stats, methods=['GET']),
+    Route('/cache/invalidate', cache_invalidate, methods=['POST']),
+    Route('/ingest/stats', ingest_stats, methods=['GET']),
+    Route('/detect/events', detect_events, methods=['GET']),
+    Route('/detect/stats', detect_stats, methods=['GET']),
+    Route('/alerts', alerts_list, methods=['GET']),
+    Route('/alerts/stats', alerts_stats, methods=['GET']),
+    Route('/reminders/scheduler', reminders_scheduler, methods=['GET']),
+    Route('/models', models_status, methods=['GET']),
+    Route('/models/reload', models_reload, methods=['POST']),
+    Route('/models/warm_up', models_warm_up, methods=['POST']),
+    Route('/user/{user_id}/summary', user_summary, methods=['GET']),
+    Route('/users/summary', users_summary, methods=['POST']),
+]
+for _agent in AGENTS:
+    routes += agent_routes(_agent)
+
+
+_route_paths = {route.endpoint: route.path for route in routes}
+
+
+def _route_of(scope):
+    # The route template for metric labels, from the endpoint the router picked
+    return _route_paths.get(scope.get('endpoint'), 'unmatched')
+
+
+# Outermost first: compression runs inside the measured request
+app = Starlette(routes=routes, lifespan=lifespan,
+                middleware=[Middleware(metrics.ASGIMiddleware, resolve=_route_of), Middleware(respond.ASGICompression)])
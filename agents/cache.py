@@ -0,0 +1,81 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# ========================
+# 🗃️ LATEST-READING CACHE
+# ========================
+# In-process LRU keyed by (agent, user_id) with a TTL. Each API worker keeps
+# its own copy; ingestion paths call invalidate() for the users they write and
+# the TTL bounds staleness for writes made by other processes.
+CACHE_SIZE = int(os.environ.get("ELDERLY_CARE_CACHE_SIZE", "10000"))
+CACHE_TTL = float(os.environ.get("ELDERLY_CARE_CACHE_TTL", "30"))
+
+
+class LatestReadingCache:
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()   # (agent, user_id) -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, agent, user_id):
+        key = (agent, user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, agent, user_id, value):
+        if self.maxsize <= 0:
+            return
+        key = (agent, user_id)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, agent, user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                if self._entries.pop((agent, user_id), None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
+
+
+latest = LatestReadingCache()
@@ -0,0 +1,92 @@
+"""Compiled inference: score plain dicts and arrays without pandas or sklearn.
+
+The fitted parameters of each model (and of a StandardScaler in front of it,
+when the model is a Pipeline) are copied out once at load time. One record is
+then scored in pure Python in a few microseconds; arrays go through NumPy.
+tests/test_compiled.py checks both against model.predict / predict_proba on
+every row of cleaned_data/*.csv.
+"""
+import math
+
+import numpy as np
+
+
+class CompiledLogistic:
+    """Binary logistic regression (or log-loss SGD), optionally behind a StandardScaler."""
+
+    def __init__(self, coef, intercept, classes, feature_names, mean=None, scale=None):
+        self.coef = [float(w) for w in coef]
+        self.intercept = float(intercept)
+        self.classes = [c.item() if hasattr(c, 'item') else c for c in classes]
+        self.feature_names = list(feature_names)
+        self.mean = [float(m) for m in mean] if mean is not None else None
+        self.scale = [float(s) for s in scale] if scale is not None else None
+        self._coef = np.asarray(self.coef)
+        self._mean = np.asarray(self.mean) if mean is not None else None
+        self._scale = np.asarray(self.scale) if scale is not None else None
+        # Dict lookups unrolled into one list of (name, weight, mean, scale)
+        self._terms = list(zip(self.feature_names, self.coef,
+                               self.mean or [0.0] * len(self.coef),
+                               self.scale or [1.0] * len(self.coef)))
+
+    # sklearn: z = X @ coef + intercept; class 1 iff z > 0; p = 1 / (1 + e^-z)
+    def decision_one(self, record):
+        z = self.intercept
+        for name, weight, mean, scale in self._terms:
+            z += weight * ((float(record[name]) - mean) / scale)
+        return z
+
+    def predict_one(self, record):
+        return self.classes[1] if self.decision_one(record) > 0 else self.classes[0]
+
+    def predict_proba_one(self, record):
+        z = self.decision_one(record)
+        p = 1.0 / (1.0 + math.exp(-z)) if z > -709 else 0.0
+        return (self.classes[1] if z > 0 else self.classes[0]), p
+
+    def decision(self, X):
+        X = np.asarray(X, dtype=float)
+        if self._mean is not None:
+            X = X - self._mean
+        if self._scale is not None:
+            X = X / self._scale
+        return X @ self._coef + self.intercept
+
+    def predict(self, X):
+        return np.where(self.decision(X) > 0, self.classes[1], self.classes[0])
+
+    def predict_proba(self, X):
+        # Positive-class probability, as scoring.score_frame returns it
+        return 1.0 / (1.0 + np.exp(-self.decision(X)))
+
+
+def compile_model(model, feature_names=None):
+    # Returns None for anything the fast path does not cover; callers fall back to sklearn
+    scaler = None
+    steps = getattr(model, 'steps', None)
+    if steps is not None:
+        if len(steps) > 2:
+            return None
+        if len(steps) == 2:
+            scaler = steps[0][1]
+            if type(scaler).__name__ != 'StandardScaler':
+                return None
+        model = steps[-1][1]
+
+    # SGDClassifier with log loss scores exactly like a logistic regression
+    linear = type(model).__name__ == 'LogisticRegression' or (
+        type(model).__name__ == 'SGDClassifier' and getattr(model, 'loss', None) == 'log_loss')
+    if not linear or len(getattr(model, 'classes_', [])) != 2:
+        return None
+    names = getattr(model, 'feature_names_in_', None)
+    if names is None and scaler is not None:
+        names = getattr(scaler, 'feature_names_in_', None)
+    names = list(names) if names is not None else feature_names
+    if names is None or len(names) != model.coef_.shape[1]:
+        return None
+    return CompiledLogistic(model.coef_[0], model.intercept_[0], model.classes_, names,
+                            mean=getattr(scaler, 'mean_', None), scale=getattr(scaler, 'scale_', None))
+
+
+# Label each agent's StandardScaler pipeline is fitted to (agents/train.py, tests/test_compiled.py)
+PIPELINE_TARGETS = {'health': 'alert_triggered', 'safety': 'alert_triggered', 'reminders': 'acknowledged'}
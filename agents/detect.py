@@ -0,0 +1,329 @@
+import math
+import os
+import sys
+import threading
+import time
+from array import array
+from collections import deque
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# ========================
+# 🚨 STREAMING DETECTION
+# ========================
+# Readings are judged against each resident's recent history as they arrive
+# through /<agent>/ingest, not one at a time. Every resident gets a fixed-size
+# slot in flat arrays shared by all residents: a ring of the last WINDOW
+# values of each vital with running sums, so the rolling mean and variance
+# cost O(1) per reading and a resident's memory never grows.
+ENABLED = os.environ.get("ELDERLY_CARE_DETECT", "1") not in ('0', 'false', 'no')
+WINDOW = int(os.environ.get("ELDERLY_CARE_DETECT_WINDOW", "12"))
+# Readings needed before the rolling rules speak
+MIN_READINGS = 3
+# A longer silence starts a resident's window over
+MAX_GAP_SECONDS = int(os.environ.get("ELDERLY_CARE_DETECT_MAX_GAP", str(6 * 3600)))
+# A reading this many standard deviations from the window mean is a spike
+SPIKE_Z = 3.0
+# Events kept in memory for GET /detect/events
+RECENT_EVENTS = int(os.environ.get("ELDERLY_CARE_DETECT_RECENT", "1000"))
+
+# Health vitals: bounds on the rolling mean (the datasets' alert thresholds)
+# and the smallest spread a spike is measured against
+VITALS = {
+    'heart_rate': {'low': 60, 'high': 100, 'min_std': 3.0},
+    'systolic_bp': {'low': 90, 'high': 130, 'min_std': 4.0},
+    'diastolic_bp': {'low': None, 'high': 85, 'min_std': 3.0},
+    'glucose_level': {'low': 80, 'high': 140, 'min_std': 5.0},
+    'spo2': {'low': 92, 'high': None, 'min_std': 1.0},
+}
+
+# Safety: a fall followed by this long without moving, in the fall reading
+# itself or in still readings within FALL_FOLLOW_UP_SECONDS of it
+FALL_INACTIVITY_SECONDS = int(os.environ.get("ELDERLY_CARE_FALL_INACTIVITY", "120"))
+FALL_FOLLOW_UP_SECONDS = 15 * 60
+STILL_ACTIVITIES = ['No Movement', 'Lying']
+# REPEATED_FALLS falls within REPEATED_FALLS_SECONDS
+REPEATED_FALLS = 2
+REPEATED_FALLS_SECONDS = 24 * 3600
+
+CRITICAL_RULES = {'spo2_low', 'fall_inactive', 'repeated_falls'}
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+EPOCH = datetime(1970, 1, 1)
+
+
+class Detector:
+    # Slot bookkeeping shared by the agents; subclasses keep their state in
+    # flat arrays, grow them in _grow() and judge one reading in _update()
+    columns = []
+
+    def __init__(self, agent):
+        self.agent = agent
+        self.slots = {}
+        self.last_seen = array('q')
+        self.lock = threading.Lock()
+        self.readings = 0
+        self.late = 0
+        self.skipped = 0
+        self.events = 0
+        self.by_rule = {}
+        self.busy = 0.0
+
+    def _values(self, frame):
+        # Column by column: for frames of a few hundred rows, frame[list] costs more than the detection
+        return np.column_stack([frame[column].to_numpy(dtype=float) for column in self.columns])
+
+    def process(self, frame):
+        # Readings in arrival order (realtime.readings_frame or cleaned_data rows); returns the events raised
+        if frame.empty:
+            return []
+        values = self._values(frame)
+        complete = ~np.isnan(values).any(axis=1)
+        times = frame['timestamp']
+        if not pd.api.types.is_datetime64_any_dtype(times):
+            times = pd.to_datetime(times)
+        times = times.to_numpy('datetime64[s]').astype('int64')[complete].tolist()
+        users = frame['user_id'].to_numpy(dtype=object)[complete].tolist()
+        values = values[complete].tolist()
+        with self.lock:
+            start = time.perf_counter()
+            self.skipped += len(complete) - len(users)
+            events = self._run(users, times, values)
+            self.busy += time.perf_counter() - start
+        return events
+
+    def _run(self, users, times, values):
+        slots, last_seen, update = self.slots, self.last_seen, self._update
+        events = []
+        for user_id, t, row in zip(users, times, values):
+            slot = slots.get(user_id)
+            if slot is None:
+                slot = slots[user_id] = len(slots)
+                last_seen.append(t)
+                self._grow()
+            last = last_seen[slot]
+            if t < last:
+                # Older than what the window already holds
+                self.late += 1
+                continue
+            last_seen[slot] = t
+            found = update(slot, t, row, t - last > MAX_GAP_SECONDS)
+            if found:
+                when = (EPOCH + timedelta(seconds=t)).strftime(TIMESTAMP_FORMAT)
+                for rule, value, detail in found:
+                    events.append(dict({
+                        'agent': self.agent, 'user_id': user_id, 'timestamp': when, 'rule': rule,
+                        'severity': 'critical' if rule in CRITICAL_RULES else 'warning', 'value': value,
+                    }, **detail))
+                    self.by_rule[rule] = self.by_rule.get(rule, 0) + 1
+        self.readings += len(users)
+        self.events += len(events)
+        return events
+
+    def _state(self):
+        return [self.last_seen]
+
+    def memory_bytes(self):
+        arrays = sum(len(a) * (a.itemsize if isinstance(a, array) else 1) for a in self._state())
+        return arrays + sys.getsizeof(self.slots) + sum(sys.getsizeof(user_id) for user_id in self.slots)
+
+    def stats(self):
+        with self.lock:
+            residents = len(self.slots)
+            memory = self.memory_bytes()
+            return {
+                'residents': residents,
+                'readings': self.readings,
+                'late': self.late,
+                'skipped': self.skipped,
+                'events': self.events,
+                'events_by_rule': dict(self.by_rule),
+                'busy_seconds': round(self.busy, 3),
+                'us_per_reading': round(1e6 * self.busy / self.readings, 2) if self.readings else None,
+                'memory_bytes': memory,
+                'bytes_per_resident': round(memory / residents) if residents else None,
+            }
+
+
+class HealthDetector(Detector):
+    # Per vital: sustained rolling mean outside its bounds (raised once, until
+    # the mean comes back) and single-reading spikes against the window
+    columns = list(VITALS)
+
+    def __init__(self, window=WINDOW):
+        super().__init__('health')
+        self.window = window
+        # (low, high, smallest variance, rule names) per vital; a missing bound never trips
+        self.specs = [(-math.inf if spec['low'] is None else spec['low'],
+                       math.inf if spec['high'] is None else spec['high'],
+                       spec['min_std'] ** 2, (f'{name}_spike', f'{name}_low', f'{name}_high'))
+                      for name, spec in VITALS.items()]
+        self.ring = array('f')       # slot * vitals * window values
+        self.total = array('d')      # running sum and sum of squares per slot and vital
+        self.squares = array('d')
+        self.alarm = bytearray()     # 0 in range, 1 low, 2 high
+        self.head = array('H')       # next ring position per slot
+        self.count = array('H')      # values in the window per slot
+
+    def _grow(self):
+        vitals = len(self.columns)
+        self.ring.frombytes(bytes(self.ring.itemsize * vitals * self.window))
+        self.total.frombytes(bytes(self.total.itemsize * vitals))
+        self.squares.frombytes(bytes(self.squares.itemsize * vitals))
+        self.alarm.extend(bytes(vitals))
+        self.head.append(0)
+        self.count.append(0)
+
+    def _state(self):
+        return [self.last_seen, self.ring, self.total, self.squares, self.alarm, self.head, self.count]
+
+    def _update(self, slot, t, row, gap):
+        window, ring, total, squares, alarm = self.window, self.ring, self.total, self.squares, self.alarm
+        base = slot * len(row)
+        if gap:
+            self.head[slot] = self.count[slot] = 0
+            for i in range(base, base + len(row)):
+                total[i] = squares[i] = 0.0
+                alarm[i] = 0
+        n, h = self.count[slot], self.head[slot]
+        m = n if n == window else n + 1
+        spike_z2 = SPIKE_Z * SPIKE_Z
+        found = []
+        i = base
+        for x, (low, high, min_var, rules) in zip(row, self.specs):
+            s, q = total[i], squares[i]
+            if n >= MIN_READINGS:
+                # Compared squared: (x - mean)^2 > z^2 * variance, no square root per reading.
+                # The margin keeps readings exactly SPIKE_Z deviations out from flipping on float noise.
+                mean = s / n
+                if (x - mean) ** 2 > spike_z2 * max(q / n - mean * mean, min_var) + 1e-9:
+                    found.append((rules[0], x, {'window_mean': round(mean, 2), 'readings': n}))
+            r = i * window + h
+            if n == window:
+                old = ring[r]
+                s, q = s - old, q - old * old
+            ring[r] = x
+            x = ring[r]   # as stored (float32), so the sums match the ring exactly
+            s, q = s + x, q + x * x
+            if h == window - 1:
+                # Once per lap, drop the rounding the add/subtract updates have collected
+                values = ring[i * window:i * window + window]
+                s, q = sum(values), sum(y * y for y in values)
+            total[i], squares[i] = s, q
+            if m >= MIN_READINGS:
+                mean = s / m
+                state = 1 if mean < low else 2 if mean > high else 0
+                if state != alarm[i]:
+                    alarm[i] = state
+                    if state:
+                        found.append((rules[state], x, {'window_mean': round(mean, 2), 'readings': m}))
+            i += 1
+        self.head[slot] = (h + 1) % window
+        self.count[slot] = m
+        return found
+
+
+class SafetyDetector(Detector):
+    # A fall followed by inactivity, and repeated falls within a day
+    columns = ['fall_detected', 'post_fall_inactivity_duration', 'still']
+    NO_FALL = -1 << 62
+
+    def __init__(self):
+        super().__init__('safety')
+        self.keep = max(1, REPEATED_FALLS - 1)
+        self.falls = array('q')      # slot * keep most recent fall times
+        self.fall_head = array('B')
+        self.fall_count = array('B')
+        self.pending = array('q')    # time of a fall still awaiting its follow-up readings
+
+    def _values(self, frame):
+        still = np.isin(frame['movement_activity'].to_numpy(dtype=object), STILL_ACTIVITIES)
+        return np.column_stack([frame[column].to_numpy(dtype=float) for column in self.columns[:2]] + [still])
+
+    def _grow(self):
+        self.falls.frombytes(bytes(self.falls.itemsize * self.keep))
+        self.fall_head.append(0)
+        self.fall_count.append(0)
+        self.pending.append(self.NO_FALL)
+
+    def _state(self):
+        return [self.last_seen, self.falls, self.fall_head, self.fall_count, self.pending]
+
+    def _update(self, slot, t, row, gap):
+        fall, inactivity, still = row
+        found = []
+        pending = self.pending[slot]
+        if fall:
+            base, h, c = slot * self.keep, self.fall_head[slot], self.fall_count[slot]
+            if c == self.keep and t - self.falls[base + h] <= REPEATED_FALLS_SECONDS:
+                found.append(('repeated_falls', REPEATED_FALLS,
+                              {'window_seconds': t - self.falls[base + h]}))
+            self.falls[base + h] = t
+            self.fall_head[slot] = (h + 1) % self.keep
+            self.fall_count[slot] = min(c + 1, self.keep)
+            pending = t
+            down = inactivity
+        elif pending != self.NO_FALL and still and t - pending <= FALL_FOLLOW_UP_SECONDS:
+            down = t - pending + inactivity
+        else:
+            pending = down = self.NO_FALL
+        if pending != self.NO_FALL and down >= FALL_INACTIVITY_SECONDS:
+            fall_at = (EPOCH + timedelta(seconds=pending)).strftime(TIMESTAMP_FORMAT)
+            found.append(('fall_inactive', int(down), {'fall_at': fall_at}))
+            pending = self.NO_FALL
+        self.pending[slot] = pending
+        return found
+
+
+# ========================
+# 🔌 SHARED DETECTORS
+# ========================
+DETECTORS = {
+    'health': HealthDetector,
+    'safety': SafetyDetector,
+}
+_detectors = {}
+_detectors_lock = threading.Lock()
+_listeners = []
+recent = deque(maxlen=RECENT_EVENTS)
+_recent_lock = threading.Lock()   # ingest threads append while requests read
+
+
+def detector(agent):
+    with _detectors_lock:
+        if agent not in _detectors:
+            _detectors[agent] = DETECTORS[agent]()
+        return _detectors[agent]
+
+
+def subscribe(listener):
+    # listener(events) is called with every non-empty list of new events
+    _listeners.append(listener)
+
+
+def process(agent, frame):
+    if not ENABLED or agent not in DETECTORS:
+        return []
+    events = detector(agent).process(frame)
+    if events:
+        with _recent_lock:
+            recent.extend(events)
+        for listener in _listeners:
+            listener(events)
+    return events
+
+
+def recent_events(agent=None, user_id=None, limit=100):
+    # Newest first, filtered outside the lock on a snapshot
+    with _recent_lock:
+        snapshot = list(recent)
+    events = [e for e in reversed(snapshot) if (agent is None or e['agent'] == agent)
+              and (user_id is None or e['user_id'] == user_id)]
+    return events[:limit]
+
+
+def stats():
+    with _detectors_lock:
+        detectors = dict(_detectors)
+    return {agent: d.stats() for agent, d in detectors.items()}
@@ -0,0 +1,127 @@
+from datetime import datetime
+
+import pandas as pd
+
+# ========================
+# 🧬 MODEL INPUTS
+# ========================
+# Mirrors the feature engineering in the *_model_training notebooks so data
+# coming from cleaned_data/ or the database can be scored by models/*.pkl.
+
+# LabelEncoder classes as fitted in the notebooks (sorted alphabetically)
+MOVEMENT_ACTIVITIES = ['Lying', 'No Movement', 'Sitting', 'Walking']
+LOCATIONS = ['Bathroom', 'Bedroom', 'Kitchen', 'Living Room']
+REMINDER_TYPES = ['Appointment', 'Exercise', 'Hydration', 'Medication']
+
+HEALTH_FEATURES = ['heart_rate', 'hr_alert', 'bp_alert', 'glucose_level', 'glucose_alert',
+                   'spo2', 'spo2_alert', 'systolic_bp', 'diastolic_bp', 'hour', 'day_of_week', 'month']
+SAFETY_FEATURES = ['movement_activity', 'fall_detected', 'post_fall_inactivity_duration',
+                   'location', 'hour', 'day_of_week', 'month']
+REMINDER_FEATURES = ['reminder_sent', 'reminder_type_encoded']
+
+# Table columns each agent reads to build its model inputs
+SOURCE_COLUMNS = {
+    'health': ['timestamp', 'heart_rate', 'hr_alert', 'bp_alert', 'glucose_level', 'glucose_alert',
+               'spo2', 'spo2_alert', 'bp_systolic', 'bp_diastolic'],
+    'safety': ['timestamp', 'event_type', 'fall_detected', 'post_fall_inactivity_duration', 'location'],
+    'reminders': ['reminder_type', 'reminder_sent'],
+}
+# Table column names that differ from the cleaned_data CSVs the models were trained on
+DB_RENAMES = {
+    'bp_systolic': 'systolic_bp',
+    'bp_diastolic': 'diastolic_bp',
+    'event_type': 'movement_activity',
+}
+
+
+def _encode(series, classes):
+    return series.map({name: code for code, name in enumerate(classes)})
+
+
+def _time_parts(df, out):
+    ts = pd.to_datetime(df['timestamp'])
+    out['hour'] = ts.dt.hour
+    out['day_of_week'] = ts.dt.dayofweek
+    out['month'] = ts.dt.month
+
+
+def health_features(df):
+    out = pd.DataFrame(index=df.index)
+    for col in HEALTH_FEATURES[:9]:
+        out[col] = df[col]
+    _time_parts(df, out)
+    return out[HEALTH_FEATURES]
+
+
+def safety_features(df):
+    out = pd.DataFrame(index=df.index)
+    out['movement_activity'] = _encode(df['movement_activity'], MOVEMENT_ACTIVITIES)
+    out['fall_detected'] = df['fall_detected'].astype(int)
+    out['post_fall_inactivity_duration'] = df['post_fall_inactivity_duration']
+    out['location'] = _encode(df['location'], LOCATIONS)
+    _time_parts(df, out)
+    return out[SAFETY_FEATURES]
+
+
+def reminder_features(df):
+    out = pd.DataFrame(index=df.index)
+    out['reminder_sent'] = df['reminder_sent'].astype(int)
+    out['reminder_type_encoded'] = _encode(df['reminder_type'], REMINDER_TYPES)
+    return out[REMINDER_FEATURES]
+
+
+FEATURE_BUILDERS = {
+    'health': health_features,
+    'safety': safety_features,
+    'reminders': reminder_features,
+}
+
+
+def build_features(agent, df):
+    return FEATURE_BUILDERS[agent](df)
+
+
+def features_from_db(agent, df):
+    return build_features(agent, df.rename(columns=DB_RENAMES))
+
+
+# ========================
+# ⚡ SINGLE-RECORD FEATURES
+# ========================
+# Pure-Python twins of the builders above for one dict (cleaned_data or table
+# column names), used by the compiled fast path in agents/compiled.py.
+_INDEX = {
+    'movement_activity': {name: code for code, name in enumerate(MOVEMENT_ACTIVITIES)},
+    'location': {name: code for code, name in enumerate(LOCATIONS)},
+    'reminder_type': {name: code for code, name in enumerate(REMINDER_TYPES)},
+}
+_DB_NAMES = {cleaned: db_name for db_name, cleaned in DB_RENAMES.items()}
+
+
+def _time_fields(value, out):
+    ts = value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+    out['hour'] = ts.hour
+    out['day_of_week'] = ts.weekday()
+    out['month'] = ts.month
+
+
+def record_features(agent, record):
+    def get(col):
+        return record[col] if col in record else record[_DB_NAMES[col]]
+
+    out = {}
+    if agent == 'health':
+        for col in HEALTH_FEATURES[:9]:
+            out[col] = get(col)
+        _time_fields(get('timestamp'), out)
+    elif agent == 'safety':
+        out['movement_activity'] = _INDEX['movement_activity'][get('movement_activity')]
+        out['fall_detected'] = int(get('fall_detected'))
+        out['post_fall_inactivity_duration'] = get('post_fall_inactivity_duration')
+        out['location'] = _INDEX['location'][get('location')]
+        _time_fields(get('timestamp'), out)
+    else:
+        out['reminder_sent'] = int(get('reminder_sent'))
+        out['reminder_type_encoded'] = _INDEX['reminder_type'][get('reminder_type')]
+    return out
+
@@ -0,0 +1,107 @@
+
+import pandas as pd
+
+from agents import db, metrics, respond, scoring
+from agents.features import SOURCE_COLUMNS, features_from_db
+
+# ========================
+# 🛰️ LATEST READINGS
+# ========================
+TABLES = {
+    'health': 'health_monitoring',
+    'safety': 'safety_monitoring',
+    'reminders': 'daily_reminder',
+}
+# Extra row filters an agent applies before picking the latest reading
+LATEST_FILTERS = {
+    'reminders': "reminder_sent = TRUE",
+}
+PREDICTION_LABELS = {
+    'health': 'abnormal_prediction',
+    'safety': 'unsafe_prediction',
+    'reminders': 'acknowledged_prediction',
+}
+
+
+def _select(agent):
+    return ', '.join(['user_id'] + SOURCE_COLUMNS[agent])
+
+
+def user_latest_query(agent):
+    where = ' AND '.join(['user_id = %s'] + ([LATEST_FILTERS[agent]] if agent in LATEST_FILTERS else []))
+    return f"""
+        SELECT {_select(agent)}
+        FROM {TABLES[agent]}
+        WHERE {where}
+        ORDER BY timestamp DESC LIMIT 1;
+    """
+
+
+def fleet_latest_query(agent):
+    # One set-based pass: newest row per user via a window over (user_id, timestamp DESC)
+    where = f"WHERE {LATEST_FILTERS[agent]}" if agent in LATEST_FILTERS else ""
+    return f"""
+        SELECT {_select(agent)}
+        FROM (
+            SELECT {_select(agent)},
+                   ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY timestamp DESC) AS rn
+            FROM {TABLES[agent]}
+            {where}
+        ) latest
+        WHERE rn = 1
+        ORDER BY user_id;
+    """
+
+
+def _frame(cur, rows):
+    with metrics.span('dataframe'):
+        return pd.DataFrame(rows, columns=[desc[0] for desc in cur.description])
+
+
+def fetch_user_latest(agent, user_id):
+    with db.cursor() as cur:
+        cur.execute(user_latest_query(agent), (user_id,))
+        rows = cur.fetchall()
+        return _frame(cur, rows)
+
+
+def fetch_user_latest_record(agent, user_id):
+    # Same query as fetch_user_latest, as one plain dict (or None) for the single-record path
+    with db.cursor() as cur:
+        cur.execute(user_latest_query(agent), (user_id,))
+        row = cur.fetchone()
+        return dict(zip([desc[0] for desc in cur.description], row)) if row else None
+
+
+def fetch_fleet_latest(agent):
+    with db.cursor() as cur:
+        cur.execute(fleet_latest_query(agent))
+        rows = cur.fetchall()
+        return _frame(cur, rows)
+
+
+def score_latest(agent, model, latest):
+    # One vectorized model call for every row in `latest`
+    with metrics.span('dataframe'):
+        features = scoring.model_inputs(model, features_from_db(agent, latest))
+    predictions, probabilities = scoring.score_frame(model, features)
+    scored = pd.DataFrame({
+        'user_id': latest['user_id'].to_numpy(),
+        PREDICTION_LABELS[agent]: predictions.astype(int),
+        'probability': probabilities.round(4),
+    })
+    if 'timestamp' in latest.columns:
+        scored.insert(1, 'timestamp', pd.to_datetime(latest['timestamp']).to_numpy())
+    return scored
+
+
+def iter_ndjson(scored, keep=None, chunk_rows=1000):
+    # Newline-delimited JSON in chunks; `keep` limits output to one predicted class
+    if keep is not None:
+        label = next(col for col in scored.columns if col.endswith('_prediction'))
+        scored = scored[scored[label] == keep]
+    records = scored.to_dict(orient='records')
+    for start in range(0, len(records), chunk_rows):
+        with metrics.span('serialize'):
+            chunk = b''.join(respond.dumps(rec, newline=True) for rec in records[start:start + chunk_rows])
+        yield chunk
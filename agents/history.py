@@ -0,0 +1,234 @@
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from agents import db, fleet, partitions, respond, rollups
+from agents.scoring import BatchError
+
+# ========================
+# 📈 HISTORY
+# ========================
+# GET /<agent>/history/<user_id>?start=...&end=...&bucket=1h&max_points=500
+# Per-bucket min/mean/max of each vital and counts of alerts/falls/reminders.
+# 1h and 1d buckets are read from the rollup tables (agents/rollups.py), so a
+# 90-day chart costs the same however many raw readings sit behind it; 1m
+# buckets are aggregated from the raw readings for short ranges, including
+# readings already moved to archive/ (agents/partitions.py).
+DEFAULT_DAYS = 30
+# Buckets one response may aggregate before downsampling
+MAX_BUCKETS = int(os.environ.get("ELDERLY_CARE_HISTORY_MAX_BUCKETS", "10000"))
+# bucket=auto picks the finest size that stays under this many buckets
+AUTO_BUCKETS = 1000
+# Bucket sizes as Arrow temporal units, for archived readings
+ARCHIVE_UNITS = {'1m': 'minute', '1h': 'hour', '1d': 'day'}
+
+
+def _parse_time(value, name):
+    try:
+        return datetime.fromisoformat(str(value).replace('T', ' ').rstrip('Z'))
+    except ValueError:
+        raise BatchError(f"{name} must be an ISO 8601 timestamp")
+
+
+def _positive_int(options, name, default=None):
+    value = options.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        value = 0
+    if value < 1:
+        raise BatchError(f"{name} must be a positive integer")
+    return value
+
+
+def latest_query(agent):
+    # Newest daily bucket of a user, for ranges given without an end
+    return f"""
+        SELECT MAX(bucket_start) FROM {rollups.ROLLUP_TABLES[agent]}
+        WHERE user_id = %s AND bucket_size = '1d';
+    """
+
+
+def resolve_range(options, latest):
+    # (bucket size, start, end, max_points); without an end the range closes at the user's newest reading
+    if options.get('end'):
+        end = _parse_time(options['end'], 'end')
+    elif latest is not None:
+        end = _parse_time(latest, 'end') + timedelta(days=1)
+    else:
+        end = datetime.now().replace(microsecond=0)
+    if options.get('start'):
+        start = _parse_time(options['start'], 'start')
+    else:
+        start = end - timedelta(days=_positive_int(options, 'days', DEFAULT_DAYS))
+    if start >= end:
+        raise BatchError("start must be before end")
+
+    size = options.get('bucket') or 'auto'
+    if size == 'auto':
+        size = next((s for s in ('1m', '1h', '1d') if (end - start) / rollups.BUCKETS[s] <= AUTO_BUCKETS), '1d')
+    if size not in rollups.BUCKETS:
+        raise BatchError(f"bucket must be one of auto, {', '.join(rollups.BUCKETS)}")
+    if (end - start) / rollups.BUCKETS[size] > MAX_BUCKETS:
+        raise BatchError(f"{size} buckets over this range exceed the limit of {MAX_BUCKETS}; use a coarser bucket")
+    return size, start, end, _positive_int(options, 'max_points')
+
+
+def newest_query(agent):
+    # The user's newest raw reading (a new one changes every range that ends at it)
+    # and data_version, which any rewrite of an older reading bumps
+    return (f"SELECT (SELECT MAX(timestamp) FROM {fleet.TABLES[agent]} WHERE user_id = %s), "
+            f"(SELECT data_version FROM users WHERE user_id = %s);")
+
+
+def history_etag(agent, user_id, options, newest):
+    return respond.etag('history', agent, user_id, tuple(sorted(options.items())), newest)
+
+
+def history_query(agent, size):
+    # Rows of (bucket_start, readings, <metric n/sum/min/max>..., <counts>...) in time order
+    columns = ', '.join(['bucket_start'] + rollups.value_columns(agent))
+    if size in rollups.ROLLUP_SIZES:
+        return f"""
+            SELECT {columns} FROM {rollups.ROLLUP_TABLES[agent]}
+            WHERE user_id = %s AND bucket_size = '{size}' AND bucket_start >= %s AND bucket_start < %s
+            ORDER BY bucket_start;
+        """
+    bucket = rollups.bucket_sql(size)
+    return f"""
+        SELECT {bucket}, {rollups.aggregate_sql(agent)} FROM {fleet.TABLES[agent]}
+        WHERE user_id = %s AND timestamp >= %s AND timestamp < %s
+        GROUP BY {bucket}
+        ORDER BY 1;
+    """
+
+
+def archived_buckets(agent, user_id, size, start, end):
+    # history_query rows for the archived readings in [start, end)
+    metrics, counts = rollups.METRICS[agent], rollups.COUNTS[agent]
+    table = partitions.aggregate_archive(agent, [user_id], start, end, ARCHIVE_UNITS[size], metrics, counts.values())
+    if table is None or table.num_rows == 0:
+        return []
+    names = ['bucket', 'count_all']
+    for metric in metrics:
+        names += [f'{metric}_count', f'{metric}_sum', f'{metric}_min', f'{metric}_max']
+    names += [f'{column}_sum' for column in counts.values()]
+    return list(zip(*(table[name].to_pylist() for name in names)))
+
+
+def _combine(column, a, b):
+    if a is None or b is None:
+        return b if a is None else a
+    if column.endswith('_min'):
+        return min(a, b)
+    if column.endswith('_max'):
+        return max(a, b)
+    return a + b
+
+
+def with_archive(agent, user_id, size, start, end, rows):
+    # Raw-bucket rows merged with the same buckets over archived months. Only
+    # raw sizes need it: the rollups keep their archived buckets.
+    if size in rollups.ROLLUP_SIZES or not partitions.overlaps(agent, start, end):
+        return rows
+    columns = rollups.value_columns(agent)
+    merged = {}
+    for row in archived_buckets(agent, user_id, size, start, end) + [tuple(row) for row in rows]:
+        bucket = _parse_time(row[0], 'bucket_start') if isinstance(row[0], str) else row[0]
+        values = row[1:]
+        if bucket in merged:
+            # Readings that arrive for a month after it was archived give it buckets on both sides
+            values = tuple(_combine(column, a, b) for column, a, b in zip(columns, merged[bucket][1:], values))
+        merged[bucket] = (bucket,) + tuple(values)
+    return [merged[bucket] for bucket in sorted(merged)]
+
+
+def lttb(x, y, threshold):
+    # Largest-Triangle-Three-Buckets: indices of `threshold` points that keep the shape of (x, y)
+    n = len(x)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold < 3:
+        return np.array([0, n - 1][:threshold])
+    # Buckets [edges[i], edges[i + 1]) between the fixed first and last points; the last "bucket" is point n - 1
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    counts = np.diff(np.append(edges, n))
+    avg_x, avg_y = np.add.reduceat(x, edges) / counts, np.add.reduceat(y, edges) / counts
+    # Buckets hold a handful of points, so plain floats beat numpy slicing in the sequential pass
+    x, y, edges, avg_x, avg_y = x.tolist(), y.tolist(), edges.tolist(), avg_x.tolist(), avg_y.tolist()
+    indices = [0]
+    a = 0
+    for i in range(threshold - 2):
+        # Third corner of the triangle is the average of the next bucket
+        ax, ay, cx, cy = x[a], y[a], avg_x[i + 1], avg_y[i + 1]
+        a = max(range(edges[i], edges[i + 1]), key=lambda j: abs((ax - cx) * (y[j] - ay) - (ax - x[j]) * (cy - ay)))
+        indices.append(a)
+    return np.array(indices + [n - 1])
+
+
+def _series(labels, x, index, values, max_points, key):
+    # Rows `index` of the response; LTTB on the series' main value (mean or count) keeps max_points of them
+    if max_points and len(index) > max_points:
+        keep = lttb(x[index], np.asarray(values[key], dtype=float), max_points)
+        index = [index[i] for i in keep]
+        values = {name: [column[i] for i in keep] for name, column in values.items()}
+    return dict({'timestamp': [labels[i] for i in index]}, **values)
+
+
+def build_history(agent, user_id, size, start, end, rows, max_points=None):
+    rows = [tuple(row) for row in rows]
+    times = [_parse_time(row[0], 'bucket_start') if isinstance(row[0], str) else row[0] for row in rows]
+    x = np.asarray([t.timestamp() for t in times]) if max_points else None
+    columns = rollups.value_columns(agent)
+    at = {name: i + 1 for i, name in enumerate(columns)}
+    every = list(range(len(rows)))
+
+    series = {'readings': _series(times, x, every, {'count': [row[at['readings']] for row in rows]},
+                                  max_points, 'count')}
+    for metric in rollups.METRICS[agent]:
+        n, total, low, high = (at[f'{metric}_{part}'] for part in ('n', 'sum', 'min', 'max'))
+        present = [i for i in every if rows[i][n]]
+        series[metric] = _series(times, x, present, {
+            'min': [float(rows[i][low]) for i in present],
+            'mean': [round(float(rows[i][total]) / rows[i][n], 2) for i in present],
+            'max': [float(rows[i][high]) for i in present],
+        }, max_points, 'mean')
+    for name in rollups.COUNTS[agent]:
+        series[name] = _series(times, x, every, {'count': [int(row[at[name]] or 0) for row in rows]},
+                               max_points, 'count')
+
+    return {
+        'user_id': user_id,
+        'agent': agent,
+        'bucket': size,
+        'start': start,
+        'end': end,
+        'source': 'rollup' if size in rollups.ROLLUP_SIZES else 'raw',
+        'buckets': len(rows),
+        'max_points': max_points,
+        'series': series,
+    }
+
+
+def fetch_newest(agent, user_id):
+    with db.cursor() as cur:
+        cur.execute(newest_query(agent), (user_id, user_id))
+        return tuple(cur.fetchone())
+
+
+def fetch_history(agent, user_id, options):
+    with db.cursor() as cur:
+        latest = None
+        if not options.get('end'):
+            cur.execute(latest_query(agent), (user_id,))
+            latest = cur.fetchone()[0]
+            if latest is None:
+                return None
+        size, start, end, max_points = resolve_range(options, latest)
+        cur.execute(history_query(agent, size), (user_id, start, end))
+        rows = cur.fetchall()
+    rows = with_archive(agent, user_id, size, start, end, rows)
+    return build_history(agent, user_id, size, start, end, rows, max_points)
@@ -0,0 +1,282 @@
+"""Bulk ingestion: Dataset/*.csv -> cleaned_data/*.csv (+ Parquet) -> database.
+
+Run from the project root:
+    python -m agents.ingest                       # all three datasets
+    python -m agents.ingest --tables health --no-db
+    python -m agents.ingest --no-db --no-parquet  # CSVs only
+    ELDERLY_CARE_DSN=sqlite:///elderly_care.db python -m agents.ingest
+
+Re-running is safe: rows are upserted on (user_id, timestamp).
+"""
+import argparse
+import io
+import os
+import time
+from contextlib import nullcontext
+
+import pandas as pd
+
+from agents import cache, db, migrate, partitions, rollups
+
+# ========================
+# 📁 SOURCES
+# ========================
+DATASET_DIR = 'Dataset'
+CLEANED_DIR = 'cleaned_data'
+CHUNK_SIZE = 5000
+
+SOURCES = {
+    'health': {
+        'raw': 'health_monitoring.csv',
+        'cleaned': 'cleaned_health_monitoring_dataset.csv',
+        'table': 'health_monitoring',
+    },
+    'safety': {
+        'raw': 'safety_monitoring.csv',
+        'cleaned': 'cleaned_safety_monitoring_dataset.csv',
+        'table': 'safety_monitoring',
+    },
+    'reminders': {
+        'raw': 'daily_reminder.csv',
+        'cleaned': 'cleaned_daily_reminder_dataset.csv',
+        'table': 'daily_reminder',
+    },
+}
+
+# ========================
+# 🗄️ TABLES
+# ========================
+# Table DDL lives in migrations/ (applied by agents/migrate.py before loading).
+# cleaned_data column -> table column, where they differ
+TABLE_RENAMES = {
+    'health': {'systolic_bp': 'bp_systolic', 'diastolic_bp': 'bp_diastolic'},
+    'safety': {'movement_activity': 'event_type'},
+    'reminders': {},
+}
+BOOL_COLUMNS = {
+    'health': ['hr_alert', 'bp_alert', 'glucose_alert', 'spo2_alert', 'alert_triggered', 'caregiver_notified'],
+    'safety': ['fall_detected', 'alert_triggered', 'caregiver_notified'],
+    'reminders': ['reminder_sent', 'acknowledged'],
+}
+INT_COLUMNS = {
+    'health': ['heart_rate', 'glucose_level', 'spo2'],
+    'safety': ['post_fall_inactivity_duration'],
+    'reminders': [],
+}
+
+
+# ========================
+# 🧹 VECTORIZED CLEANING
+# ========================
+def _yes_no(series):
+    return series.astype(str).str.strip().str.lower().eq('yes').astype(int)
+
+
+def _integers(df, agent):
+    for col in INT_COLUMNS[agent]:
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int64')
+
+
+def _timestamps(series):
+    # Raw files use M/D/YYYY H:MM
+    return pd.to_datetime(series, format='%m/%d/%Y %H:%M', errors='coerce')
+
+
+def clean_health(raw):
+    df = raw.rename(columns={
+        'Device-ID/User-ID': 'user_id',
+        'Timestamp': 'timestamp',
+        'Heart Rate': 'heart_rate',
+        'Heart Rate Below/Above Threshold (Yes/No)': 'hr_alert',
+        'Blood Pressure Below/Above Threshold (Yes/No)': 'bp_alert',
+        'Glucose Levels': 'glucose_level',
+        'Glucose Levels Below/Above Threshold (Yes/No)': 'glucose_alert',
+        'Oxygen Saturation (SpO₂%)': 'spo2',
+        'SpO₂ Below Threshold (Yes/No)': 'spo2_alert',
+        'Alert Triggered (Yes/No)': 'alert_triggered',
+        'Caregiver Notified (Yes/No)': 'caregiver_notified',
+    })
+    df['timestamp'] = _timestamps(df['timestamp'])
+    # "136/79 mmHg" -> 136.0, 79.0 in one pass
+    bp = df.pop('Blood Pressure').str.extract(r'(\d+)/(\d+)').astype(float)
+    df['systolic_bp'] = bp[0]
+    df['diastolic_bp'] = bp[1]
+    for col in BOOL_COLUMNS['health']:
+        df[col] = _yes_no(df[col])
+    _integers(df, 'health')
+    return df
+
+
+def clean_safety(raw):
+    df = raw.iloc[:, :9].copy()
+    df.columns = ['user_id', 'timestamp', 'movement_activity', 'fall_detected', 'impact_force_level',
+                  'post_fall_inactivity_duration', 'location', 'alert_triggered', 'caregiver_notified']
+    df['timestamp'] = _timestamps(df['timestamp'])
+    df['movement_activity'] = df['movement_activity'].str.strip()
+    df['location'] = df['location'].str.strip()
+    for col in BOOL_COLUMNS['safety']:
+        df[col] = _yes_no(df[col])
+    _integers(df, 'safety')
+    return df
+
+
+def clean_reminders(raw):
+    df = raw.iloc[:, :6].copy()
+    df.columns = ['user_id', 'timestamp', 'reminder_type', 'schedule_time', 'reminder_sent', 'acknowledged']
+    df['timestamp'] = _timestamps(df['timestamp'])
+    df['schedule_time'] = pd.to_datetime(df['schedule_time'], format='%H:%M:%S').dt.strftime('%H:%M:%S')
+    for col in BOOL_COLUMNS['reminders']:
+        df[col] = _yes_no(df[col])
+    _integers(df, 'reminders')
+    return df
+
+
+CLEANERS = {
+    'health': clean_health,
+    'safety': clean_safety,
+    'reminders': clean_reminders,
+}
+
+
+def read_clean_chunks(agent, dataset_dir=DATASET_DIR, chunksize=CHUNK_SIZE):
+    path = os.path.join(dataset_dir, SOURCES[agent]['raw'])
+    for raw in pd.read_csv(path, chunksize=chunksize, dtype=str, skipinitialspace=True):
+        cleaned = CLEANERS[agent](raw)
+        yield cleaned.dropna(subset=['user_id', 'timestamp'])
+
+
+# ========================
+# 🚚 BULK LOADING
+# ========================
+def to_table_frame(agent, cleaned):
+    df = cleaned.rename(columns=TABLE_RENAMES[agent])
+    for col in BOOL_COLUMNS[agent]:
+        df[col] = df[col].astype(bool)
+    if 'impact_force_level' in df.columns:
+        df['impact_force_level'] = df['impact_force_level'].replace('-', None)
+    # The last reading wins if a chunk repeats a key
+    return df.drop_duplicates(subset=['user_id', 'timestamp'], keep='last')
+
+
+# Delivery flags only go from FALSE to TRUE: a row loaded again keeps the alert
+# or reminder that went out for it (agents/alerts.py, agents/reminders.py) and
+# the resident's acknowledgement
+STICKY_COLUMNS = ('caregiver_notified', 'reminder_sent', 'acknowledged')
+
+
+def _update_sql(table, col):
+    if col in STICKY_COLUMNS:
+        return f"{col} = (EXCLUDED.{col} OR COALESCE({table}.{col}, FALSE))"
+    return f"{col} = EXCLUDED.{col}"
+
+
+def _upsert_sql(table, columns, source):
+    updates = ', '.join(_update_sql(table, col) for col in columns if col not in ('user_id', 'timestamp'))
+    return (f"INSERT INTO {table} ({', '.join(columns)}) {source} "
+            f"ON CONFLICT (user_id, timestamp) DO UPDATE SET {updates}")
+
+
+def _copy_upsert(cur, table, df):
+    # COPY into a temp staging table, then one set-based upsert. Callers load many
+    # chunks in one transaction, so staging is emptied per chunk rather than on commit.
+    columns = list(df.columns)
+    staging = f"staging_{table}"
+    cur.execute(f"CREATE TEMP TABLE IF NOT EXISTS {staging} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS")
+    cur.execute(f"TRUNCATE {staging}")
+    buf = io.StringIO()
+    df.to_csv(buf, index=False, header=False, date_format='%Y-%m-%d %H:%M:%S')
+    buf.seek(0)
+    cur.copy_expert(f"COPY {staging} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+    # One row per key (the last copied wins): ON CONFLICT cannot touch a row twice
+    cur.execute(_upsert_sql(table, columns, f"SELECT DISTINCT ON (user_id, timestamp) {', '.join(columns)} "
+                                            f"FROM {staging} ORDER BY user_id, timestamp, ctid DESC"))
+
+
+def _executemany_upsert(cur, table, df):
+    columns = list(df.columns)
+    values = f"VALUES ({', '.join(['%s'] * len(columns))})"
+    rows = df.astype(object).where(df.notna(), None)
+    if 'timestamp' in rows.columns:
+        rows['timestamp'] = df['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S')
+    cur.executemany(_upsert_sql(table, columns, values), rows.itertuples(index=False, name=None))
+
+
+def load_frame(cur, agent, table_df):
+    table = SOURCES[agent]['table']
+    partitions.ensure_for(cur, agent, table_df['timestamp'])
+    if db.backend() == 'sqlite':
+        _executemany_upsert(cur, table, table_df)
+    else:
+        _copy_upsert(cur, table, table_df)
+    rollups.refresh(cur, agent, table_df)
+    user_ids = table_df['user_id'].unique().tolist()
+    touch(cur, agent, user_ids)
+    cache.latest.invalidate(agent, user_ids)
+    return len(table_df)
+
+
+def register_users(cur, user_ids):
+    cur.executemany("INSERT INTO users (user_id) VALUES (%s) ON CONFLICT (user_id) DO NOTHING;",
+                    [(user_id,) for user_id in user_ids])
+
+
+def touch(cur, agent, user_ids):
+    # Registers new users and bumps the versions the ETags are built from (migration 0008),
+    # in the writer's transaction so a tag never changes before the data does
+    if not user_ids:
+        return
+    cur.executemany("INSERT INTO users (user_id) VALUES (%s) "
+                    "ON CONFLICT (user_id) DO UPDATE SET data_version = users.data_version + 1;",
+                    [(user_id,) for user_id in sorted(user_ids)])   # one lock order across writers
+    cur.execute("UPDATE table_versions SET version = version + 1 WHERE table_name = %s;", (SOURCES[agent]['table'],))
+
+
+def ingest(agent, load_db=True, write_cleaned=True, dataset_dir=DATASET_DIR,
+           cleaned_dir=CLEANED_DIR, chunksize=CHUNK_SIZE, write_parquet=True):
+    # The Parquet copy (agents/store.py) is written alongside the cleaned CSV when pyarrow is installed
+    from agents import store
+
+    start = time.perf_counter()
+    cleaned_path = os.path.join(cleaned_dir, SOURCES[agent]['cleaned'])
+    parquet = None
+    if write_cleaned and write_parquet and store.available():
+        parquet = store.MonthlyWriter(agent, os.path.join(cleaned_dir, 'parquet'))
+    rows = 0
+    if load_db:
+        migrate.upgrade()
+    with db.cursor() if load_db else nullcontext() as cur:
+        for i, chunk in enumerate(read_clean_chunks(agent, dataset_dir, chunksize)):
+            if write_cleaned:
+                chunk.to_csv(cleaned_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+            if parquet is not None:
+                parquet.add(chunk)
+            if load_db:
+                load_frame(cur, agent, to_table_frame(agent, chunk))
+            rows += len(chunk)
+    if parquet is not None:
+        parquet.close()
+    return rows, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tables', default=','.join(SOURCES), help="comma-separated: health,safety,reminders")
+    parser.add_argument('--dataset-dir', default=DATASET_DIR)
+    parser.add_argument('--cleaned-dir', default=CLEANED_DIR)
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--no-db', action='store_true', help="only write cleaned_data/*.csv")
+    parser.add_argument('--no-cleaned', action='store_true', help="skip rewriting cleaned_data/*.csv")
+    parser.add_argument('--no-parquet', action='store_true', help="skip writing cleaned_data/parquet/")
+    args = parser.parse_args(argv)
+
+    total_start = time.perf_counter()
+    for agent in args.tables.split(','):
+        rows, seconds = ingest(agent, load_db=not args.no_db, write_cleaned=not args.no_cleaned,
+                               dataset_dir=args.dataset_dir, cleaned_dir=args.cleaned_dir,
+                               chunksize=args.chunksize, write_parquet=not args.no_parquet)
+        print(f"✅ {agent}: {rows} rows in {seconds:.3f}s")
+    print(f"Total: {time.perf_counter() - total_start:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""Precomputed prediction tables for the categorical-input models.
+
+Run from the project root to check every table against the model on
+cleaned_data/*.csv and report size and speed (exits 1 on any mismatch):
+    python -m agents.lookup
+
+When the registry loads a model with a compiled form (agents/compiled.py),
+every combination of its finite inputs is scored once and stored by key.
+A prediction is then a dict lookup. Inputs outside the enumerated domain
+fall back to the compiled or sklearn path.
+"""
+import argparse
+import itertools
+import math
+import operator
+import os
+import sys
+import time
+
+import numpy as np
+
+from agents.features import LOCATIONS, MOVEMENT_ACTIVITIES, REMINDER_TYPES
+
+# Finite input domains, by model feature name, in encoded form
+DOMAINS = {
+    'safety': {
+        'movement_activity': range(len(MOVEMENT_ACTIVITIES)),
+        'fall_detected': (0, 1),
+        'location': range(len(LOCATIONS)),
+        'hour': range(24),
+        'day_of_week': range(7),
+        'month': range(1, 13),
+    },
+    'reminders': {
+        'reminder_sent': (0, 1),
+        'reminder_type_encoded': range(len(REMINDER_TYPES)),
+    },
+}
+ENABLED = os.environ.get("ELDERLY_CARE_PREDICTION_TABLES", "1") not in ('0', 'false', 'no')
+# Largest table built at load. The 64,512-entry safety table costs ~10 MB per
+# worker for no gain over the compiled scorer, so it needs this raised.
+MAX_ENTRIES = int(os.environ.get("ELDERLY_CARE_PREDICTION_TABLE_MAX", "4096"))
+
+
+class PredictionTable:
+    """Decision value per key of finite inputs; label and probability follow from it.
+
+    Features outside the domain (post_fall_inactivity_duration for safety)
+    enter a logistic model linearly: the table holds the decision value with
+    their term at zero and lookup adds weight * value, so it stays O(1).
+    """
+
+    def __init__(self, compiled, domain):
+        start = time.perf_counter()
+        self.names = [name for name in compiled.feature_names if name in domain]
+        self.classes = compiled.classes
+        # Remaining features as (name, weight / scale, mean): z += weight * (x - mean)
+        self.linear = [(name, weight / scale, mean) for name, weight, mean, scale in compiled._terms
+                       if name not in domain]
+        self.hits = 0
+        self.misses = 0
+
+        keys = list(itertools.product(*(domain[name] for name in self.names)))
+        X = np.zeros((len(keys), len(compiled.feature_names)))
+        for i, name in enumerate(compiled.feature_names):
+            if name in domain:
+                X[:, i] = [key[self.names.index(name)] for key in keys]
+            elif compiled.mean:
+                X[:, i] = compiled.mean[i]
+        if len(self.names) == 1:
+            keys = [key[0] for key in keys]
+        # itemgetter builds the key tuple in C; ints and equal floats hash alike
+        self._key = operator.itemgetter(*self.names)
+        self._table = dict(zip(keys, compiled.decision(X).tolist()))
+
+        self.build_ms = round(1000 * (time.perf_counter() - start), 3)
+        # Small ints are shared, so the dict, its key tuples and the floats are what it costs
+        self.size_bytes = (sys.getsizeof(self._table) + sum(sys.getsizeof(value) for value in self._table.values())
+                           + (sum(sys.getsizeof(key) for key in self._table) if len(self.names) > 1 else 0))
+
+    def decision(self, record):
+        # z for a record, or None when it is outside the table
+        try:
+            z = self._table[self._key(record)]
+            for name, weight, mean in self.linear:
+                z += weight * (float(record[name]) - mean)
+        except (KeyError, TypeError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return z
+
+    def predict(self, record):
+        # decision() inlined: this is the per-request hot path
+        try:
+            z = self._table[self._key(record)]
+            for name, weight, mean in self.linear:
+                z += weight * (float(record[name]) - mean)
+        except (KeyError, TypeError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self.classes[z > 0]
+
+    def lookup(self, record):
+        # (label, probability), or None when the record is outside the table
+        z = self.decision(record)
+        if z is None:
+            return None
+        p = 1.0 / (1.0 + math.exp(-z)) if z > -709 else 0.0
+        return self.classes[z > 0], p
+
+    def stats(self):
+        return {
+            'entries': len(self._table),
+            'size_bytes': self.size_bytes,
+            'build_ms': self.build_ms,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+def domain_size(agent):
+    return math.prod(len(values) for values in DOMAINS[agent].values())
+
+
+def build_table(agent, compiled, max_entries=None):
+    if not ENABLED or compiled is None or agent not in DOMAINS:
+        return None
+    if domain_size(agent) > (MAX_ENTRIES if max_entries is None else max_entries):
+        return None
+    return PredictionTable(compiled, DOMAINS[agent])
+
+
+# ========================
+# ✅ TABLE CHECK
+# ========================
+def main(argv=None):
+    import pandas as pd
+
+    from agents import ingest, scoring
+    from agents.features import build_features, record_features
+    from agents.registry import registry
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tables', default=','.join(DOMAINS))
+    args = parser.parse_args(argv)
+
+    ok = True
+    for agent in args.tables.split(','):
+        cleaned = pd.read_csv(os.path.join(ingest.CLEANED_DIR, ingest.SOURCES[agent]['cleaned']))
+        model = registry.get(agent)
+        compiled = registry.compiled(agent)
+        if compiled is None:
+            print(f"⚠️ {agent}: model has no compiled form, so no prediction table")
+            continue
+        # Tables over the size cap are built here anyway so they can be measured
+        table = registry.table(agent)
+        served = table is not None
+        table = table or PredictionTable(compiled, DOMAINS[agent])
+        features = build_features(agent, cleaned)
+        expected = model.predict(scoring.model_inputs(model, features))
+        records = [record_features(agent, row) for row in cleaned.to_dict(orient='records')]
+        got = [table.predict(rec) for rec in records]
+        proba = np.asarray([table.lookup(rec)[1] for rec in records])
+        proba_err = float(np.max(np.abs(proba - model.predict_proba(scoring.model_inputs(model, features))[:, 1])))
+        mismatches = int(np.sum(np.asarray(got) != expected))
+
+        sample = records[:2000]
+        timings = {}
+        for name, fn in (('table', table.predict), ('compiled', compiled.predict_one),
+                         ('sklearn', lambda rec: model.predict(scoring.model_inputs(model, pd.DataFrame([rec]))))):
+            runs = sample if name != 'sklearn' else sample[:200]
+            start = time.perf_counter()
+            for rec in runs:
+                fn(rec)
+            timings[name] = 1e6 * (time.perf_counter() - start) / len(runs)
+
+        stats = table.stats()
+        passed = mismatches == 0 and proba_err < 1e-9
+        ok &= passed
+        print(f"{'✅' if passed else '❌'} {agent}: {stats['entries']} entries, "
+              f"{stats['size_bytes'] / 1e6:.2f} MB, built in {stats['build_ms']:.0f} ms, "
+              f"{mismatches} mismatches on {len(records)} rows, max |Δp| {proba_err:.1e}"
+              f"{'' if served else ' (not served: over ELDERLY_CARE_PREDICTION_TABLE_MAX)'}")
+        print(f"   µs/prediction: table {timings['table']:.2f}, compiled {timings['compiled']:.2f}, "
+              f"sklearn {timings['sklearn']:.0f} "
+              f"({timings['sklearn'] / timings['table']:.0f}x / {timings['compiled'] / timings['table']:.1f}x faster)")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,419 @@
+import bisect
+import contextvars
+import functools
+import itertools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from urllib.parse import parse_qs
+
+# ========================
+# 📏 METRICS
+# ========================
+# Request latency per route and the time each request spends in its parts,
+# for GET /metrics in the Prometheus text format. Spans:
+#   pool_wait  waiting for a pooled connection (agents/db.py, agents/aiodb.py)
+#   sql        executing queries
+#   dataframe  building DataFrames from rows or model inputs
+#   inference  model calls (agents/scoring.py)
+#   serialize  encoding response bodies (agents/respond.py)
+#   compress   gzip/zstd of response bodies
+# A request's spans are summed and observed once per request, labelled with
+# its route ('-' for work outside a request, observed per call), and each
+# response carries a Server-Timing header with the same totals.
+# Queries slower than SLOW_QUERY_SECONDS go to a slow-query log with literals
+# and parameters redacted. With ELDERLY_CARE_PROFILING=1, ?profile=1 (or an
+# X-Profile: 1 header) samples that request's stacks and
+# GET /debug/profile?seconds=N samples every thread for a window.
+ENABLED = os.environ.get("ELDERLY_CARE_METRICS", "1") not in ('0', 'false', 'no')
+PROFILING = os.environ.get("ELDERLY_CARE_PROFILING", "0") in ('1', 'true', 'yes')
+SPILL_DIR = os.environ.get("ELDERLY_CARE_SPILL_DIR", "spill")
+SLOW_QUERY_SECONDS = float(os.environ.get("ELDERLY_CARE_SLOW_QUERY_MS", "250")) / 1000
+SLOW_QUERY_LOG = os.environ.get("ELDERLY_CARE_SLOW_QUERY_LOG", os.path.join(SPILL_DIR, "slow_queries.jsonl"))
+# Seconds between stack samples while profiling
+PROFILE_INTERVAL = float(os.environ.get("ELDERLY_CARE_PROFILE_INTERVAL", "0.001"))
+MAX_PROFILE_SECONDS = 60
+PROFILES_KEPT = 20
+SLOW_QUERIES_KEPT = 200
+
+SPANS = ('pool_wait', 'sql', 'dataframe', 'inference', 'serialize', 'compress')
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_request = contextvars.ContextVar('metrics_request', default=None)
+
+
+class _Request:
+    __slots__ = ('route', 'spans', 'slow', 'start')
+
+    def __init__(self, route):
+        self.route = route
+        self.spans = {}      # span name -> seconds
+        self.slow = []       # slow-query entries, logged with the route at the end
+        self.start = time.perf_counter()
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds):
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += seconds
+
+    def snapshot(self):
+        with self.lock:
+            return list(itertools.accumulate(self.counts)), self.sum
+
+
+_histograms = {}     # (metric, labels) -> Histogram
+_histograms_lock = threading.Lock()
+_counters = Counter()
+_counters_lock = threading.Lock()
+
+
+def histogram(metric, labels):
+    h = _histograms.get((metric, labels))
+    if h is None:
+        with _histograms_lock:
+            h = _histograms.setdefault((metric, labels), Histogram())
+    return h
+
+
+# ========================
+# ⏱️ SPANS
+# ========================
+def observe_span(name, seconds):
+    if not ENABLED:
+        return
+    req = _request.get()
+    if req is None:
+        histogram('span', ('-', name)).observe(seconds)
+    else:
+        req.spans[name] = req.spans.get(name, 0.0) + seconds
+
+
+class span:
+    # with metrics.span('inference'): ...
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe_span(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def begin_request(route=None):
+    # Returns a token for finish_request; the route may be named only at the end
+    with _counters_lock:
+        _counters['in_flight'] += 1
+    return _request.set(_Request(route))
+
+
+def server_timing():
+    # Server-Timing header value: this request's span totals so far
+    req = _request.get()
+    timing = [f"{name};dur={1000 * value:.2f}" for name, value in req.spans.items()]
+    return ', '.join(timing + [f"total;dur={1000 * (time.perf_counter() - req.start):.2f}"])
+
+
+def finish_request(token, method, status, route=None):
+    req = _request.get()
+    seconds = time.perf_counter() - req.start
+    route = route or req.route or 'unmatched'
+    with _counters_lock:
+        _counters['in_flight'] -= 1
+    histogram('request', (route, method, str(status))).observe(seconds)
+    for name, total in req.spans.items():
+        histogram('span', (route, name)).observe(total)
+    for entry in req.slow:
+        entry['route'] = route
+        _log_slow(entry)
+    _request.reset(token)
+
+
+def bind(fn):
+    # For executor hops: fn runs in a copy of the caller's context, so its spans keep the route
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+# ========================
+# 🐢 SLOW-QUERY LOG
+# ========================
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.$])\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\((?:\s*(?:%s|\?|\$\d+)\s*,){3,}\s*(?:%s|\?|\$\d+)\s*\)")
+_slow_queries = deque(maxlen=SLOW_QUERIES_KEPT)
+_slow_lock = threading.Lock()
+
+
+def redact(query):
+    # Literals become ?, long placeholder lists collapse; the shape of the query stays readable
+    text = ' '.join(query.split())
+    text = _PLACEHOLDER_LIST.sub(lambda m: f"(%s x{m.group(0).count(',') + 1})", text)
+    return _NUMBER.sub('?', _STRING.sub('?', text))
+
+
+def _param_types(params):
+    if params is None:
+        return []
+    values = list(params.values()) if isinstance(params, dict) else list(params)
+    return [type(value).__name__ for value in values[:20]] + (['...'] if len(values) > 20 else [])
+
+
+def record_query(query, params, seconds, many=False):
+    # Called by the database layers for every statement; only slow ones are logged
+    if not ENABLED:
+        return
+    observe_span('sql', seconds)
+    if seconds < SLOW_QUERY_SECONDS:
+        return
+    entry = {
+        'at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'ms': round(1000 * seconds, 3),
+        'route': '-',
+        'sql': redact(query),
+        # Values never leave the process: types only, or the row count for executemany
+        'params': {'rows': len(params)} if many and hasattr(params, '__len__') else
+                  ({'rows': '?'} if many else _param_types(params)),
+    }
+    req = _request.get()
+    if req is None:
+        _log_slow(entry)
+    else:
+        req.slow.append(entry)
+
+
+def _log_slow(entry):
+    with _counters_lock:
+        _counters['slow_queries'] += 1
+    with _slow_lock:
+        _slow_queries.append(entry)
+        if SLOW_QUERY_LOG:
+            os.makedirs(os.path.dirname(SLOW_QUERY_LOG) or '.', exist_ok=True)
+            with open(SLOW_QUERY_LOG, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+
+
+def slow_queries(limit=100):
+    with _slow_lock:
+        return list(_slow_queries)[-limit:][::-1]
+
+
+# ========================
+# 🔬 SAMPLING PROFILER
+# ========================
+class Sampler:
+    # Collects folded stacks ("outer;inner 12", the flame-graph format) for the
+    # given thread ids, or for every other thread when thread_ids is None
+    def __init__(self, thread_ids=None, interval=PROFILE_INTERVAL):
+        self.thread_ids = thread_ids
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or (self.thread_ids is not None and thread_id not in self.thread_ids):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self
+
+    def folded(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+_profiles = deque(maxlen=PROFILES_KEPT)   # (id, route, folded stacks)
+_profile_ids = itertools.count(1)
+
+
+def wants_profile(args, headers):
+    return args.get('profile') in ('1', 'true', 'yes') or headers.get('X-Profile') == '1'
+
+
+def new_profile_id():
+    return next(_profile_ids)
+
+
+def keep_profile(profile_id, route, sampler):
+    _profiles.append((profile_id, route, sampler.folded()))
+
+
+def get_profile(profile_id):
+    for kept_id, route, folded in _profiles:
+        if kept_id == profile_id:
+            return route, folded
+    return None
+
+
+def profile_window(seconds):
+    # Every thread, for up to MAX_PROFILE_SECONDS
+    sampler = Sampler().start()
+    time.sleep(max(0.0, min(seconds, MAX_PROFILE_SECONDS)))
+    return sampler.stop()
+
+
+# ========================
+# 📤 PROMETHEUS EXPOSITION
+# ========================
+HELP = {
+    'request': ('elderly_care_request_duration_seconds', "Request latency by route, method and status."),
+    'span': ('elderly_care_span_duration_seconds', "Time spent in pool_wait, sql, dataframe, inference, serialize and compress, by route."),
+}
+LABELS = {
+    'request': ('route', 'method', 'status'),
+    'span': ('route', 'span'),
+}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return '{' + ','.join(pairs + ([extra] if extra else [])) + '}'
+
+
+def render(pool=None):
+    # pool: the stats dict of the serving process's connection pool
+    with _histograms_lock:
+        items = sorted(_histograms.items())
+    lines = []
+    for kind, (metric, help_text) in HELP.items():
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+        for (name, labels), h in items:
+            if name != kind:
+                continue
+            cumulative, total = h.snapshot()
+            for bound, count in zip(h.buckets + ('+Inf',), cumulative):
+                le = f'le="{bound}"'
+                lines.append(f"{metric}_bucket{_labels(LABELS[kind], labels, le)} {count}")
+            lines.append(f"{metric}_sum{_labels(LABELS[kind], labels)} {total:.6f}")
+            lines.append(f"{metric}_count{_labels(LABELS[kind], labels)} {cumulative[-1]}")
+    lines += ["# HELP elderly_care_requests_in_flight Requests being served.",
+              "# TYPE elderly_care_requests_in_flight gauge",
+              f"elderly_care_requests_in_flight {_counters['in_flight']}",
+              "# HELP elderly_care_slow_queries_total Queries slower than the slow-query threshold.",
+              "# TYPE elderly_care_slow_queries_total counter",
+              f"elderly_care_slow_queries_total {_counters['slow_queries']}"]
+    if pool:
+        lines += ["# HELP elderly_care_db_pool_connections Pooled database connections by state.",
+                  "# TYPE elderly_care_db_pool_connections gauge"]
+        lines += [f'elderly_care_db_pool_connections{{state="{state}"}} {pool[state]}'
+                  for state in ('in_use', 'idle', 'max') if state in pool]
+        lines += ["# HELP elderly_care_db_pool_timeouts_total Requests that found no free connection in time.",
+                  "# TYPE elderly_care_db_pool_timeouts_total counter",
+                  f"elderly_care_db_pool_timeouts_total {pool.get('timeouts', 0)}"]
+    return '\n'.join(lines) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+# ========================
+# 🧪 FLASK HOOKS
+# ========================
+def instrument_flask(app):
+    # Imported here so the database layer can use this module without Flask
+    from flask import g, request
+
+    @app.before_request
+    def _begin():
+        if not ENABLED:
+            return
+        g.metrics_route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        g.metrics_token = begin_request(g.metrics_route)
+        # Checked first: request.args parses the query string
+        if PROFILING and wants_profile(request.args, request.headers):
+            g.metrics_sampler = Sampler({threading.get_ident()}).start()
+
+    @app.after_request
+    def _finish(response):
+        token = g.pop('metrics_token', None)
+        if token is None:
+            return response
+        sampler = g.pop('metrics_sampler', None)
+        if sampler is not None:
+            profile_id = new_profile_id()
+            keep_profile(profile_id, g.metrics_route, sampler.stop())
+            response.headers['X-Profile-Id'] = str(profile_id)
+        response.headers['Server-Timing'] = server_timing()
+        finish_request(token, request.method, response.status_code)
+        return response
+
+    return app
+
+
+# ========================
+# ⚡ ASGI MIDDLEWARE
+# ========================
+class ASGIMiddleware:
+    # The same hooks for agents/asgi.py. resolve(scope) names the route once
+    # the router has filled in scope['endpoint']; a profiled request samples
+    # every thread, since its work hops between the event loop and the executors.
+    def __init__(self, app, resolve):
+        self.app = app
+        self.resolve = resolve
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not ENABLED:
+            await self.app(scope, receive, send)
+            return
+        token = begin_request()
+        sampler = None
+        if PROFILING:
+            args = {key: values[-1] for key, values in parse_qs(scope.get('query_string', b'').decode()).items()}
+            headers = {'X-Profile': dict(scope['headers']).get(b'x-profile', b'').decode()}
+            sampler = Sampler().start() if wants_profile(args, headers) else None
+        profile_id = new_profile_id() if sampler is not None else None
+        status = [500]
+
+        async def send_timed(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+                extra = [(b'server-timing', server_timing().encode())]
+                if profile_id is not None:
+                    extra.append((b'x-profile-id', str(profile_id).encode()))
+                message = dict(message, headers=list(message.get('headers', [])) + extra)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            route = self.resolve(scope)
+            if sampler is not None:
+                keep_profile(profile_id, route, sampler.stop())
+            finish_request(token, scope['method'], status[0], route)
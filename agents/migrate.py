@@ -0,0 +1,197 @@
+"""Versioned schema migrations and query-plan checks.
+
+Run from the project root:
+    python -m agents.migrate              # apply pending migrations
+    python -m agents.migrate status       # list applied / pending
+    python -m agents.migrate check-plans  # exit 1 if a hot query stops using an index
+
+Migrations are migrations/NNNN_name.sql. A file may be specialised per backend
+as NNNN_name.postgres.sql / NNNN_name.sqlite.sql; the generic file is used
+when no specialised one exists.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+from datetime import datetime
+
+from agents import db, fleet, history, rollups, summary
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+_FILE_RE = re.compile(r'^(\d{4})_(\w+?)(?:\.(postgres|sqlite))?\.sql$')
+
+
+# ========================
+# 🧱 MIGRATIONS
+# ========================
+def discover(backend=None):
+    backend = backend or db.backend()
+    found = {}
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = _FILE_RE.match(filename)
+        if not match:
+            continue
+        version, name, only_for = match.groups()
+        if only_for and only_for != backend:
+            continue
+        # A backend-specific file wins over the generic one
+        if version not in found or only_for:
+            found[version] = (name, os.path.join(MIGRATIONS_DIR, filename))
+    return [(version, name, path) for version, (name, path) in sorted(found.items())]
+
+
+def split_statements(sql):
+    # Statements end with ';' at end of line; $$-quoted bodies are kept whole
+    statements, current, in_body = [], [], False
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if not in_body and (not stripped or stripped.startswith('--')):
+            continue
+        current.append(line)
+        if line.count('$$') % 2:
+            in_body = not in_body
+        if not in_body and stripped.endswith(';'):
+            statements.append('\n'.join(current))
+            current = []
+    if current:
+        statements.append('\n'.join(current))
+    return statements
+
+
+def _ensure_history(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+
+
+def applied_versions():
+    with db.cursor() as cur:
+        _ensure_history(cur)
+        cur.execute("SELECT version FROM schema_migrations ORDER BY version;")
+        return [row[0] for row in cur.fetchall()]
+
+
+def upgrade(verbose=False):
+    # Each migration runs in its own transaction together with its history row
+    done = set(applied_versions())
+    applied = []
+    for version, name, path in discover():
+        if version in done:
+            continue
+        with open(path, encoding='utf-8') as f:
+            statements = split_statements(f.read())
+        with db.cursor() as cur:
+            for statement in statements:
+                cur.execute(statement)
+            cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s);", (version, name))
+        applied.append(version)
+        if verbose:
+            print(f"✅ applied {version}_{name}")
+    return applied
+
+
+# ========================
+# 🔍 QUERY-PLAN CHECKS
+# ========================
+# The queries that run on every request. 'lookup' queries must seek into an
+# index on their filter; 'ordered' queries may walk an index in sort order.
+PLAN_CHECK_USER = 'D1000'
+
+
+def hot_queries():
+    queries = [
+        ('user ids', 'ordered', "SELECT user_id FROM users ORDER BY user_id;", ()),
+    ]
+    for agent, table in fleet.TABLES.items():
+        queries += [
+            (f"{agent} latest list", 'ordered', f"SELECT * FROM {table} ORDER BY timestamp DESC LIMIT 10;", ()),
+            (f"{agent} user latest", 'lookup',
+             f"SELECT * FROM {table} WHERE user_id = %s ORDER BY timestamp DESC LIMIT 1;", (PLAN_CHECK_USER,)),
+            (f"{agent} auto_predict", 'lookup', fleet.user_latest_query(agent), (PLAN_CHECK_USER,)),
+            (f"{agent} history end", 'lookup', history.latest_query(agent), (PLAN_CHECK_USER,)),
+        ]
+        for size in ('1h', '1m'):
+            queries.append((f"{agent} history {size}", 'lookup', history.history_query(agent, size),
+                            (PLAN_CHECK_USER, datetime(2025, 1, 1), datetime(2025, 4, 1))))
+    queries.append(('user summary', 'lookup', summary.summary_query(1, predict=True), (PLAN_CHECK_USER,)))
+    queries.append(('user summary etag', 'lookup', summary.NEWEST_QUERY, summary.newest_params(PLAN_CHECK_USER)))
+    return queries
+
+
+def _postgres_scans(plan, found=None):
+    found = [] if found is None else found
+    if 'Relation Name' in plan:
+        found.append(plan)
+    for child in plan.get('Plans', []):
+        _postgres_scans(child, found)
+    return found
+
+
+def explain(cur, query, params, expect):
+    # Returns [(scan description, ok)] for every table the query reads
+    if db.backend() == 'sqlite':
+        cur.execute("EXPLAIN QUERY PLAN " + query, params)
+        # Only base tables count; CTEs and subqueries show up as SCAN <alias> too
+        tables = set(fleet.TABLES.values()) | set(rollups.ROLLUP_TABLES.values()) | {'users'}
+        scans = [row[-1] for row in cur.fetchall()
+                 if row[-1].startswith(('SCAN', 'SEARCH')) and row[-1].split()[1] in tables]
+        if expect == 'lookup':
+            return [(detail, detail.startswith('SEARCH')) for detail in scans]
+        return [(detail, 'INDEX' in detail) for detail in scans]
+
+    # With seq scans priced out, a Seq Scan in the plan means no usable index exists
+    cur.execute("SET LOCAL enable_seqscan = off;")
+    cur.execute("EXPLAIN (FORMAT JSON) " + query, params)
+    plan = cur.fetchone()[0]
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    results = []
+    for node in _postgres_scans(plan[0]['Plan']):
+        detail = f"{node['Node Type']} on {node['Relation Name']}"
+        if expect == 'lookup':
+            ok = 'Index Cond' in node
+            detail += f" ({node.get('Index Cond', 'no index condition')})"
+        else:
+            ok = node['Node Type'] in ('Index Scan', 'Index Only Scan')
+        results.append((detail, ok))
+    return results
+
+
+def check_plans(verbose=True):
+    failures = []
+    with db.cursor() as cur:
+        for name, expect, query, params in hot_queries():
+            for detail, ok in explain(cur, query, params, expect):
+                if verbose:
+                    print(f"{'✅' if ok else '❌'} {name}: {detail}")
+                if not ok:
+                    failures.append((name, detail))
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', nargs='?', default='upgrade', choices=['upgrade', 'status', 'check-plans'])
+    args = parser.parse_args(argv)
+
+    if args.command == 'upgrade':
+        applied = upgrade(verbose=True)
+        print(f"Schema up to date ({len(applied)} migration(s) applied).")
+    elif args.command == 'status':
+        done = set(applied_versions())
+        for version, name, _ in discover():
+            print(f"{'applied' if version in done else 'pending'}  {version}_{name}")
+    else:
+        failures = check_plans()
+        if failures:
+            print(f"{len(failures)} hot query plan(s) are not index scans.")
+            sys.exit(1)
+        print("All hot queries use an index.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,457 @@
+"""Monthly partitions of the reading tables and archival of old months.
+
+Run from the project root:
+    python -m agents.partitions                          # create partitions for the months ahead
+    python -m agents.partitions status                   # hot months and archived files per table
+    python -m agents.partitions archive                  # archive months past the retention age
+    python -m agents.partitions archive --before 2025-03 # archive every month before March 2025
+
+On Postgres, migrations/0007 range-partitions health_monitoring,
+safety_monitoring and daily_reminder by month on timestamp
+(<table>_YYYY_MM). The SQLite stand-in keeps one table per agent and treats
+each month's timestamp range as its partition.
+
+The retention job writes each month older than ELDERLY_CARE_RETENTION_MONTHS
+to zstd Parquet (needs pyarrow):
+    archive/<agent>/month=2025-01/part-0.parquet
+It then detaches and drops the partition (SQLite: deletes the month's rows)
+in the transaction that records the file in archived_partitions. History and
+the combined API read archived months back with read_archive / archive_rows;
+the latest-reading queries only ever touch the hot tables.
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency; without it nothing can be archived
+    pa = None
+
+from agents import db, fleet
+
+# ========================
+# ⚙️ SETTINGS
+# ========================
+ARCHIVE_DIR = os.environ.get(
+    "ELDERLY_CARE_ARCHIVE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'archive'))
+# Whole months kept hot before the current one; older months are archived
+RETENTION_MONTHS = int(os.environ.get("ELDERLY_CARE_RETENTION_MONTHS", "12"))
+# Partitions created ahead of the current month
+MONTHS_AHEAD = int(os.environ.get("ELDERLY_CARE_PARTITIONS_AHEAD", "3"))
+COMPRESSION = os.environ.get("ELDERLY_CARE_ARCHIVE_COMPRESSION", "zstd")
+BATCH_ROWS = 64 * 1024
+# Files are sorted by resident, so a one-resident read decodes one or two row groups
+ROW_GROUP_ROWS = 16 * 1024
+
+# Table columns and their archived types (migrations/0001)
+COLUMNS = {
+    'health': {
+        'user_id': 'string', 'timestamp': 'timestamp[us]', 'heart_rate': 'int32', 'temperature': 'double',
+        'bp_systolic': 'double', 'bp_diastolic': 'double', 'abnormal': 'bool', 'hr_alert': 'bool',
+        'bp_alert': 'bool', 'glucose_level': 'int32', 'glucose_alert': 'bool', 'spo2': 'int32',
+        'spo2_alert': 'bool', 'alert_triggered': 'bool', 'caregiver_notified': 'bool',
+    },
+    'safety': {
+        'user_id': 'string', 'timestamp': 'timestamp[us]', 'event_type': 'string', 'location': 'string',
+        'emergency_call': 'bool', 'unsafe': 'bool', 'fall_detected': 'bool', 'impact_force_level': 'string',
+        'post_fall_inactivity_duration': 'int32', 'alert_triggered': 'bool', 'caregiver_notified': 'bool',
+    },
+    'reminders': {
+        'user_id': 'string', 'timestamp': 'timestamp[us]', 'reminder_type': 'string',
+        'schedule_time': 'time64[us]', 'reminder_sent': 'bool', 'acknowledged': 'bool',
+    },
+}
+
+
+def available():
+    return pa is not None
+
+
+def schema(agent):
+    return pa.schema([(column, pa.type_for_alias(kind)) for column, kind in COLUMNS[agent].items()])
+
+
+# ========================
+# 📅 MONTHS
+# ========================
+def month_of(value):
+    return datetime(value.year, value.month, 1)
+
+
+def next_month(month):
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+def previous_month(month):
+    return (month - timedelta(days=1)).replace(day=1)
+
+
+def retention_cutoff(months=RETENTION_MONTHS, today=None):
+    # First hot month: months before it are archived
+    month = month_of(today or datetime.now())
+    for _ in range(months):
+        month = previous_month(month)
+    return month
+
+
+def partition_name(agent, month):
+    return f"{fleet.TABLES[agent]}_{month:%Y_%m}"
+
+
+# ========================
+# 🧱 PARTITION MANAGER
+# ========================
+# Months this process has seen a partition for. Months past the retention
+# cutoff are never cached: the retention job may drop them from any process.
+_known = set()
+
+
+def partitioned():
+    return db.backend() == 'postgres'
+
+
+def list_partitions(cur, agent):
+    cur.execute("""
+        SELECT child.relname FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = %s::regclass;
+    """, (fleet.TABLES[agent],))
+    return sorted(datetime.strptime(name[-7:], '%Y_%m') for (name,) in cur.fetchall())
+
+
+def ensure(cur, agent, months):
+    # Creates the monthly partitions that don't exist yet; returns how many were created.
+    # Creating one locks the parent table until the transaction ends, which is why
+    # `python -m agents.partitions` (run daily) makes them ahead of the data.
+    if not partitioned():
+        return 0
+    unknown = sorted(set(months) - {month for a, month in _known if a == agent})
+    if not unknown:
+        return 0
+    existing = set(list_partitions(cur, agent))
+    cutoff = retention_cutoff()
+    created = 0
+    for month in unknown:
+        if month not in existing:
+            cur.execute(f"CREATE TABLE IF NOT EXISTS {partition_name(agent, month)} "
+                        f"PARTITION OF {fleet.TABLES[agent]} FOR VALUES FROM (%s) TO (%s);",
+                        (month, next_month(month)))
+            created += 1
+        if month >= cutoff:
+            _known.add((agent, month))
+    return created
+
+
+def ensure_ahead(cur, agent, ahead=MONTHS_AHEAD, today=None):
+    month = month_of(today or datetime.now())
+    months = [month]
+    for _ in range(ahead):
+        month = next_month(month)
+        months.append(month)
+    return ensure(cur, agent, months)
+
+
+def ensure_for(cur, agent, timestamps):
+    # Every month a load reaches, so an insert never finds its partition missing
+    if not partitioned() or len(timestamps) == 0:
+        return 0
+    months = pd.to_datetime(timestamps).dt.to_period('M').unique()
+    return ensure(cur, agent, [month_of(month.start_time) for month in months])
+
+
+def hot_months(cur, agent):
+    if partitioned():
+        return list_partitions(cur, agent)
+    # Both ends come off the (timestamp, user_id) index
+    table = fleet.TABLES[agent]
+    cur.execute(f"SELECT MIN(timestamp), MAX(timestamp) FROM {table};")
+    first, last = cur.fetchone()
+    if first is None:
+        return []
+    # Aggregates come back as text from SQLite
+    first, last = (datetime.fromisoformat(v) if isinstance(v, str) else v for v in (first, last))
+    months, month = [], month_of(first)
+    while month <= last:
+        months.append(month)
+        month = next_month(month)
+    return months
+
+
+# ========================
+# 🗄️ RETENTION
+# ========================
+def _month_dir(agent, month, root):
+    return os.path.join(root, agent, f"month={month:%Y-%m}")
+
+
+def _pending_path(path):
+    # Readers only pick up part-*.parquet, so the file is invisible until renamed into place
+    return os.path.join(os.path.dirname(path), '_' + os.path.basename(path) + '.pending')
+
+
+def recover(agent, root=ARCHIVE_DIR):
+    # Finishes archive runs that stopped between their commit and the rename
+    base = os.path.join(root, agent)
+    if not os.path.isdir(base):
+        return 0
+    pending = [(os.path.join(base, d, name), f"{agent}/{d}/{name[1:-len('.pending')]}")
+               for d in os.listdir(base) if os.path.isdir(os.path.join(base, d))
+               for name in os.listdir(os.path.join(base, d)) if name.endswith('.pending')]
+    if not pending:
+        return 0
+    with db.cursor() as cur:
+        cur.execute("SELECT path FROM archived_partitions WHERE table_name = %s;", (fleet.TABLES[agent],))
+        committed = {row[0] for row in cur.fetchall()}
+    for path, relative in pending:
+        if relative in committed:
+            os.replace(path, os.path.join(root, relative))
+        else:
+            os.remove(path)
+    return len(pending)
+
+
+def _write_rows(cur, agent, path):
+    # Streams the cursor's rows into one Parquet file; returns the row count
+    target = schema(agent)
+    writer, rows = None, 0
+    try:
+        batch = cur.fetchmany(BATCH_ROWS)
+        while batch:
+            arrays = [pa.array(list(values), from_pandas=True).cast(field.type)
+                      for values, field in zip(zip(*batch), target)]
+            if writer is None:
+                writer = pq.ParquetWriter(path, target, compression=COMPRESSION)
+            writer.write_table(pa.Table.from_arrays(arrays, schema=target), row_group_size=ROW_GROUP_ROWS)
+            rows += len(batch)
+            batch = cur.fetchmany(BATCH_ROWS)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def archive_month(agent, month, root=ARCHIVE_DIR):
+    # One month -> archive/<agent>/month=YYYY-MM/part-N.parquet, then out of the hot table.
+    # Writes to the month are blocked while its rows are copied.
+    if pa is None:
+        raise RuntimeError("archiving needs pyarrow (pip install pyarrow)")
+    table = fleet.TABLES[agent]
+    directory = _month_dir(agent, month, root)
+    os.makedirs(directory, exist_ok=True)
+    part = sum(1 for name in os.listdir(directory) if name.startswith(('part-', '_part-')))
+    relative = f"{agent}/month={month:%Y-%m}/part-{part}.parquet"
+    path = os.path.join(root, relative)
+    pending = _pending_path(path)
+    columns = ', '.join(COLUMNS[agent])
+    # Sorted by resident so row-group statistics skip the others on a per-user read
+    if partitioned():
+        source, params = partition_name(agent, month), ()
+    else:
+        source, params = f"{table} WHERE timestamp >= %s AND timestamp < %s", (month, next_month(month))
+    try:
+        with db.connection() as conn:
+            cur = conn.cursor()
+            if partitioned():
+                cur.execute(f"LOCK TABLE {source} IN SHARE MODE;")
+            else:
+                cur.execute("BEGIN IMMEDIATE;")
+            read = conn.cursor(name=f"archive_{table}")
+            read.execute(f"SELECT {columns} FROM {source} ORDER BY user_id, timestamp;", params)
+            rows = _write_rows(read, agent, pending)
+            read.close()
+            if rows:
+                cur.execute("INSERT INTO archived_partitions (path, table_name, month, row_count) "
+                            "VALUES (%s, %s, %s, %s);", (relative, table, f"{month:%Y-%m}", rows))
+            if partitioned():
+                cur.execute(f"ALTER TABLE {table} DETACH PARTITION {source};")
+                cur.execute(f"DROP TABLE {source};")
+            else:
+                cur.execute(f"DELETE FROM {table} WHERE timestamp >= %s AND timestamp < %s;", params)
+            cur.close()
+    except Exception:
+        if os.path.exists(pending):
+            os.remove(pending)
+        raise
+    _known.discard((agent, month))
+    if rows:
+        os.replace(pending, path)
+    elif not os.listdir(directory):
+        os.rmdir(directory)
+    return rows
+
+
+def archive(agent, before=None, root=ARCHIVE_DIR):
+    # Archives every hot month that ends on or before `before` (default: the
+    # retention cutoff), oldest first; returns [(month, rows)]
+    before = month_of(before) if before is not None else retention_cutoff()
+    recover(agent, root)
+    with db.cursor() as cur:
+        months = [month for month in hot_months(cur, agent) if month < before]
+    return [(month, archive_month(agent, month, root)) for month in months]
+
+
+# ========================
+# 📖 READING THE ARCHIVE
+# ========================
+def archived_months(agent, root=ARCHIVE_DIR):
+    base = os.path.join(root, agent)
+    if not os.path.isdir(base):
+        return []
+    return sorted(datetime.strptime(d[len('month='):], '%Y-%m') for d in os.listdir(base)
+                  if d.startswith('month=') and any(name.startswith('part-')
+                                                     for name in os.listdir(os.path.join(base, d))))
+
+
+def archive_end(agent, root=ARCHIVE_DIR):
+    # Start of the first month after the archived ones, or None
+    months = archived_months(agent, root)
+    return next_month(months[-1]) if months else None
+
+
+def overlaps(agent, start=None, end=None, root=ARCHIVE_DIR):
+    return [month for month in archived_months(agent, root)
+            if (end is None or month < end) and (start is None or next_month(month) > start)]
+
+
+def _files(agent, months, root):
+    files = []
+    for month in months:
+        directory = _month_dir(agent, month, root)
+        files += [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+                  if name.startswith('part-') and name.endswith('.parquet')]
+    return files
+
+
+def _filter(user_ids=None, start=None, end=None):
+    expression = None
+    conditions = []
+    if user_ids is not None:
+        conditions.append(ds.field('user_id').isin(list(user_ids)))
+    if start is not None:
+        conditions.append(ds.field('timestamp') >= pa.scalar(pd.Timestamp(start), type=pa.timestamp('us')))
+    if end is not None:
+        conditions.append(ds.field('timestamp') < pa.scalar(pd.Timestamp(end), type=pa.timestamp('us')))
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def _read(agent, months, columns, user_ids, start, end, root):
+    if pa is None:
+        raise RuntimeError(f"reading {os.path.join(root, agent)} needs pyarrow (pip install pyarrow)")
+    dataset = ds.dataset(_files(agent, months, root), schema=schema(agent), format='parquet',
+                         filesystem=pafs.LocalFileSystem(use_mmap=True))
+    return dataset.to_table(columns=list(columns or COLUMNS[agent]), filter=_filter(user_ids, start, end))
+
+
+def read_archive(agent, columns=None, user_ids=None, start=None, end=None, root=ARCHIVE_DIR):
+    # Archived readings as an Arrow table (only the months in range are opened), or None
+    months = overlaps(agent, start, end, root)
+    if not months:
+        return None
+    return _read(agent, months, columns, user_ids, start, end, root)
+
+
+def aggregate_archive(agent, user_ids, start, end, unit, metrics, flags, root=ARCHIVE_DIR):
+    # Per-bucket readings (count_all), count / sum / min / max of each metric and
+    # the number of TRUE values of each flag, bucketed by floor(timestamp, unit),
+    # e.g. unit='minute'. An Arrow table, unordered, or None when nothing is archived.
+    table = read_archive(agent, ['timestamp'] + list(metrics) + list(flags), user_ids, start, end, root)
+    if table is None:
+        return None
+    table = table.append_column('bucket', pc.floor_temporal(table['timestamp'], unit=unit))
+    aggregates = [([], 'count_all')]
+    for metric in metrics:
+        aggregates += [(metric, 'count'), (metric, 'sum'), (metric, 'min'), (metric, 'max')]
+    for flag in flags:
+        table = table.set_column(table.schema.get_field_index(flag), flag,
+                                 pc.fill_null(pc.cast(table[flag], pa.int64()), 0))
+        aggregates.append((flag, 'sum'))
+    return table.group_by('bucket').aggregate(aggregates)
+
+
+def archive_rows(agent, columns, after=None, root=ARCHIVE_DIR):
+    # Archived rows as tuples in (timestamp, user_id) order, the hot tables'
+    # paging order, read a month at a time. after=(timestamp, user_id) resumes
+    # a keyset page.
+    for month in overlaps(agent, after[0] if after else None, None, root):
+        table = _read(agent, [month], list(dict.fromkeys(list(columns) + ['timestamp', 'user_id'])),
+                      None, after[0] if after else None, None, root)
+        if after:
+            ts = pa.scalar(pd.Timestamp(after[0]), type=pa.timestamp('us'))
+            table = table.filter(pc.or_(pc.greater(table['timestamp'], ts),
+                                        pc.and_(pc.equal(table['timestamp'], ts),
+                                                pc.greater(table['user_id'], after[1]))))
+        table = table.sort_by([('timestamp', 'ascending'), ('user_id', 'ascending')]).select(list(columns))
+        for batch in table.to_batches(BATCH_ROWS):
+            yield from zip(*(column.to_pylist() for column in batch.columns))
+
+
+# ========================
+# 🧾 STATUS / CLI
+# ========================
+def status(cur, agent):
+    # [(month, hot rows, archived rows, archived files)]
+    table = fleet.TABLES[agent]
+    months = {}
+    for month in hot_months(cur, agent):
+        cur.execute(f"SELECT COUNT(*) FROM {table} WHERE timestamp >= %s AND timestamp < %s;",
+                    (month, next_month(month)))
+        months[month] = [cur.fetchone()[0], 0, 0]
+    cur.execute("SELECT month, SUM(row_count), COUNT(*) FROM archived_partitions "
+                "WHERE table_name = %s GROUP BY month;", (table,))
+    for label, rows, files in cur.fetchall():
+        entry = months.setdefault(datetime.strptime(label, '%Y-%m'), [0, 0, 0])
+        entry[1:] = [int(rows), int(files)]
+    return [(month, *counts) for month, counts in sorted(months.items())]
+
+
+def main(argv=None):
+    from agents import migrate
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', nargs='?', default='ensure', choices=['ensure', 'status', 'archive'])
+    parser.add_argument('--tables', default=','.join(fleet.TABLES))
+    parser.add_argument('--ahead', type=int, default=MONTHS_AHEAD, help="months to create past the current one")
+    parser.add_argument('--retention-months', type=int, default=RETENTION_MONTHS)
+    parser.add_argument('--before', help="archive every month before this one (YYYY-MM) instead")
+    parser.add_argument('--root', default=ARCHIVE_DIR)
+    args = parser.parse_args(argv)
+
+    migrate.upgrade()
+    for agent in args.tables.split(','):
+        if args.command == 'ensure':
+            if not partitioned():
+                print(f"➖ {agent}: SQLite keeps one table per agent; nothing to create")
+                continue
+            with db.cursor() as cur:
+                created = ensure_ahead(cur, agent, args.ahead)
+                months = list_partitions(cur, agent)
+            print(f"✅ {agent}: {created} created, {len(months)} partitions from {months[0]:%Y-%m} to {months[-1]:%Y-%m}")
+        elif args.command == 'status':
+            with db.cursor() as cur:
+                for month, hot, archived, files in status(cur, agent):
+                    print(f"{agent:<10} {month:%Y-%m}  hot {hot:>10,}  archived {archived:>10,} in {files} file(s)")
+        else:
+            if not available():
+                sys.exit("❌ pyarrow is not installed (pip install pyarrow)")
+            before = (datetime.strptime(args.before, '%Y-%m') if args.before
+                      else retention_cutoff(args.retention_months))
+            done = archive(agent, before, args.root)
+            for month, rows in done:
+                print(f"✅ {agent} {month:%Y-%m}: {rows:,} rows archived")
+            if not done:
+                print(f"➖ {agent}: nothing older than {before:%Y-%m}")
+
+
+if __name__ == '__main__':
+    main()
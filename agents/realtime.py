@@ -0,0 +1,399 @@
+import atexit
+import glob
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from agents import alerts, db, detect, ingest, reminders, scoring
+from agents.registry import registry
+from agents.features import LOCATIONS, MOVEMENT_ACTIVITIES, REMINDER_TYPES, features_from_db
+
+# ========================
+# 📥 REAL-TIME INGESTION
+# ========================
+# Device readings are validated on arrival, buffered per agent and written in
+# micro-batches: a flush happens when FLUSH_SIZE readings are waiting or the
+# oldest has waited FLUSH_INTERVAL seconds. Each flush scores the whole batch
+# with one model call and upserts it, flag included, through ingest.load_frame.
+# Accepted readings also go straight to the streaming detectors (agents/detect.py),
+# flagged readings are queued for caregivers once stored (agents/alerts.py) and
+# stored reminder rows reschedule their reminders (agents/reminders.py).
+FLUSH_SIZE = int(os.environ.get("ELDERLY_CARE_FLUSH_SIZE", "500"))
+FLUSH_INTERVAL = float(os.environ.get("ELDERLY_CARE_FLUSH_INTERVAL", "1.0"))
+# Readings held in memory before new submissions are refused with 503
+MAX_PENDING = int(os.environ.get("ELDERLY_CARE_INGEST_MAX_PENDING", "20000"))
+# Where unflushed readings go if the database is unreachable at shutdown
+SPILL_DIR = os.environ.get("ELDERLY_CARE_SPILL_DIR", "spill")
+
+# Columns a reading must carry (cleaned_data names) and defaults for the rest
+REQUIRED_COLUMNS = {
+    'health': ['user_id', 'timestamp', 'heart_rate', 'hr_alert', 'bp_alert', 'glucose_level',
+               'glucose_alert', 'spo2', 'spo2_alert', 'systolic_bp', 'diastolic_bp'],
+    'safety': ['user_id', 'timestamp', 'movement_activity', 'fall_detected',
+               'post_fall_inactivity_duration', 'location'],
+    'reminders': ['user_id', 'timestamp', 'reminder_type', 'schedule_time', 'reminder_sent'],
+}
+OPTIONAL_DEFAULTS = {
+    'health': {'alert_triggered': 0, 'caregiver_notified': 0},
+    'safety': {'impact_force_level': None, 'alert_triggered': 0, 'caregiver_notified': 0},
+    'reminders': {'acknowledged': 0},
+}
+CATEGORIES = {
+    'safety': {'movement_activity': MOVEMENT_ACTIVITIES, 'location': LOCATIONS},
+    'reminders': {'reminder_type': REMINDER_TYPES},
+}
+# Columns that must be numbers; ingest.INT_COLUMNS among them must be whole
+NUMERIC_COLUMNS = {
+    'health': ['heart_rate', 'glucose_level', 'spo2', 'systolic_bp', 'diastolic_bp'],
+    'safety': ['post_fall_inactivity_duration'],
+    'reminders': [],
+}
+# Model output persisted with each row. The reminder model predicts the
+# acknowledged column itself, so reminder readings are stored as sent.
+FLAG_COLUMNS = {
+    'health': 'abnormal',
+    'safety': 'unsafe',
+}
+
+
+class Backpressure(Exception):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+FLAG_VALUES = {'1': 1, 'true': 1, 'yes': 1, '0': 0, 'false': 0, 'no': 0}
+
+
+def _as_flag(series):
+    # Accepts 0/1, true/false and the datasets' Yes/No. Anything that is not a
+    # bool or a number is read as text, whatever dtype pandas gave the column.
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+        flags = series.astype(float)
+        if not flags.isin([0, 1]).all():
+            raise scoring.BatchError(f"{series.name} must be 0 or 1")
+        return flags.astype(int)
+    flags = series.astype(str).str.strip().str.lower().map(FLAG_VALUES)
+    if flags.isnull().any():
+        raise scoring.BatchError(f"{series.name} must be yes/no, true/false or 1/0")
+    return flags.astype(int)
+
+
+def readings_frame(agent, payload):
+    # Validate a single reading or a batch and return it with cleaned_data columns
+    if isinstance(payload, dict) and 'records' not in payload and 'columns' not in payload \
+            and not any(isinstance(value, list) for value in payload.values()):
+        payload = [payload]
+    df = scoring.batch_frame(payload)
+
+    missing = [col for col in REQUIRED_COLUMNS[agent] if col not in df.columns]
+    if missing:
+        raise scoring.BatchError(f"missing columns: {', '.join(missing)}")
+    if df[REQUIRED_COLUMNS[agent]].isnull().values.any():
+        raise scoring.BatchError("reading values must not be null")
+
+    df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce', format='ISO8601')
+    if df['timestamp'].isnull().any():
+        raise scoring.BatchError("timestamp must be an ISO 8601 date and time")
+    for col in NUMERIC_COLUMNS[agent]:
+        values = pd.to_numeric(df[col], errors='coerce')
+        if values.isnull().any() or not np.isfinite(values).all():
+            raise scoring.BatchError(f"{col} must be a number")
+        if col in ingest.INT_COLUMNS[agent] and (values % 1 != 0).any():
+            raise scoring.BatchError(f"{col} must be a whole number")
+        df[col] = values
+    if 'schedule_time' in df.columns:
+        since_midnight = pd.to_timedelta(df['schedule_time'].astype(str), errors='coerce')
+        if since_midnight.isnull().any() or not since_midnight.between(pd.Timedelta(0), pd.Timedelta(hours=24),
+                                                                       inclusive='left').all():
+            raise scoring.BatchError("schedule_time must be a time of day (HH:MM:SS)")
+    for col, classes in CATEGORIES.get(agent, {}).items():
+        unknown = sorted(set(df[col]) - set(classes))
+        if unknown:
+            raise scoring.BatchError(f"unknown {col}: {', '.join(map(str, unknown))}")
+    for col, default in OPTIONAL_DEFAULTS[agent].items():
+        if col not in df.columns:
+            df[col] = default
+    for col in ingest.BOOL_COLUMNS[agent]:
+        df[col] = _as_flag(df[col])
+    return df[REQUIRED_COLUMNS[agent] + list(OPTIONAL_DEFAULTS[agent])]
+
+
+class MicroBatcher:
+    def __init__(self, agent, flush_size=FLUSH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 max_pending=MAX_PENDING, spill_dir=SPILL_DIR):
+        self.agent = agent
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.spill_dir = spill_dir
+        self._frames = []
+        self._pending = 0
+        self._oldest = None
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()   # one writer at a time
+        self._thread = None
+        self._closed = False
+        self.accepted = 0
+        self.rejected = 0
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.flush_errors = 0
+        self.spilled = 0
+        self.recovered = 0
+        self.quarantined = 0
+        self.last_flush_ms = 0.0
+
+    def submit(self, df):
+        with self._cond:
+            if self._closed:
+                raise Backpressure("ingestion is shutting down", self.flush_interval)
+            if self._pending + len(df) > self.max_pending:
+                self.rejected += len(df)
+                raise Backpressure(f"{self._pending} readings already waiting to be written",
+                                   self.flush_interval)
+            was_empty = self._pending == 0
+            self._append(df)
+            self.accepted += len(df)
+            if self._thread is None:
+                self._start()
+            # An idle flusher waits without a timeout: the first reading arms the interval
+            if was_empty or self._pending >= self.flush_size:
+                self._cond.notify()
+            pending = self._pending
+        # Outside the buffer lock: detection never holds up other submissions. The
+        # readings are already buffered, so a detector failure must not fail the request.
+        try:
+            detect.process(self.agent, df)
+        except Exception as e:
+            print(f"⚠️ {self.agent} detection failed: {e}")
+        return pending
+
+    def _append(self, df, front=False):
+        if front:
+            self._frames.insert(0, df)
+        else:
+            self._frames.append(df)
+        self._pending += len(df)
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+
+    def start(self):
+        # Starts the flusher without waiting for a submission, e.g. to recover a spill
+        with self._cond:
+            if self._thread is None and not self._closed:
+                self._start()
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name=f"ingest-{self.agent}", daemon=True)
+        self._thread.start()
+
+    def _due_in(self):
+        if self._pending >= self.flush_size:
+            return 0
+        if self._pending == 0:
+            return None
+        return max(0.0, self._oldest + self.flush_interval - time.monotonic())
+
+    def _run(self):
+        # On the flusher thread, so recovery never holds up submissions
+        self._recover()
+        while True:
+            with self._cond:
+                while not self._closed and self._due_in() != 0:
+                    self._cond.wait(self._due_in())
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                # Rows are back in the buffer; retry after one interval
+                print(f"⚠️ {self.agent} flush failed: {e}")
+                with self._cond:
+                    self._cond.wait(self.flush_interval)
+
+    def flush(self):
+        with self._flush_lock:
+            with self._cond:
+                frames, self._frames = self._frames, []
+                self._pending, self._oldest = 0, None
+            if not frames:
+                return 0
+            batch = pd.concat(frames, ignore_index=True)
+            start = time.perf_counter()
+            try:
+                try:
+                    table_df = self._prepare(batch)
+                except (ValueError, TypeError) as e:
+                    # Readings the model cannot score would fail every retry and hold up
+                    # the rest of the buffer: set them aside and write the others
+                    bad = self._unscorable(batch)
+                    if not bad:
+                        raise
+                    self._quarantine(batch.iloc[bad], e)
+                    batch = batch.drop(index=batch.index[bad]).reset_index(drop=True)
+                    table_df = self._prepare(batch) if len(batch) else None
+                if table_df is not None:
+                    self._write(table_df)
+            except Exception:
+                with self._cond:
+                    self._append(batch, front=True)
+                    self.flush_errors += 1
+                raise
+            with self._cond:
+                self.flushes += 1
+                self.flushed_rows += len(batch)
+                self.last_flush_ms = round(1000 * (time.perf_counter() - start), 3)
+            return len(batch)
+
+    def _prepare(self, batch):
+        # One vectorized predict for the whole batch
+        table_df = ingest.to_table_frame(self.agent, batch)
+        if self.agent in FLAG_COLUMNS:
+            # Resolved per flush so a hot-reloaded model applies from the next batch
+            model = registry.get(self.agent)
+            features = scoring.model_inputs(model, features_from_db(self.agent, table_df))
+            predictions, _ = scoring.score_frame(model, features)
+            table_df[FLAG_COLUMNS[self.agent]] = predictions.astype(bool)
+        return table_df
+
+    def _unscorable(self, batch):
+        # Positions of the rows _prepare rejects on their own
+        bad = []
+        for i in range(len(batch)):
+            try:
+                self._prepare(batch.iloc[[i]])
+            except (ValueError, TypeError):
+                bad.append(i)
+        return bad
+
+    def _quarantine(self, rows, error):
+        # Kept for inspection but never recovered: the same rows would fail again
+        directory = os.path.join(self.spill_dir, 'quarantine')
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.agent}-{time.time_ns()}.csv")
+        rows.to_csv(path, index=False, date_format='%Y-%m-%d %H:%M:%S')
+        with self._cond:
+            self.quarantined += len(rows)
+        print(f"⚠️ {self.agent}: {len(rows)} readings could not be scored ({error}); moved to {path}")
+
+    def _write(self, table_df):
+        # One bulk upsert for the whole batch
+        with db.cursor() as cur:
+            ingest.load_frame(cur, self.agent, table_df)
+        try:
+            alerts.enqueue_readings(self.agent, table_df)
+        except Exception as e:
+            # The rows are stored; failing the flush now would only write them twice
+            print(f"⚠️ {self.agent} alerts not queued: {e}")
+        try:
+            reminders.schedule_readings(self.agent, table_df)
+        except Exception as e:
+            print(f"⚠️ {self.agent} schedules not updated: {e}")
+
+    def close(self):
+        # Stop the flusher, write what is left, spill to disk if the database is gone
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"⚠️ {self.agent} final flush failed ({e}); spilling to {self.spill_dir}/")
+            self._spill()
+
+    def _spill(self):
+        with self._cond:
+            frames, self._frames = self._frames, []
+            self._pending, self._oldest = 0, None
+        if not frames:
+            return
+        batch = pd.concat(frames, ignore_index=True)
+        os.makedirs(self.spill_dir, exist_ok=True)
+        path = os.path.join(self.spill_dir, f"{self.agent}-{time.time_ns()}.csv")
+        batch.to_csv(path, index=False, date_format='%Y-%m-%d %H:%M:%S')
+        self.spilled += len(batch)
+
+    def _read_spill(self, path):
+        # Spilled rows were validated on arrival; rebuild the frame without the
+        # request size limit (a spill holds up to max_pending readings)
+        df = pd.read_csv(path, dtype={'user_id': str}, parse_dates=['timestamp'], date_format='%Y-%m-%d %H:%M:%S')
+        for col in ingest.BOOL_COLUMNS[self.agent]:
+            df[col] = _as_flag(df[col])
+        return df[REQUIRED_COLUMNS[self.agent] + list(OPTIONAL_DEFAULTS[self.agent])]
+
+    def _recover(self):
+        # Readings spilled by an earlier shutdown go to the front of the queue, oldest
+        # file first; a file that cannot be read stays on disk for a later start
+        for path in sorted(glob.glob(os.path.join(self.spill_dir, f"{self.agent}-*.csv")), reverse=True):
+            try:
+                spilled = self._read_spill(path)
+            except Exception as e:
+                print(f"⚠️ {self.agent} spill {path} not recovered: {e}")
+                continue
+            with self._cond:
+                self._append(spilled, front=True)
+                self.recovered += len(spilled)
+                self._cond.notify()
+            os.remove(path)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'pending': self._pending,
+                'max_pending': self.max_pending,
+                'flush_size': self.flush_size,
+                'flush_interval_seconds': self.flush_interval,
+                'accepted': self.accepted,
+                'rejected': self.rejected,
+                'flushes': self.flushes,
+                'flushed_rows': self.flushed_rows,
+                'flush_errors': self.flush_errors,
+                'spilled': self.spilled,
+                'recovered': self.recovered,
+                'quarantined': self.quarantined,
+                'last_flush_ms': self.last_flush_ms,
+            }
+
+
+# ========================
+# 🔌 SHARED BATCHERS
+# ========================
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+def batcher(agent):
+    with _batchers_lock:
+        if agent not in _batchers:
+            _batchers[agent] = MicroBatcher(agent)
+        return _batchers[agent]
+
+
+def start():
+    # Called once by the serving process: an agent with readings spilled by an
+    # earlier shutdown gets its flusher now, so they are stored without waiting
+    # for that agent's next reading
+    for agent in REQUIRED_COLUMNS:
+        if glob.glob(os.path.join(SPILL_DIR, f"{agent}-*.csv")):
+            batcher(agent).start()
+
+
+def stats():
+    with _batchers_lock:
+        return {agent: b.stats() for agent, b in _batchers.items()}
+
+
+def close_all():
+    with _batchers_lock:
+        batchers = list(_batchers.values())
+    for b in batchers:
+        b.close()
+
+
+atexit.register(close_all)
@@ -0,0 +1,48 @@
+# ========================
+# 🧾 RESPONSE RECORDS
+# ========================
+# Row -> JSON shapes shared by the Flask app (agents/agents.py) and the async
+# app (agents/asgi.py). Rows come from SELECT * in the table's column order.
+# Timestamps and times stay as the driver returns them and the JSON encoder in
+# agents/respond.py writes them as ISO 8601. Flags are coerced to bool, so a
+# NULL flag (a row stored before it was scored) still reads as false.
+def health_record(row):
+    return {
+        'user_id': row[0],
+        'timestamp': row[1],
+        'heart_rate': row[2],
+        'temperature': row[3],
+        'bp_systolic': row[4],
+        'bp_diastolic': row[5],
+        'abnormal': bool(row[6])
+    }
+
+
+def safety_record(row):
+    return {
+        'user_id': row[0],
+        'timestamp': row[1],
+        'event_type': row[2],
+        'location': row[3],
+        'emergency_call': bool(row[4]),
+        'unsafe': bool(row[5])
+    }
+
+
+def reminder_record(row):
+    return {
+        'user_id': row[0],
+        'timestamp': row[1],
+        'reminder_type': row[2],
+        'start_time': row[3],
+        'schedule_time': row[3],
+        'reminder_sent': bool(row[4]),
+        'acknowledged': bool(row[5])
+    }
+
+
+RECORDS = {
+    'health': health_record,
+    'safety': safety_record,
+    'reminders': reminder_record,
+}
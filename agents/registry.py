@@ -0,0 +1,215 @@
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime, timezone
+
+import numpy as np
+
+from agents.compiled import compile_model
+from agents.features import HEALTH_FEATURES, REMINDER_FEATURES, SAFETY_FEATURES
+from agents.lookup import build_table
+
+# ========================
+# 📦 MODEL REGISTRY
+# ========================
+# One place that owns models/*.pkl. A model is loaded on first use (or up front
+# with warm_up()), identified by the SHA-256 of its file, and replaced by
+# swapping a single dict entry: requests already holding the old model finish
+# with it, the next get() sees the new one, nothing waits on the file read.
+MODEL_DIR = os.environ.get("ELDERLY_CARE_MODEL_DIR", "models")
+MODEL_FILES = {
+    'health': 'health_alert.pkl',
+    'safety': 'safety_alert.pkl',
+    'reminders': 'daily_reminder.pkl',
+}
+# Input order for models fitted on bare arrays (health_alert.pkl has no feature names)
+FEATURE_ORDER = {
+    'health': HEALTH_FEATURES,
+    'safety': SAFETY_FEATURES,
+    'reminders': REMINDER_FEATURES,
+}
+# lazy: load on first request; background: start loading at import in a
+# thread; eager: load before the app finishes importing
+WARMUP = os.environ.get("ELDERLY_CARE_MODEL_WARMUP", "lazy")
+# Seconds between checks for a changed model file (0 turns watching off)
+WATCH_INTERVAL = float(os.environ.get("ELDERLY_CARE_MODEL_WATCH", "0"))
+HISTORY_SIZE = 5
+
+ModelVersion = namedtuple('ModelVersion', 'agent model compiled table version sha256 path size mtime loaded_at load_ms warmup_ms')
+
+
+def _warm_up(model):
+    # One throwaway prediction pulls in sklearn's lazy imports and validation paths
+    n_features = getattr(model, 'n_features_in_', None)
+    if n_features is None:
+        return
+    sample = np.zeros((1, n_features))
+    names = getattr(model, 'feature_names_in_', None)
+    if names is not None:
+        import pandas as pd
+        sample = pd.DataFrame(sample, columns=names)
+    model.predict_proba(sample)
+
+
+class ModelRegistry:
+    def __init__(self, model_dir=MODEL_DIR, files=MODEL_FILES, watch_interval=WATCH_INTERVAL):
+        self.model_dir = model_dir
+        self.files = dict(files)
+        self.watch_interval = watch_interval
+        self._active = {}            # agent -> ModelVersion
+        self._history = {agent: deque(maxlen=HISTORY_SIZE) for agent in files}
+        self._next_check = {}
+        self._locks = {agent: threading.Lock() for agent in files}
+        self.reloads = 0
+        self.rejected = 0
+
+    def path(self, agent):
+        return os.path.join(self.model_dir, self.files[agent])
+
+    def resolve(self, name):
+        # A model file named by a client: a bare file name that stays inside model_dir
+        if not isinstance(name, str) or not name or os.path.basename(name) != name:
+            raise ValueError("path must be the name of a file in the model directory")
+        root = os.path.realpath(self.model_dir)
+        path = os.path.realpath(os.path.join(root, name))
+        if os.path.dirname(path) != root:
+            raise ValueError(f"{name} is outside the model directory")
+        return path
+
+    def get(self, agent):
+        entry = self._active.get(agent)
+        if entry is None:
+            return self.load(agent).model
+        if self.watch_interval and time.monotonic() >= self._next_check.get(agent, 0):
+            self._reload_if_changed(agent, entry)
+        return self._active[agent].model
+
+    def compiled(self, agent):
+        # Pandas-free scorer for the active model, or None if it has no compiled form
+        self.get(agent)
+        return self._active[agent].compiled
+
+    def table(self, agent):
+        # Precomputed predictions for the active model (agents/lookup.py), or None
+        self.get(agent)
+        return self._active[agent].table
+
+    def active(self, agent):
+        return self._active.get(agent)
+
+    def load(self, agent, path=None):
+        # Load, check and warm a model file, then swap it in with one assignment
+        lock = self._locks[agent]
+        with lock:
+            current = self._active.get(agent)
+            if current is not None and path is None and not self._changed(current):
+                return current
+            entry = self._read(agent, path or self.path(agent), current)
+            if current is not None:
+                self._history[agent].appendleft(current._replace(model=None, compiled=None, table=None))
+                self.reloads += 1
+            self._active[agent] = entry
+            self._next_check[agent] = time.monotonic() + self.watch_interval
+            return entry
+
+    def _read(self, agent, path, current):
+        import joblib
+        start = time.perf_counter()
+        with open(path, 'rb') as f:
+            data = f.read()
+        stat = os.stat(path)
+        model = joblib.load(io.BytesIO(data))
+        load_ms = 1000 * (time.perf_counter() - start)
+
+        # A replacement must score the same inputs as the model it replaces
+        if not hasattr(model, 'predict_proba'):
+            self.rejected += 1
+            raise ValueError(f"{path} does not contain a classifier with predict_proba")
+        if current is not None and getattr(model, 'n_features_in_', None) != getattr(current.model, 'n_features_in_', None):
+            self.rejected += 1
+            raise ValueError(f"{path} expects {getattr(model, 'n_features_in_', '?')} features, "
+                             f"the active {agent} model expects {getattr(current.model, 'n_features_in_', '?')}")
+
+        start = time.perf_counter()
+        _warm_up(model)
+        warmup_ms = 1000 * (time.perf_counter() - start)
+        sha256 = hashlib.sha256(data).hexdigest()
+        compiled = compile_model(model, FEATURE_ORDER.get(agent))
+        return ModelVersion(agent=agent, model=model, compiled=compiled, table=build_table(agent, compiled),
+                            version=sha256[:12], sha256=sha256, path=path,
+                            size=stat.st_size, mtime=stat.st_mtime,
+                            loaded_at=datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                            load_ms=round(load_ms, 3), warmup_ms=round(warmup_ms, 3))
+
+    def _changed(self, entry):
+        try:
+            stat = os.stat(entry.path)
+        except OSError:
+            return False
+        return (stat.st_mtime, stat.st_size) != (entry.mtime, entry.size)
+
+    def _reload_if_changed(self, agent, entry):
+        # Whoever gets the lock checks the file; everyone else keeps serving the current model
+        lock = self._locks[agent]
+        if not lock.acquire(blocking=False):
+            return
+        try:
+            self._next_check[agent] = time.monotonic() + self.watch_interval
+            changed = self._changed(entry)
+        finally:
+            lock.release()
+        if changed:
+            try:
+                self.load(agent)
+            except (OSError, ValueError) as e:
+                # Keep serving the last good model; retry at the next check
+                print(f"⚠️ {agent} model not reloaded: {e}")
+
+    def warm_up(self, agents=None):
+        timings = {}
+        for agent in agents or self.files:
+            start = time.perf_counter()
+            self.load(agent)
+            timings[agent] = round(1000 * (time.perf_counter() - start), 3)
+        return timings
+
+    def warm_up_in_background(self, agents=None):
+        thread = threading.Thread(target=self.warm_up, args=(agents,), name='model-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    def version(self, agent):
+        # Short sha of the model being served, None before its first load
+        entry = self._active.get(agent)
+        return entry.version if entry else None
+
+    def status(self):
+        status = {'reloads': self.reloads, 'rejected': self.rejected,
+                  'watch_interval_seconds': self.watch_interval, 'models': {}}
+        for agent in self.files:
+            entry = self._active.get(agent)
+            status['models'][agent] = {
+                'loaded': entry is not None,
+                'path': entry.path if entry else self.path(agent),
+                'version': entry.version if entry else None,
+                'sha256': entry.sha256 if entry else None,
+                'loaded_at': entry.loaded_at if entry else None,
+                'load_ms': entry.load_ms if entry else None,
+                'warmup_ms': entry.warmup_ms if entry else None,
+                'compiled': entry.compiled is not None if entry else None,
+                'prediction_table': entry.table.stats() if entry and entry.table else None,
+                'previous_versions': [{'version': old.version, 'path': old.path, 'loaded_at': old.loaded_at}
+                                      for old in self._history[agent]],
+            }
+        return status
+
+
+registry = ModelRegistry()
+
+if WARMUP == 'eager':
+    registry.warm_up()
+elif WARMUP == 'background':
+    registry.warm_up_in_background()
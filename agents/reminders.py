@@ -0,0 +1,493 @@
+import atexit
+import heapq
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+from array import array
+from collections import deque
+from datetime import datetime
+
+import pandas as pd
+
+from agents import db, ingest, scoring
+from agents.features import REMINDER_TYPES, features_from_db
+from agents.registry import registry
+
+# ========================
+# ⏰ REMINDER SCHEDULER
+# ========================
+# Each resident's newest daily_reminder row per reminder_type is their daily
+# schedule: it fires every day at schedule_time. All schedules live in flat
+# arrays (one slot each) and one min-heap of ints keyed by next fire second,
+# so nothing polls the table. Due reminders are popped and delivered in
+# batches; a writer thread then marks them reminder_sent with one bulk upsert
+# per batch. A pending row (reminder_sent false) is marked when it fires; on
+# later days a sent row is added for each firing, stamped a second per type
+# after the fire time so types due together keep separate rows. Rows arriving through
+# /reminders/ingest reschedule just their slot. Reminder types the reminder
+# model expects to go unacknowledged are sent first in a batch and sent once
+# more if they are still unacknowledged RESEND_AFTER seconds later.
+ENABLED = os.environ.get("ELDERLY_CARE_REMINDERS", "1") not in ('0', 'false', 'no')
+SPILL_DIR = os.environ.get("ELDERLY_CARE_SPILL_DIR", "spill")
+# 'local' or 'package.module:ClassName'
+SINK = os.environ.get("ELDERLY_CARE_REMINDER_SINK", "local")
+BATCH_SIZE = int(os.environ.get("ELDERLY_CARE_REMINDER_BATCH", "5000"))
+# A reminder found more than this late is skipped and its schedule moves to the next day
+GRACE_SECONDS = int(os.environ.get("ELDERLY_CARE_REMINDER_GRACE", "3600"))
+# Predicted chance of going unacknowledged at which a reminder is resent
+RESEND_RISK = float(os.environ.get("ELDERLY_CARE_REMINDER_RESEND_RISK", "0.2"))
+RESEND_AFTER = int(os.environ.get("ELDERLY_CARE_REMINDER_RESEND_AFTER", "900"))
+WRITE_BATCH = 5000
+MAX_SLEEP = 1.0
+RELOAD_RETRY_SECONDS = 30
+SHUTDOWN_SECONDS = 30.0
+DAY = 86400
+# Heap entries are fire_second * SLOT_SPACE + slot: one int each, no tuples
+SLOT_SPACE = 1 << 24
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+EPOCH = datetime(1970, 1, 1)
+KINDS = {name: code for code, name in enumerate(REMINDER_TYPES)}
+
+
+def wall_clock():
+    # Stored timestamps and schedule_time are local wall-clock time
+    return int((datetime.now() - EPOCH).total_seconds())
+
+
+def _format(t):
+    return time.strftime(TIMESTAMP_FORMAT, time.gmtime(t))
+
+
+def _clock_time(seconds):
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def schedule_frame(df):
+    # daily_reminder rows (table or cleaned_data columns) -> one row per
+    # (user_id, kind) with the schedule it sets and its next fire second
+    seconds = (pd.to_datetime(df['timestamp']) - EPOCH) // pd.Timedelta(seconds=1)
+    sched = pd.to_timedelta(df['schedule_time'].astype(str)) // pd.Timedelta(seconds=1)
+    out = pd.DataFrame({
+        'user_id': df['user_id'].astype(str),
+        'kind': df['reminder_type'].map(KINDS),
+        'since': seconds,
+        'sched': sched,
+        'pending': ~df['reminder_sent'].fillna(False).astype(bool),
+    }).dropna(subset=['kind', 'since', 'sched'])
+    day = out['since'] - out['since'] % DAY
+    # A pending row fires at its first schedule_time at or after it; a sent row covers its day
+    out['due'] = day + out['sched']
+    out.loc[out['pending'] & (out['due'] < out['since']), 'due'] += DAY
+    out.loc[~out['pending'], 'due'] = day + DAY + out['sched']
+    out = out.astype({'kind': 'int8', 'since': 'int64', 'sched': 'int32', 'due': 'int64'})
+    return out.sort_values('since', kind='stable').drop_duplicates(['user_id', 'kind'], keep='last')
+
+
+# ========================
+# 📤 SINKS
+# ========================
+# A sink is any object with `deliver(reminders)` taking a list of dicts; it is
+# called from the scheduler thread, so it should hand off rather than block.
+class LocalSink:
+    # Stand-in for a push service: appends each batch to a JSON-lines file
+    def __init__(self, path=os.environ.get("ELDERLY_CARE_REMINDER_LOG", os.path.join(SPILL_DIR, "reminders.jsonl"))):
+        self.path = path
+        self.count = 0
+        self.lock = threading.Lock()
+        if path:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def deliver(self, reminders):
+        with self.lock:
+            self.count += len(reminders)
+            if self.path:
+                with open(self.path, 'a') as f:
+                    f.writelines(json.dumps(r) + '\n' for r in reminders)
+
+
+SINKS = {
+    'local': LocalSink,
+}
+
+
+def make_sink(spec=SINK):
+    if spec in SINKS:
+        return SINKS[spec]()
+    module, _, name = spec.partition(':')
+    return getattr(importlib.import_module(module), name)()
+
+
+# ========================
+# 🗓️ SCHEDULER
+# ========================
+class ReminderScheduler:
+    def __init__(self, sink=None, clock=wall_clock, batch_size=BATCH_SIZE, grace=GRACE_SECONDS,
+                 resend_risk=RESEND_RISK, resend_after=RESEND_AFTER, store=True):
+        self.sink = sink or make_sink()
+        self.clock = clock
+        self.batch_size = batch_size
+        self.grace = grace
+        self.resend_risk = resend_risk
+        self.resend_after = resend_after
+        self.store = store
+        # Per slot
+        self.due = array('q')        # next fire second
+        self.since = array('q')      # timestamp of the row that set the schedule
+        self.sched = array('i')      # schedule_time as seconds after midnight
+        self.kind = array('b')       # REMINDER_TYPES code
+        self.pending = bytearray()   # 1 while that row itself is still unsent
+        self.users = []
+        self.index = [{} for _ in REMINDER_TYPES]   # per kind: user_id -> slot
+        self.heap = []
+        self.lock = threading.Lock()
+        self.risk = [0.0] * len(REMINDER_TYPES)
+        self._model = None
+        self._outbox = deque()       # fired batches for the writer
+        self._unwritten = []
+        self._follow_ups = []        # (check second, user_id, timestamp, kind, schedule_time)
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+        self._thread = None
+        self._writer = None
+        self._closed = False
+        self.loaded = False
+        self.fired = 0
+        self.missed = 0
+        self.rescheduled = 0
+        self.resent = 0
+        self.written = 0
+        self.write_errors = 0
+        self.stale_entries = 0
+        self.skew = db.Timings()      # due -> delivered to the sink
+        self.load_seconds = 0.0
+
+    # ---- schedules ----
+    def load(self):
+        # Newest row per resident and reminder type
+        start = time.perf_counter()
+        with db.cursor() as cur:
+            cur.execute("SELECT user_id, timestamp, reminder_type, schedule_time, reminder_sent FROM ("
+                        "SELECT user_id, timestamp, reminder_type, schedule_time, reminder_sent, ROW_NUMBER() "
+                        "OVER (PARTITION BY user_id, reminder_type ORDER BY timestamp DESC) AS newest "
+                        "FROM daily_reminder) rows WHERE newest = 1;")
+            rows = cur.fetchall()
+        df = pd.DataFrame(rows, columns=['user_id', 'timestamp', 'reminder_type', 'schedule_time', 'reminder_sent'])
+        count = self.schedule(df)
+        self.loaded = True
+        self.load_seconds = time.perf_counter() - start
+        return count
+
+    def schedule(self, df):
+        # Apply new or changed daily_reminder rows; rows older than a slot's schedule are ignored
+        frame = schedule_frame(df)
+        changed = 0
+        with self.lock:
+            fresh = not self.heap
+            for user_id, kind, since, sched, pending, due in zip(
+                    frame['user_id'].tolist(), frame['kind'].tolist(), frame['since'].tolist(),
+                    frame['sched'].tolist(), frame['pending'].tolist(), frame['due'].tolist()):
+                slot = self.index[kind].get(user_id)
+                if slot is None:
+                    slot = len(self.users)
+                    self.index[kind][user_id] = slot
+                    self.users.append(user_id)
+                    self.due.append(due)
+                    self.since.append(since)
+                    self.sched.append(sched)
+                    self.kind.append(kind)
+                    self.pending.append(pending)
+                    if not fresh:
+                        heapq.heappush(self.heap, due * SLOT_SPACE + slot)
+                    changed += 1
+                    continue
+                # The same pending row again only counts while it has not fired
+                if since < self.since[slot] or (since == self.since[slot] and pending and not self.pending[slot]):
+                    continue
+                self.since[slot], self.sched[slot], self.pending[slot] = since, sched, pending
+                if due != self.due[slot]:
+                    # The old heap entry goes stale and is skipped when popped
+                    self.due[slot] = due
+                    heapq.heappush(self.heap, due * SLOT_SPACE + slot)
+                    self.rescheduled += 1
+                changed += 1
+            if fresh:
+                self.heap = [due * SLOT_SPACE + slot for slot, due in enumerate(self.due)]
+                heapq.heapify(self.heap)
+            elif len(self.heap) > 2 * len(self.users) + 100000:
+                self._compact()
+        self._wake.set()
+        return changed
+
+    def _compact(self):
+        self.stale_entries += len(self.heap) - len(self.users)
+        self.heap = [due * SLOT_SPACE + slot for slot, due in enumerate(self.due)]
+        heapq.heapify(self.heap)
+
+    def next_due(self):
+        with self.lock:
+            return self.heap[0] // SLOT_SPACE if self.heap else None
+
+    # ---- firing ----
+    def _risks(self):
+        # Chance each reminder type goes unacknowledged once sent, from the active reminder model
+        try:
+            model = registry.get('reminders')
+        except (OSError, ValueError) as e:
+            if self._model is None:
+                print(f"⚠️ reminder model unavailable, no reminders will be prioritized or resent: {e}")
+                self._model = False
+            return self.risk
+        if model is not self._model:
+            frame = pd.DataFrame({'reminder_sent': [1] * len(REMINDER_TYPES), 'reminder_type': REMINDER_TYPES})
+            _, acknowledged = scoring.score_frame(model, scoring.model_inputs(model, features_from_db('reminders', frame)))
+            self.risk = [round(1.0 - float(p), 4) for p in acknowledged]
+            self._model = model
+        return self.risk
+
+    def _pop_due(self, now):
+        # Up to batch_size valid (fire second, slot, row timestamp) due by now; each slot moves to its next day
+        limit = (now + 1) * SLOT_SPACE
+        out = []
+        with self.lock:
+            # Inside the lock: schedule() replaces self.heap when it rebuilds or compacts it
+            heap, due = self.heap, self.due
+            while heap and heap[0] < limit and len(out) < self.batch_size:
+                t, slot = divmod(heapq.heappop(heap), SLOT_SPACE)
+                if due[slot] != t:
+                    continue
+                if self.pending[slot]:
+                    row = self.since[slot]
+                    self.pending[slot] = 0
+                else:
+                    # Rows are keyed by (user_id, timestamp): types due together get a second each
+                    row = t + self.kind[slot]
+                if t < now - self.grace:
+                    # Too late to be useful: skip to the first occurrence from now
+                    self.missed += 1
+                    following = t - (t - now) // DAY * DAY
+                else:
+                    out.append((t, slot, row))
+                    following = t + DAY
+                due[slot] = following
+                heapq.heappush(heap, following * SLOT_SPACE + slot)
+        return out
+
+    def fire(self, now=None):
+        # Deliver everything due by now, batch_size at a time; returns how many fired
+        now = self.clock() if now is None else now
+        start = time.perf_counter()
+        risk = self._risks()
+        fired = 0
+        while True:
+            popped = self._pop_due(now)
+            if not popped:
+                return fired
+            names, clock_times = {}, {}
+            batch = []
+            for t, slot, row in popped:
+                kind, sched = self.kind[slot], self.sched[slot]
+                for value in (t, row):
+                    if value not in names:
+                        names[value] = _format(value)
+                if sched not in clock_times:
+                    clock_times[sched] = _clock_time(sched)
+                batch.append({'user_id': self.users[slot], 'reminder_type': REMINDER_TYPES[kind],
+                              'timestamp': names[row],
+                              'schedule_time': clock_times[sched], 'due': names[t],
+                              'unacknowledged_risk': risk[kind]})
+            # Reminders most likely to be missed go first
+            batch.sort(key=lambda r: -r['unacknowledged_risk'])
+            self.sink.deliver(batch)
+            elapsed = time.perf_counter() - start
+            for t, _, _ in popped:
+                self.skew.add(now - t + elapsed)
+            fired += len(batch)
+            self.fired += len(batch)
+            with self._cond:
+                self._outbox.append((now, batch))
+                self._cond.notify()
+
+    # ---- reminder_sent write-back and resends ----
+    def _write(self, batch):
+        frame = pd.DataFrame({
+            'user_id': [r['user_id'] for r in batch],
+            'timestamp': pd.to_datetime([r['timestamp'] for r in batch]),
+            'reminder_type': [r['reminder_type'] for r in batch],
+            'schedule_time': [r['schedule_time'] for r in batch],
+            'reminder_sent': True,
+            'acknowledged': False,   # kept TRUE for rows already acknowledged (see ingest._update_sql)
+        })
+        with db.cursor() as cur:
+            ingest.load_frame(cur, 'reminders', ingest.to_table_frame('reminders', frame))
+
+    def _resend_due(self, now):
+        due = []
+        while self._follow_ups and self._follow_ups[0][0] <= now:
+            due.append(heapq.heappop(self._follow_ups))
+        if not due:
+            return 0
+        acknowledged = set()
+        if self.store:
+            users = sorted({user_id for _, user_id, _, _, _ in due})
+            times = sorted({datetime.fromisoformat(ts) for _, _, ts, _, _ in due})
+            try:
+                with db.cursor() as cur:
+                    cur.execute(f"SELECT user_id, timestamp FROM daily_reminder "
+                                f"WHERE acknowledged AND user_id IN ({', '.join(['%s'] * len(users))}) "
+                                f"AND timestamp IN ({', '.join(['%s'] * len(times))});", users + times)
+                    acknowledged = {(user_id, ts.strftime(TIMESTAMP_FORMAT)) for user_id, ts in cur.fetchall()}
+            except (db.PoolTimeout,) + db.DB_ERRORS:
+                for follow_up in due:
+                    heapq.heappush(self._follow_ups, follow_up)
+                raise
+        batch = [{'user_id': user_id, 'reminder_type': kind, 'timestamp': ts, 'schedule_time': sched,
+                  'due': _format(check), 'resend': True}
+                 for check, user_id, ts, kind, sched in due if (user_id, ts) not in acknowledged]
+        if batch:
+            self.sink.deliver(batch)
+            self.resent += len(batch)
+        return len(batch)
+
+    def _run_writer(self):
+        while True:
+            with self._cond:
+                if not self._outbox and not self._closed:
+                    self._cond.wait(MAX_SLEEP)
+                items = list(self._outbox)
+                self._outbox.clear()
+                closed = self._closed
+            for fired_at, fired in items:
+                self._unwritten += fired
+                for r in fired:
+                    if r['unacknowledged_risk'] >= self.resend_risk:
+                        heapq.heappush(self._follow_ups, (fired_at + self.resend_after, r['user_id'], r['timestamp'],
+                                                          r['reminder_type'], r['schedule_time']))
+            try:
+                while self.store and self._unwritten:
+                    batch = self._unwritten[:WRITE_BATCH]
+                    self._write(batch)
+                    del self._unwritten[:WRITE_BATCH]
+                    self.written += len(batch)
+                self._resend_due(self.clock())
+            except (db.PoolTimeout,) + db.DB_ERRORS as e:
+                # Tried again on the next round; firing never waits on the database
+                self.write_errors += 1
+                print(f"⚠️ reminder_sent write-back failed: {e}")
+                if closed:
+                    return
+                with self._cond:
+                    self._cond.wait(MAX_SLEEP)
+                continue
+            if closed:
+                return
+
+    # ---- service ----
+    def start(self):
+        with self.lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='reminder-scheduler', daemon=True)
+            self._writer = threading.Thread(target=self._run_writer, name='reminder-writer', daemon=True)
+        self._writer.start()
+        self._thread.start()
+
+    def _run(self):
+        while not self._closed and not self.loaded:
+            try:
+                self.load()
+            except (db.PoolTimeout,) + db.DB_ERRORS as e:
+                print(f"⚠️ reminder schedules not loaded, retrying in {RELOAD_RETRY_SECONDS}s: {e}")
+                self._wake.wait(RELOAD_RETRY_SECONDS)
+        while not self._closed:
+            self.fire()
+            self._wake.clear()
+            next_due = self.next_due()
+            wait = MAX_SLEEP if next_due is None else next_due - self.clock()
+            if wait > 0:
+                self._wake.wait(min(wait, MAX_SLEEP))
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(SHUTDOWN_SECONDS)
+            with self._cond:
+                self._cond.notify()
+            self._writer.join(SHUTDOWN_SECONDS)
+
+    def memory_bytes(self):
+        arrays = sum(a.itemsize * len(a) for a in (self.due, self.since, self.sched, self.kind)) + len(self.pending)
+        entries = sys.getsizeof(self.heap) + 32 * len(self.heap)
+        index = sum(sys.getsizeof(i) for i in self.index) + sys.getsizeof(self.users)
+        return arrays + entries + index
+
+    def stats(self):
+        next_due = self.next_due()
+        with self._cond:
+            outbox = sum(len(batch) for _, batch in self._outbox) + len(self._unwritten)
+        return {
+            'loaded': self.loaded,
+            'load_seconds': round(self.load_seconds, 3),
+            'schedules': len(self.users),
+            'heap_entries': len(self.heap),
+            'next_due': _format(next_due) if next_due is not None else None,
+            'fired': self.fired,
+            'missed': self.missed,
+            'rescheduled': self.rescheduled,
+            'resent': self.resent,
+            'follow_ups_pending': len(self._follow_ups),
+            'written': self.written,
+            'write_backlog': outbox,
+            'write_errors': self.write_errors,
+            'firing_skew': self.skew.summary(),
+            'unacknowledged_risk': dict(zip(REMINDER_TYPES, self.risk)),
+            'memory_bytes': self.memory_bytes(),
+            'sink': type(self.sink).__name__,
+        }
+
+
+# ========================
+# 🔌 SHARED SCHEDULER
+# ========================
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def scheduler():
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ReminderScheduler()
+        return _scheduler
+
+
+def start():
+    # Called once by the serving process; loads the schedules in the background
+    if ENABLED:
+        scheduler().start()
+
+
+def schedule_readings(agent, table_df):
+    # Called by agents/realtime.py once a micro-batch of reminder rows is stored
+    with _scheduler_lock:
+        running = _scheduler is not None and _scheduler.loaded
+    if agent == 'reminders' and running:
+        return _scheduler.schedule(table_df)
+    return 0
+
+
+def stats():
+    with _scheduler_lock:
+        return _scheduler.stats() if _scheduler is not None else {}
+
+
+def close():
+    with _scheduler_lock:
+        if _scheduler is not None:
+            _scheduler.close()
+
+
+atexit.register(close)
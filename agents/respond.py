@@ -0,0 +1,255 @@
+import datetime
+import decimal
+import gzip
+import hashlib
+import json
+import os
+import zlib
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # optional dependency; the stdlib encoder writes the same JSON, slower
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # optional dependency; gzip only
+    zstandard = None
+
+from agents import metrics
+
+# ========================
+# 🚀 RESPONSE LAYER
+# ========================
+# JSON encoding, conditional GET and compression shared by the Flask apps
+# (agents/agents.py, api/combined_api.py) and the async app (agents/asgi.py).
+# - datetime, date and time values are encoded natively as ISO 8601
+#   (2025-01-31T08:00:00, 08:00:00), so records hand over database values as
+#   they come. Keys are sorted and a body ends with a newline, as jsonify did.
+# - ETags are weak (the same data may go out plain, gzip'd or zstd'd) and are
+#   derived from the newest timestamp and data version behind a response
+#   (migration 0008), so routes can answer an unchanged poll with 304 Not
+#   Modified before doing the expensive part.
+# - Bodies of COMPRESS_MIN_BYTES or more are zstd- (when zstandard is
+#   installed) or gzip-compressed for clients that accept it; streamed bodies
+#   are compressed chunk by chunk and stay streamed.
+COMPRESSION = os.environ.get("ELDERLY_CARE_COMPRESSION", "1") not in ('0', 'false', 'no')
+COMPRESS_MIN_BYTES = int(os.environ.get("ELDERLY_CARE_COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.environ.get("ELDERLY_CARE_GZIP_LEVEL", "5"))
+ZSTD_LEVEL = int(os.environ.get("ELDERLY_CARE_ZSTD_LEVEL", "3"))
+# Preference order when a client accepts several
+ENCODINGS = ('zstd', 'gzip') if zstandard is not None else ('gzip',)
+COMPRESSIBLE = ('application/json', 'application/x-ndjson', 'text/')
+
+
+# ========================
+# 🧾 JSON
+# ========================
+def _default(value):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(obj, newline=False):
+        # bytes; newline=True for a whole response body or an NDJSON line
+        return orjson.dumps(obj, default=_default, option=(_OPTIONS | orjson.OPT_APPEND_NEWLINE) if newline else _OPTIONS)
+else:
+    def dumps(obj, newline=False):
+        text = json.dumps(obj, default=_default, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+        return (text + '\n' if newline else text).encode('utf-8')
+
+
+# ========================
+# 🏷️ CONDITIONAL GET
+# ========================
+def etag(*parts):
+    # parts: what the body depends on, e.g. the route, its options and the newest timestamp
+    return 'W/"' + hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=8).hexdigest() + '"'
+
+
+def matches(if_none_match, tag):
+    # Weak comparison, as RFC 9110 asks for If-None-Match
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return tag.removeprefix('W/') in {item.strip().removeprefix('W/') for item in if_none_match.split(',')}
+
+
+# ========================
+# 🗜️ COMPRESSION
+# ========================
+def negotiate(accept_encoding):
+    # The first of ENCODINGS the client accepts; q=0 refuses one, * stands for the rest
+    if not COMPRESSION or not accept_encoding:
+        return None
+    accepted = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.partition(';')
+        q = 1.0
+        params = params.strip().replace(' ', '')
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    for encoding in ENCODINGS:
+        if accepted.get(encoding, accepted.get('*', 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compressible(content_type):
+    return bool(content_type) and content_type.startswith(COMPRESSIBLE)
+
+
+def compress(body, encoding):
+    with metrics.span('compress'):
+        if encoding == 'zstd':
+            return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class StreamCompressor:
+    # One streamed body; every chunk is flushed so clients get rows as they are produced
+    def __init__(self, encoding):
+        if encoding == 'zstd':
+            self._obj = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+            self._mode = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        else:
+            self._obj = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._mode = zlib.Z_SYNC_FLUSH
+
+    def compress(self, chunk):
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        if not chunk:
+            return b''
+        with metrics.span('compress'):
+            return self._obj.compress(chunk) + self._obj.flush(self._mode)
+
+    def finish(self):
+        return self._obj.flush()
+
+
+def compress_chunks(chunks, encoding):
+    stream = StreamCompressor(encoding)
+    for chunk in chunks:
+        out = stream.compress(chunk)
+        if out:
+            yield out
+    yield stream.finish()
+
+
+# ========================
+# 🧪 FLASK HOOKS
+# ========================
+def init_flask(app):
+    # Register after metrics.instrument_flask(app): hooks run last-registered
+    # first, so compression is inside the request's measured time
+    from flask import request
+    from flask.json.provider import DefaultJSONProvider
+
+    class FastJSONProvider(DefaultJSONProvider):
+        def dumps(self, obj, **kwargs):
+            return dumps(obj).decode('utf-8')
+
+        def response(self, *args, **kwargs):
+            obj = self._prepare_response_obj(args, kwargs)
+            with metrics.span('serialize'):
+                body = dumps(obj, newline=True)
+            return self._app.response_class(body, mimetype=self.mimetype)
+
+    app.json = FastJSONProvider(app)
+
+    @app.after_request
+    def _compress(response):
+        if (response.direct_passthrough or not 200 <= response.status_code < 300 or response.status_code == 204
+                or 'Content-Encoding' in response.headers or not compressible(response.mimetype)):
+            return response
+        encoding = negotiate(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+        if response.is_streamed:
+            response.response = compress_chunks(response.response, encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            body = response.get_data()
+            if len(body) < COMPRESS_MIN_BYTES:
+                return response
+            response.set_data(compress(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return response
+
+    return app
+
+
+# ========================
+# ⚡ ASGI MIDDLEWARE
+# ========================
+class ASGICompression:
+    # The same compression for agents/asgi.py. The response start is held
+    # back until the first body message shows whether the body is worth it.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        encoding = negotiate(dict(scope['headers']).get(b'accept-encoding', b'').decode()) \
+            if scope['type'] == 'http' else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        held = None
+        stream = None
+
+        async def send_compressed(message):
+            nonlocal held, stream
+            if message['type'] == 'http.response.start':
+                held = message          # sent along with the first body message
+                return
+            if message['type'] != 'http.response.body':
+                await send(message)
+                return
+            body, more = message.get('body', b''), message.get('more_body', False)
+            if held is None:
+                # The rest of a streamed body
+                if stream is not None:
+                    body = stream.compress(body) + (b'' if more else stream.finish())
+                    message = {'type': 'http.response.body', 'body': body, 'more_body': more}
+                await send(message)
+                return
+            start, held = held, None
+            headers = dict(start.get('headers', []))
+            if (not 200 <= start['status'] < 300 or start['status'] == 204 or b'content-encoding' in headers
+                    or not compressible(headers.get(b'content-type', b'').decode())
+                    or (not more and len(body) < COMPRESS_MIN_BYTES)):
+                await send(start)
+                await send(message)
+                return
+            if more:
+                stream = StreamCompressor(encoding)
+                body = stream.compress(body)
+            else:
+                body = compress(body, encoding)
+            headers = [(name, value) for name, value in start.get('headers', []) if name != b'content-length']
+            headers += [(b'content-encoding', encoding.encode()), (b'vary', b'Accept-Encoding')]
+            if not more:
+                headers.append((b'content-length', str(len(body)).encode()))
+            await send(dict(start, headers=headers))
+            await send({'type': 'http.response.body', 'body': body, 'more_body': more})
+
+        await self.app(scope, receive, send_compressed)
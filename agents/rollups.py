@@ -0,0 +1,199 @@
+"""Hourly and daily rollups of the reading tables, for the history API.
+
+Run from the project root:
+    python -m agents.rollups check      # exit 1 if a rollup differs from the raw readings
+    python -m agents.rollups rebuild    # recompute every rollup from the raw readings
+
+migrations/0004 creates the tables and 0005 backfills them. After that,
+agents/ingest.py refreshes the buckets each load touches (bulk loads and
+real-time micro-batches alike), so the rollups stay current without a
+periodic job.
+"""
+import argparse
+import sys
+from datetime import timedelta
+
+import pandas as pd
+
+from agents import db, fleet, partitions
+
+# ========================
+# 📈 ROLLUP DEFINITIONS
+# ========================
+ROLLUP_TABLES = {
+    'health': 'health_rollup',
+    'safety': 'safety_rollup',
+    'reminders': 'reminder_rollup',
+}
+# Numeric columns kept as count / sum / min / max per bucket (mean = sum / count)
+METRICS = {
+    'health': ['heart_rate', 'bp_systolic', 'bp_diastolic', 'glucose_level', 'spo2'],
+    'safety': ['post_fall_inactivity_duration'],
+    'reminders': [],
+}
+# Boolean columns counted per bucket: series name -> column
+COUNTS = {
+    'health': {'alerts': 'alert_triggered', 'abnormal': 'abnormal'},
+    'safety': {'falls': 'fall_detected', 'alerts': 'alert_triggered', 'unsafe': 'unsafe',
+               'emergency_calls': 'emergency_call'},
+    'reminders': {'sent': 'reminder_sent', 'acknowledged': 'acknowledged'},
+}
+ROLLUP_SIZES = ('1h', '1d')
+BUCKETS = {'1m': timedelta(minutes=1), '1h': timedelta(hours=1), '1d': timedelta(days=1)}
+BUCKET_SQL = {
+    'postgres': {
+        '1m': "date_trunc('minute', timestamp)",
+        '1h': "date_trunc('hour', timestamp)",
+        '1d': "date_trunc('day', timestamp)",
+    },
+    'sqlite': {
+        '1m': "strftime('%Y-%m-%d %H:%M:00', timestamp)",
+        '1h': "strftime('%Y-%m-%d %H:00:00', timestamp)",
+        '1d': "strftime('%Y-%m-%d 00:00:00', timestamp)",
+    },
+}
+# Users per refresh statement (keeps well under SQLite's bound-parameter limit)
+REFRESH_CHUNK = 500
+
+
+def value_columns(agent):
+    # Rollup columns after (user_id, bucket_size, bucket_start), in aggregate_sql order
+    columns = ['readings']
+    for metric in METRICS[agent]:
+        columns += [f'{metric}_n', f'{metric}_sum', f'{metric}_min', f'{metric}_max']
+    return columns + list(COUNTS[agent])
+
+
+def aggregate_sql(agent):
+    aggregates = ['COUNT(*)']
+    for metric in METRICS[agent]:
+        aggregates += [f'COUNT({metric})', f'SUM({metric})', f'MIN({metric})', f'MAX({metric})']
+    aggregates += [f'SUM(CASE WHEN {column} THEN 1 ELSE 0 END)' for column in COUNTS[agent].values()]
+    return ', '.join(aggregates)
+
+
+def bucket_sql(size):
+    return BUCKET_SQL[db.backend()][size]
+
+
+def raw_buckets_query(agent, size, where):
+    # Same columns as a rollup row, computed from the raw table
+    bucket = bucket_sql(size)
+    return f"""
+        SELECT user_id, '{size}', {bucket}, {aggregate_sql(agent)}
+        FROM {fleet.TABLES[agent]}
+        WHERE {where}
+        GROUP BY user_id, {bucket}
+    """
+
+
+def refresh_sql(agent, size, where):
+    columns = value_columns(agent)
+    updates = ', '.join(f"{col} = EXCLUDED.{col}" for col in columns)
+    return (f"INSERT INTO {ROLLUP_TABLES[agent]} (user_id, bucket_size, bucket_start, {', '.join(columns)}) "
+            f"{raw_buckets_query(agent, size, where)} "
+            f"ON CONFLICT (user_id, bucket_size, bucket_start) DO UPDATE SET {updates};")
+
+
+# ========================
+# 🔄 INCREMENTAL REFRESH
+# ========================
+def refresh(cur, agent, table_df):
+    # Recompute the buckets the loaded rows fall in: each (user, day) in the
+    # batch is re-aggregated whole, which covers both sizes and is idempotent,
+    # so upserts that replace a reading never double count. Days a user has
+    # no rows in this batch are left alone.
+    if table_df.empty:
+        return 0
+    touched = pd.DataFrame({'user_id': table_df['user_id'].to_numpy(),
+                            'day': pd.to_datetime(table_df['timestamp']).dt.floor('D').to_numpy()})
+    touched = touched.drop_duplicates()
+    # Days in archived months keep the rollups they were archived with: their
+    # raw readings are no longer in the table to re-aggregate
+    boundary = partitions.archive_end(agent)
+    if boundary is not None:
+        touched = touched[touched['day'] >= pd.Timestamp(boundary)]
+    for day, users in touched.groupby('day')['user_id']:
+        start = day.to_pydatetime()
+        end = (day + pd.Timedelta(days=1)).to_pydatetime()
+        user_ids = users.tolist()
+        for i in range(0, len(user_ids), REFRESH_CHUNK):
+            chunk = user_ids[i:i + REFRESH_CHUNK]
+            where = f"user_id IN ({', '.join(['%s'] * len(chunk))}) AND timestamp >= %s AND timestamp < %s"
+            for size in ROLLUP_SIZES:
+                cur.execute(refresh_sql(agent, size, where), tuple(chunk) + (start, end))
+    return len(touched)
+
+
+def _hot_range(agent):
+    # (raw filter, rollup filter, params): the buckets whose readings are still in
+    # the table. Archived months (agents/partitions.py) are left as they are.
+    boundary = partitions.archive_end(agent)
+    if boundary is None:
+        # (WHERE TRUE keeps SQLite from reading ON CONFLICT as a join constraint)
+        return "TRUE", "TRUE", ()
+    return "timestamp >= %s", "bucket_start >= %s", (boundary,)
+
+
+def rebuild(cur, agent):
+    raw, kept, params = _hot_range(agent)
+    cur.execute(f"DELETE FROM {ROLLUP_TABLES[agent]} WHERE {kept};", params)
+    for size in ROLLUP_SIZES:
+        cur.execute(refresh_sql(agent, size, raw), params)
+
+
+# ========================
+# ✅ ROLLUP CHECK
+# ========================
+def _sorted_rows(rows):
+    return sorted((tuple(str(v) if i == 2 else v for i, v in enumerate(row)) for row in rows),
+                  key=lambda row: row[:3])
+
+
+def check(cur, agent):
+    # Rollup rows that differ from a fresh aggregate of the raw table
+    columns = ['user_id', 'bucket_size', 'bucket_start'] + value_columns(agent)
+    raw, kept, params = _hot_range(agent)
+    mismatches = 0
+    for size in ROLLUP_SIZES:
+        cur.execute(raw_buckets_query(agent, size, raw) + ";", params)
+        expected = _sorted_rows(cur.fetchall())
+        cur.execute(f"SELECT {', '.join(columns)} FROM {ROLLUP_TABLES[agent]} "
+                    f"WHERE bucket_size = %s AND {kept};", (size,) + params)
+        stored = _sorted_rows(cur.fetchall())
+        if len(expected) != len(stored):
+            mismatches += abs(len(expected) - len(stored))
+        for want, got in zip(expected, stored):
+            if want[:3] != got[:3] or any(
+                    (w is None) != (g is None) or (w is not None and abs(float(w) - float(g)) > 1e-6)
+                    for w, g in zip(want[3:], got[3:])):
+                mismatches += 1
+    return mismatches
+
+
+def main(argv=None):
+    from agents import migrate
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['check', 'rebuild'])
+    parser.add_argument('--tables', default=','.join(ROLLUP_TABLES))
+    args = parser.parse_args(argv)
+
+    migrate.upgrade()
+    failed = False
+    for agent in args.tables.split(','):
+        with db.cursor() as cur:
+            if args.command == 'rebuild':
+                rebuild(cur, agent)
+                cur.execute(f"SELECT COUNT(*) FROM {ROLLUP_TABLES[agent]};")
+                print(f"✅ {agent}: {cur.fetchone()[0]} rollup rows")
+            else:
+                mismatches = check(cur, agent)
+                failed |= mismatches > 0
+                print(f"{'✅' if not mismatches else '❌'} {agent}: {mismatches} rollup rows differ from the raw readings")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from agents import metrics
+from agents.features import features_from_db, record_features
+from agents.registry import registry
+
+# ========================
+# 🧮 BATCH SCORING
+# ========================
+# Largest batch a single request may score; bigger payloads get a 413
+MAX_BATCH_SIZE = int(os.environ.get("ELDERLY_CARE_MAX_BATCH", "1000"))
+
+
+class BatchError(ValueError):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def batch_frame(payload, max_size=MAX_BATCH_SIZE):
+    """Validate a batch payload in one pass and return it as a DataFrame.
+
+    Accepts a list of records, {"records": [...]}, or a columnar payload
+    {"columns": {"heart_rate": [...], ...}} (a bare dict of lists also works).
+    """
+    if isinstance(payload, dict) and 'records' in payload:
+        payload = payload['records']
+    elif isinstance(payload, dict):
+        payload = payload.get('columns', payload)
+
+    if isinstance(payload, list):
+        size = len(payload)
+        if size > max_size:
+            raise BatchError(f"batch of {size} exceeds the limit of {max_size}", 413)
+        if not all(isinstance(rec, dict) for rec in payload):
+            raise BatchError("every record must be a JSON object")
+        df = pd.DataFrame.from_records(payload)
+    elif isinstance(payload, dict) and payload:
+        if not all(isinstance(col, list) for col in payload.values()):
+            raise BatchError("columnar payload must map each column to a list")
+        lengths = {len(col) for col in payload.values()}
+        if len(lengths) != 1:
+            raise BatchError("columns must all have the same length")
+        size = lengths.pop()
+        if size > max_size:
+            raise BatchError(f"batch of {size} exceeds the limit of {max_size}", 413)
+        df = pd.DataFrame(payload)
+    else:
+        raise BatchError("expected a list of records or a columnar object")
+
+    if df.empty:
+        raise BatchError("batch is empty")
+    return df
+
+
+def model_inputs(model, df):
+    # Select and order the columns the model was fitted on; user_id is a key, not a feature
+    names = getattr(model, 'feature_names_in_', None)
+    if names is None:
+        features = df.drop(columns=['user_id'], errors='ignore')
+        expected = getattr(model, 'n_features_in_', features.shape[1])
+        if features.shape[1] != expected:
+            raise BatchError(f"expected {expected} feature columns, got {features.shape[1]}")
+        # Fitted on a bare array, so hand it one (avoids sklearn's feature-name warning)
+        return features.to_numpy()
+    missing = [name for name in names if name not in df.columns]
+    if missing:
+        raise BatchError(f"missing feature columns: {', '.join(missing)}")
+    features = df[list(names)]
+    if features.isnull().values.any():
+        raise BatchError("feature values must not be null")
+    return features
+
+
+def score_frame(model, features):
+    # One vectorized predict_proba for the whole batch
+    try:
+        with metrics.span('inference'):
+            proba = model.predict_proba(features)
+    except (TypeError, ValueError) as e:
+        raise BatchError(f"could not score batch: {e}")
+    classes = model.classes_
+    predictions = classes[np.argmax(proba, axis=1)]
+    positive = list(classes).index(1) if 1 in classes else proba.shape[1] - 1
+    return predictions, proba[:, positive]
+
+
+def user_keys(df):
+    if 'user_id' in df.columns:
+        return df['user_id'].tolist()
+    return list(range(len(df)))
+
+
+# ========================
+# ⚡ SINGLE-RECORD SCORING
+# ========================
+# One dict answered from the prediction table (agents/lookup.py) when its
+# inputs are in the enumerated domain, else scored by the compiled model
+# (agents/compiled.py) in microseconds; anything the fast path cannot read
+# goes through pandas + sklearn as before. Either way the call is one
+# inference span.
+def predict_record(agent, record):
+    with metrics.span('inference'):
+        return _predict_record(agent, record)
+
+
+def predict_reading(agent, reading):
+    with metrics.span('inference'):
+        return _predict_reading(agent, reading)
+
+
+def _predict_record(agent, record):
+    # record carries the model's feature columns by name
+    table = registry.table(agent)
+    if table is not None and isinstance(record, dict):
+        label = table.predict(record)
+        if label is not None:
+            return int(label)
+    compiled = registry.compiled(agent)
+    if compiled is not None and isinstance(record, dict):
+        try:
+            return int(compiled.predict_one(record))
+        except (KeyError, TypeError, ValueError):
+            pass
+    model = registry.get(agent)
+    return int(model.predict(model_inputs(model, pd.DataFrame([record])))[0])
+
+
+def _predict_reading(agent, reading):
+    # reading is a stored row (table or cleaned_data column names)
+    compiled = registry.compiled(agent)
+    if compiled is not None:
+        try:
+            record = record_features(agent, reading)
+        except (KeyError, TypeError, ValueError):
+            record = None
+        if record is not None:
+            table = registry.table(agent)
+            label = table.predict(record) if table is not None else None
+            if label is not None:
+                return int(label)
+            try:
+                return int(compiled.predict_one(record))
+            except (KeyError, TypeError, ValueError):
+                pass
+    model = registry.get(agent)
+    return int(model.predict(model_inputs(model, features_from_db(agent, pd.DataFrame([reading]))))[0])
@@ -0,0 +1,35 @@
+"""Production launcher for the async agent API (agents/asgi.py).
+
+Run from the project root:
+    python -m agents.serve                      # one worker per CPU on :5001
+    python -m agents.serve --workers 4 --port 8000
+    ELDERLY_CARE_WORKERS=8 python -m agents.serve
+
+Each worker is a separate process with its own event loop, asyncpg pool
+(ELDERLY_CARE_POOL_MIN/_MAX connections) and inference threads, so size the
+Postgres max_connections for workers * ELDERLY_CARE_POOL_MAX.
+"""
+import argparse
+import os
+
+import uvicorn
+
+WORKERS = int(os.environ.get("ELDERLY_CARE_WORKERS", str(os.cpu_count() or 1)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    parser.add_argument('--backlog', type=int, default=2048, help="pending TCP connections to queue")
+    parser.add_argument('--log-level', default='warning')
+    args = parser.parse_args(argv)
+
+    print(f"✅ API running on: http://{args.host}:{args.port} ({args.workers} worker(s))")
+    uvicorn.run('agents.asgi:app', host=args.host, port=args.port, workers=args.workers,
+                backlog=args.backlog, log_level=args.log_level, access_log=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+"""Columnar copy of cleaned_data: typed, compressed Parquet partitioned by month.
+
+agents/ingest.py writes it next to the cleaned CSVs whenever pyarrow is
+installed (pip install pyarrow):
+    cleaned_data/parquet/<agent>/month=2025-01/part-0.parquet
+
+Read it back with column projection and user / time-range pushdown; files
+are memory-mapped, and only the months, row groups and columns a query
+needs are decoded:
+    from agents import store
+    df = store.load('health', columns=['user_id', 'timestamp', 'heart_rate'],
+                    user_ids=['D1000'], start='2025-01-01', end='2025-02-01')
+
+Run from the project root:
+    python -m agents.store              # rewrite the store from cleaned_data/*.csv
+    python -m agents.store --check      # exit 1 if the store and the CSVs disagree
+"""
+import argparse
+import os
+import shutil
+import sys
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency; the CSVs stay the source of truth
+    pa = None
+
+from agents import ingest
+
+# ========================
+# 🗂️ LAYOUT
+# ========================
+PARQUET_DIR = os.path.join(ingest.CLEANED_DIR, 'parquet')
+COMPRESSION = os.environ.get("ELDERLY_CARE_PARQUET_COMPRESSION", "zstd")
+ROW_GROUP_ROWS = 64 * 1024
+
+# cleaned_data columns and their stored types. 'category' is dictionary
+# encoded (user ids and the few distinct labels), flags are int8 0/1 as in
+# the CSVs, and timestamps keep millisecond precision.
+COLUMNS = {
+    'health': {
+        'user_id': 'category', 'timestamp': 'timestamp', 'heart_rate': 'int16', 'hr_alert': 'int8',
+        'bp_alert': 'int8', 'glucose_level': 'int16', 'glucose_alert': 'int8', 'spo2': 'int16',
+        'spo2_alert': 'int8', 'alert_triggered': 'int8', 'caregiver_notified': 'int8',
+        'systolic_bp': 'double', 'diastolic_bp': 'double',
+    },
+    'safety': {
+        'user_id': 'category', 'timestamp': 'timestamp', 'movement_activity': 'category',
+        'fall_detected': 'int8', 'impact_force_level': 'category', 'post_fall_inactivity_duration': 'int32',
+        'location': 'category', 'alert_triggered': 'int8', 'caregiver_notified': 'int8',
+    },
+    'reminders': {
+        'user_id': 'category', 'timestamp': 'timestamp', 'reminder_type': 'category',
+        'schedule_time': 'category', 'reminder_sent': 'int8', 'acknowledged': 'int8',
+    },
+}
+
+
+def available():
+    return pa is not None
+
+
+def _arrow_type(name):
+    if name == 'category':
+        return pa.dictionary(pa.int32(), pa.string())
+    if name == 'timestamp':
+        return pa.timestamp('ms')
+    return pa.type_for_alias(name)
+
+
+def schema(agent):
+    return pa.schema([(column, _arrow_type(kind)) for column, kind in COLUMNS[agent].items()])
+
+
+# ========================
+# ✍️ WRITING
+# ========================
+class MonthlyWriter:
+    # Streams cleaned chunks into one unsorted spill file per month as they
+    # arrive, so memory holds a chunk rather than the whole table. close()
+    # then sorts one month at a time by (user_id, timestamp), so row-group
+    # statistics can skip other residents, and writes it to a staging
+    # directory that replaces the old store.
+    def __init__(self, agent, root=PARQUET_DIR):
+        self.agent = agent
+        self.schema = schema(agent)
+        self.target = os.path.join(root, agent)
+        self.spill_dir = self.target + '.spill'
+        self.writers = {}
+        self.rows = 0
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    def _spill_path(self, month):
+        return os.path.join(self.spill_dir, f'{month}.parquet')
+
+    def add(self, cleaned):
+        cleaned = cleaned.dropna(subset=['timestamp'])
+        table = pa.Table.from_pandas(cleaned[self.schema.names], schema=self.schema, preserve_index=False)
+        months = cleaned['timestamp'].dt.strftime('%Y-%m').to_numpy()
+        for month in pd.unique(months):
+            if month not in self.writers:
+                os.makedirs(self.spill_dir, exist_ok=True)
+                # Read back once at close(); not worth compressing
+                self.writers[month] = pq.ParquetWriter(self._spill_path(month), self.schema, compression='none')
+            self.writers[month].write_table(table.filter(pa.array(months == month)))
+        self.rows += len(cleaned)
+
+    def close(self):
+        staging = self.target + '.tmp'
+        shutil.rmtree(staging, ignore_errors=True)
+        for month, writer in sorted(self.writers.items()):
+            writer.close()
+            table = pq.read_table(self._spill_path(month), schema=self.schema).replace_schema_metadata(None)
+            # Arrow can't sort dictionary columns directly; sort on their values
+            keys = pa.table({'user_id': table['user_id'].cast(pa.string()), 'timestamp': table['timestamp']})
+            table = table.take(pc.sort_indices(keys, [('user_id', 'ascending'), ('timestamp', 'ascending')]))
+            os.makedirs(os.path.join(staging, f'month={month}'))
+            pq.write_table(table, os.path.join(staging, f'month={month}', 'part-0.parquet'),
+                           compression=COMPRESSION, row_group_size=ROW_GROUP_ROWS)
+            os.remove(self._spill_path(month))
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
+        shutil.rmtree(self.target, ignore_errors=True)
+        if self.writers:
+            os.replace(staging, self.target)
+        self.writers = {}
+        return self.rows
+
+
+# ========================
+# 📖 READING
+# ========================
+def dataset(agent, root=PARQUET_DIR):
+    path = os.path.join(root, agent)
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"No Parquet store for {agent} at {path}; run python -m agents.store")
+    partitioning = ds.partitioning(pa.schema([('month', pa.string())]), flavor='hive')
+    return ds.dataset(path, format='parquet', partitioning=partitioning,
+                      filesystem=pafs.LocalFileSystem(use_mmap=True))
+
+
+def pushdown(user_ids=None, start=None, end=None):
+    # Filter expression; the month bounds let whole partitions be skipped
+    conditions = []
+    if user_ids is not None:
+        conditions.append(ds.field('user_id').isin(list(user_ids)))
+    if start is not None:
+        start = pd.Timestamp(start)
+        conditions += [ds.field('month') >= start.strftime('%Y-%m'),
+                       ds.field('timestamp') >= pa.scalar(start, type=pa.timestamp('ms'))]
+    if end is not None:
+        end = pd.Timestamp(end)
+        conditions += [ds.field('month') <= end.strftime('%Y-%m'),
+                       ds.field('timestamp') < pa.scalar(end, type=pa.timestamp('ms'))]
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def read_table(agent, columns=None, user_ids=None, start=None, end=None, root=PARQUET_DIR):
+    return dataset(agent, root).to_table(columns=columns or list(COLUMNS[agent]),
+                                         filter=pushdown(user_ids, start, end))
+
+
+def load(agent, columns=None, user_ids=None, start=None, end=None, categorical=True, root=PARQUET_DIR):
+    # Rows come back sorted by month, user_id, timestamp. With categorical=False
+    # labels are plain strings, as pd.read_csv returns them.
+    table = read_table(agent, columns, user_ids, start, end, root)
+    if not categorical:
+        table = table.cast(pa.schema([
+            pa.field(field.name, field.type.value_type if pa.types.is_dictionary(field.type) else field.type)
+            for field in table.schema]))
+    return table.to_pandas(coerce_temporal_nanoseconds=True)
+
+
+def read_cleaned(agent, columns=None, user_ids=None, start=None, end=None,
+                 root=PARQUET_DIR, cleaned_dir=ingest.CLEANED_DIR):
+    # The Parquet store when it exists, else the same projection and filters over the CSV
+    if available() and os.path.isdir(os.path.join(root, agent)):
+        return load(agent, columns, user_ids, start, end, categorical=False, root=root)
+    usecols = None if columns is None else list(dict.fromkeys(
+        list(columns) + (['user_id'] if user_ids is not None else []) + (['timestamp'] if start or end else [])))
+    df = pd.read_csv(os.path.join(cleaned_dir, ingest.SOURCES[agent]['cleaned']), usecols=usecols,
+                     parse_dates=['timestamp'] if usecols is None or 'timestamp' in usecols else False)
+    if user_ids is not None:
+        df = df[df['user_id'].isin(list(user_ids))]
+    if start is not None:
+        df = df[df['timestamp'] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df['timestamp'] < pd.Timestamp(end)]
+    return df[list(columns)].reset_index(drop=True) if columns is not None else df.reset_index(drop=True)
+
+
+# ========================
+# 🔁 REBUILD / CHECK
+# ========================
+def write_from_csv(agent, cleaned_dir=ingest.CLEANED_DIR, root=PARQUET_DIR, chunksize=ingest.CHUNK_SIZE):
+    writer = MonthlyWriter(agent, root)
+    path = os.path.join(cleaned_dir, ingest.SOURCES[agent]['cleaned'])
+    for chunk in pd.read_csv(path, chunksize=chunksize, parse_dates=['timestamp']):
+        writer.add(chunk)
+    return writer.close()
+
+
+def check(agent, cleaned_dir=ingest.CLEANED_DIR, root=PARQUET_DIR):
+    # Rows that differ between the store and the CSV, compared in the store's sort order
+    keys = ['user_id', 'timestamp']
+    stored = load(agent, categorical=False, root=root)
+    csv = pd.read_csv(os.path.join(cleaned_dir, ingest.SOURCES[agent]['cleaned']), parse_dates=['timestamp'])
+    csv = csv.dropna(subset=['timestamp']).sort_values(keys, kind='stable').reset_index(drop=True)
+    stored = stored.sort_values(keys, kind='stable').reset_index(drop=True)
+    if len(stored) != len(csv):
+        return abs(len(stored) - len(csv))
+    differs = pd.Series(False, index=csv.index)
+    for column in COLUMNS[agent]:
+        a, b = stored[column], csv[column]
+        if pd.api.types.is_numeric_dtype(b):
+            differs |= ~((a.astype(float) == b.astype(float)) | (a.isna() & b.isna()))
+        else:
+            differs |= ~((a.astype(object) == b.astype(object)) | (a.isna() & b.isna()))
+    return int(differs.sum())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tables', default=','.join(ingest.SOURCES))
+    parser.add_argument('--cleaned-dir', default=ingest.CLEANED_DIR)
+    parser.add_argument('--root', default=PARQUET_DIR)
+    parser.add_argument('--check', action='store_true', help="compare the store with the CSVs instead of rewriting it")
+    args = parser.parse_args(argv)
+
+    if not available():
+        sys.exit("❌ pyarrow is not installed (pip install pyarrow)")
+    failed = False
+    for agent in args.tables.split(','):
+        if args.check:
+            mismatches = check(agent, args.cleaned_dir, args.root)
+            failed |= mismatches > 0
+            print(f"{'✅' if not mismatches else '❌'} {agent}: {mismatches} rows differ from the CSV")
+        else:
+            rows = write_from_csv(agent, args.cleaned_dir, args.root)
+            print(f"✅ {agent}: {rows} rows -> {os.path.join(args.root, agent)}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+from agents import cache, db, fleet, respond, scoring
+from agents.features import SOURCE_COLUMNS
+from agents.records import RECORDS
+from agents.registry import registry
+
+# ========================
+# 👤 USER SUMMARY
+# ========================
+# Latest health, safety and reminder rows for one or more users (plus the
+# model predictions, if asked) in a single database round trip. Each table
+# is LEFT JOINed onto the requested ids through a newest-row lookup on the
+# (user_id, timestamp DESC) index, so only one row per user and table is read
+# and users with no rows in a table still come back, with None for that part.
+
+# Columns the /<agent>/user/<id> responses are built from, in SELECT * order
+# so agents/records.py reads them positionally
+DISPLAY_COLUMNS = {
+    'health': ['user_id', 'timestamp', 'heart_rate', 'temperature', 'bp_systolic', 'bp_diastolic', 'abnormal'],
+    'safety': ['user_id', 'timestamp', 'event_type', 'location', 'emergency_call', 'unsafe'],
+    'reminders': ['user_id', 'timestamp', 'reminder_type', 'schedule_time', 'reminder_sent', 'acknowledged'],
+}
+# Same keys as the single-agent user endpoints
+SUMMARY_KEYS = {
+    'health': 'health_monitoring',
+    'safety': 'safety_monitoring',
+    'reminders': 'daily_reminders',
+}
+
+
+def _parts(predict):
+    # (agent, CTE alias, columns, extra filter); a separate part is only needed when
+    # the prediction reads a different row than the one displayed (sent reminders)
+    parts = []
+    for agent, columns in DISPLAY_COLUMNS.items():
+        if predict and agent not in fleet.LATEST_FILTERS:
+            columns = columns + [col for col in SOURCE_COLUMNS[agent] if col not in columns]
+        parts.append((agent, agent[0], columns, None))
+    if predict:
+        for agent, condition in fleet.LATEST_FILTERS.items():
+            parts.append((agent, agent[0] + 'p', ['user_id'] + SOURCE_COLUMNS[agent], condition))
+    return parts
+
+
+def _latest_join(agent, alias, columns, extra):
+    table = fleet.TABLES[agent]
+    where = "user_id = ids.user_id" + (f" AND {extra}" if extra else "")
+    if db.backend() == 'sqlite':
+        # No LATERAL: a correlated MAX(timestamp) picks the row, (user_id, timestamp) is unique
+        return (f"LEFT JOIN {table} {alias} ON {alias}.user_id = ids.user_id AND {alias}.timestamp = "
+                f"(SELECT MAX(timestamp) FROM {table} WHERE {where})")
+    return f"""LEFT JOIN LATERAL (
+            SELECT {', '.join(columns)}
+            FROM {table}
+            WHERE {where}
+            ORDER BY timestamp DESC LIMIT 1
+        ) {alias} ON TRUE"""
+
+
+def summary_query(count, predict=False):
+    ids = ', '.join(['(%s)'] * count)
+    select, joins = [], []
+    for agent, alias, columns, extra in _parts(predict):
+        select += [f'{alias}.{col}' for col in columns]
+        joins.append(_latest_join(agent, alias, columns, extra))
+    return f"""
+        WITH ids(user_id) AS (VALUES {ids})
+        SELECT ids.user_id, {', '.join(select)}
+        FROM ids
+        {' '.join(joins)};
+    """
+
+
+def build_summaries(user_ids, rows, predict=False):
+    # Rows from summary_query -> {user_id: summary}; row parts are split by column counts
+    parts = _parts(predict)
+    summaries = {}
+    for row in rows:
+        row = tuple(row)
+        user_id, offset = row[0], 1
+        summary = {'user_id': user_id}
+        readings = {}
+        for agent, alias, columns, extra in parts:
+            values = row[offset:offset + len(columns)]
+            offset += len(columns)
+            found = values[0] is not None
+            if extra is None:
+                summary[SUMMARY_KEYS[agent]] = RECORDS[agent](values) if found else None
+                if found:
+                    # Same row the /<agent>/user/<id> route would have cached
+                    cache.latest.put(agent, user_id, summary[SUMMARY_KEYS[agent]])
+            if predict and (extra is not None or agent not in fleet.LATEST_FILTERS):
+                readings[agent] = dict(zip(columns, values)) if found else None
+        if predict:
+            summary['predictions'] = {
+                fleet.PREDICTION_LABELS[agent]: (scoring.predict_reading(agent, reading) if reading else None)
+                for agent, reading in readings.items()
+            }
+        summaries[user_id] = summary
+    return [summaries[user_id] for user_id in user_ids if user_id in summaries]
+
+
+def wants_predictions(options):
+    return str(options.get('predict', '')).lower() in ('1', 'true', 'yes')
+
+
+def unique_ids(user_ids):
+    if not isinstance(user_ids, list) or not user_ids:
+        raise scoring.BatchError("user_ids must be a non-empty list")
+    if len(user_ids) > scoring.MAX_BATCH_SIZE:
+        raise scoring.BatchError(f"batch of {len(user_ids)} exceeds the limit of {scoring.MAX_BATCH_SIZE}", 413)
+    return list(dict.fromkeys(str(user_id) for user_id in user_ids))
+
+
+def fetch_summaries(user_ids, predict=False):
+    with db.cursor() as cur:
+        cur.execute(summary_query(len(user_ids), predict), tuple(user_ids))
+        rows = cur.fetchall()
+    return build_summaries(user_ids, rows, predict)
+
+
+# The newest timestamp per table for one user and their data_version (bumped
+# by every write, migration 0008): four index lookups, so an unchanged poll is
+# answered before the summary query runs
+NEWEST_QUERY = "SELECT " + ', '.join(
+    [f"(SELECT MAX(timestamp) FROM {fleet.TABLES[agent]} WHERE user_id = %s)" for agent in DISPLAY_COLUMNS]
+    + ["(SELECT data_version FROM users WHERE user_id = %s)"]) + ";"
+
+
+def newest_params(user_id):
+    return (user_id,) * (len(DISPLAY_COLUMNS) + 1)
+
+
+def has_data(newest):
+    return any(ts is not None for ts in newest[:len(DISPLAY_COLUMNS)])
+
+
+def fetch_newest(user_id):
+    with db.cursor() as cur:
+        cur.execute(NEWEST_QUERY, newest_params(user_id))
+        return tuple(cur.fetchone())
+
+
+def model_versions():
+    # Loads any model not yet served: before its first load version() is None,
+    # and a tag built from None would never match the ones that follow
+    for agent in DISPLAY_COLUMNS:
+        registry.get(agent)
+    return tuple(registry.version(agent) for agent in DISPLAY_COLUMNS)
+
+
+def summary_etag(user_id, newest, predict=False):
+    # Predictions also change with the models being served
+    models = model_versions() if predict else None
+    return respond.etag('summary', user_id, newest, models)
+
+
+def is_empty(summary):
+    return all(summary[key] is None for key in SUMMARY_KEYS.values())
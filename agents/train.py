@@ -0,0 +1,372 @@
+"""Training pipeline for the three agent models (replaces the notebook runs).
+
+Run from the project root:
+    python -m agents.train                               # all three models, full search
+    python -m agents.train --tables health --promote     # and make it the served model
+    python -m agents.train --incremental --source db     # update on rows ingested since the last run
+
+Each model trains in its own process. Inside it, a grid search over
+logistic regression and log-loss SGD pipelines runs stratified k-fold
+cross-validation on the remaining cores. The best candidate is scored on
+the notebooks' 80/20 hold-out split (random_state=42) and written as a
+versioned artifact with a JSON manifest:
+    models/versions/<agent>/<model>-<UTC time>-<sha>.pkl / .json
+A run report with per-stage wall-clock times goes to models/versions/.
+--promote copies the artifacts over models/*.pkl, where the registry picks
+them up (hot reload, or the next start).
+
+Feature matrices are cached in ELDERLY_CARE_TRAIN_CACHE (default
+.cache/train). The cache key covers the data and agents/features.py, so
+any change to either rebuilds the matrices.
+
+--incremental loads each agent's newest version and trains only on rows
+newer than its watermark. SGD models are updated in place with
+partial_fit on those rows, keeping their scaler as fitted. A logistic
+regression has no partial_fit, so it is refit on all rows, starting from
+its previous coefficients. The same refit replaces a partial_fit that
+scores a lower F1 on the new rows than the previous version did.
+"""
+import argparse
+import copy
+import hashlib
+import json
+import os
+import platform
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from agents import features
+from agents.compiled import PIPELINE_TARGETS
+from agents.registry import MODEL_DIR, MODEL_FILES
+
+# ========================
+# ⚙️ SETTINGS
+# ========================
+VERSIONS_DIR = os.path.join(MODEL_DIR, 'versions')
+CACHE_DIR = os.environ.get("ELDERLY_CARE_TRAIN_CACHE", os.path.join('.cache', 'train'))
+RANDOM_STATE = 42
+TEST_SIZE = 0.2
+CV_FOLDS = 5
+SCORING = 'roc_auc'
+# Database columns each model trains on (keys, features and target)
+DB_COLUMNS = {agent: ['user_id', 'timestamp'] + [c for c in features.SOURCE_COLUMNS[agent] if c != 'timestamp'] + [target]
+              for agent, target in PIPELINE_TARGETS.items()}
+TABLES = {'health': 'health_monitoring', 'safety': 'safety_monitoring', 'reminders': 'daily_reminder'}
+
+
+def search_space():
+    from sklearn.linear_model import LogisticRegression, SGDClassifier
+
+    # Estimators the grid chooses between; every one compiles (agents/compiled.py)
+    return [
+        {'clf': [LogisticRegression(max_iter=1000)],
+         'clf__C': [0.01, 0.1, 1.0, 10.0], 'clf__class_weight': [None, 'balanced']},
+        {'clf': [SGDClassifier(loss='log_loss', random_state=RANDOM_STATE)],
+         'clf__alpha': [1e-5, 1e-4, 1e-3], 'clf__class_weight': [None, 'balanced']},
+    ]
+
+
+@contextmanager
+def stage(timings, name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = round(time.perf_counter() - start, 3)
+
+
+# ========================
+# 📥 TRAINING DATA
+# ========================
+def _file_fingerprint(paths):
+    parts = []
+    for path in paths:
+        files = [os.path.join(root, name) for root, _, names in os.walk(path) for name in names] \
+            if os.path.isdir(path) else [path] if os.path.exists(path) else []
+        for name in sorted(files):
+            stat = os.stat(name)
+            parts.append(f"{name}:{stat.st_size}:{stat.st_mtime_ns}")
+    return parts
+
+
+def data_fingerprint(agent, source):
+    # Cheap identity of the training rows: file stats, or row count and newest timestamp
+    if source == 'db':
+        from agents import db
+        with db.cursor() as cur:
+            cur.execute(f"SELECT COUNT(*), MAX(timestamp) FROM {TABLES[agent]};")
+            count, newest = cur.fetchone()
+        parts = [db.backend(), TABLES[agent], str(count), str(newest)]
+    else:
+        from agents import ingest, store
+        parts = _file_fingerprint([os.path.join(ingest.CLEANED_DIR, ingest.SOURCES[agent]['cleaned']),
+                                   os.path.join(store.PARQUET_DIR, agent)])
+    with open(features.__file__, 'rb') as f:
+        parts.append(hashlib.sha256(f.read()).hexdigest())
+    return hashlib.sha256('\n'.join([agent, source] + parts).encode()).hexdigest()[:16]
+
+
+def read_rows(agent, source, since=None):
+    # Raw training rows in cleaned_data column names, oldest first
+    if source == 'db':
+        from agents import db
+        where, params = ("WHERE timestamp > %s", (since.to_pydatetime(),)) if since is not None else ("", ())
+        with db.cursor() as cur:
+            cur.execute(f"SELECT {', '.join(DB_COLUMNS[agent])} FROM {TABLES[agent]} {where} "
+                        f"ORDER BY timestamp, user_id;", params)
+            df = pd.DataFrame(cur.fetchall(), columns=DB_COLUMNS[agent])
+        df = df.rename(columns=features.DB_RENAMES)
+    else:
+        from agents import store
+        df = store.read_cleaned(agent, start=since)
+        df = df.sort_values(['timestamp', 'user_id'], kind='stable')
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    if since is not None:
+        df = df[df['timestamp'] > since]
+    return df.dropna(subset=[PIPELINE_TARGETS[agent]]).reset_index(drop=True)
+
+
+def matrices(rows, agent):
+    X = features.build_features(agent, rows).astype(float)
+    complete = X.notna().all(axis=1)
+    y = rows.loc[complete, PIPELINE_TARGETS[agent]].astype(int)
+    return X[complete], y, rows['timestamp'].max()
+
+
+def load_matrices(agent, source, use_cache=True):
+    # (X, y, watermark, cache hit); cached by data fingerprint and feature code
+    import joblib
+    path = os.path.join(CACHE_DIR, f"{agent}-{source}-{data_fingerprint(agent, source)}.joblib")
+    if use_cache and os.path.exists(path):
+        X, y, watermark = joblib.load(path)
+        return X, y, watermark, True
+    X, y, watermark = matrices(read_rows(agent, source), agent)
+    if not use_cache:
+        return X, y, watermark, False
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    joblib.dump((X, y, watermark), path + '.tmp')
+    os.replace(path + '.tmp', path)
+    # Train on what was cached, so cold and warm runs pickle byte-identical models
+    X, y, watermark = joblib.load(path)
+    return X, y, watermark, False
+
+
+# ========================
+# 📏 METRICS
+# ========================
+def evaluate(model, X, y):
+    from sklearn.metrics import accuracy_score, confusion_matrix, f1_score, precision_score, recall_score, roc_auc_score
+
+    predicted = model.predict(X)
+    metrics = {
+        'rows': int(len(y)),
+        'accuracy': accuracy_score(y, predicted),
+        'precision': precision_score(y, predicted, zero_division=0),
+        'recall': recall_score(y, predicted, zero_division=0),
+        'f1': f1_score(y, predicted, zero_division=0),
+        'confusion_matrix': confusion_matrix(y, predicted, labels=[0, 1]).tolist(),
+    }
+    if y.nunique() == 2:
+        metrics['roc_auc'] = roc_auc_score(y, model.predict_proba(X)[:, 1])
+    return {k: round(v, 4) if isinstance(v, float) else v for k, v in metrics.items()}
+
+
+def describe(model):
+    clf = model.steps[-1][1]
+    params = {k: v for k, v in clf.get_params().items() if k in ('C', 'alpha', 'class_weight', 'max_iter')}
+    return {'estimator': type(clf).__name__, **params}
+
+
+# ========================
+# 💾 ARTIFACTS
+# ========================
+def latest_manifest(agent, versions_dir=VERSIONS_DIR):
+    directory = os.path.join(versions_dir, agent)
+    manifests = sorted(f for f in os.listdir(directory) if f.endswith('.json')) if os.path.isdir(directory) else []
+    if not manifests:
+        return None
+    with open(os.path.join(directory, manifests[-1])) as f:
+        return json.load(f)
+
+
+def save_version(agent, model, manifest, versions_dir=VERSIONS_DIR):
+    import joblib
+    import numpy
+    import sklearn
+
+    directory = os.path.join(versions_dir, agent)
+    os.makedirs(directory, exist_ok=True)
+    stem = os.path.splitext(MODEL_FILES[agent])[0]
+    created = datetime.now(timezone.utc)
+    tmp = os.path.join(directory, f".{stem}.tmp")
+    joblib.dump(model, tmp)
+    with open(tmp, 'rb') as f:
+        sha256 = hashlib.sha256(f.read()).hexdigest()
+    name = f"{stem}-{created.strftime('%Y%m%dT%H%M%SZ')}-{sha256[:12]}"
+    path = os.path.join(directory, name + '.pkl')
+    os.replace(tmp, path)
+    manifest = dict(manifest, agent=agent, path=path, version=sha256[:12], sha256=sha256,
+                    created_at=created.isoformat(timespec='seconds'), random_state=RANDOM_STATE,
+                    libraries={'python': platform.python_version(), 'scikit-learn': sklearn.__version__,
+                               'numpy': numpy.__version__, 'pandas': pd.__version__})
+    with open(os.path.join(directory, name + '.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, default=str)
+    return manifest
+
+
+def promote(manifest, model_dir=MODEL_DIR):
+    # Same-directory copy then rename, so the registry never reads a half-written file
+    target = os.path.join(model_dir, MODEL_FILES[manifest['agent']])
+    shutil.copyfile(manifest['path'], target + '.tmp')
+    os.replace(target + '.tmp', target)
+    return target
+
+
+# ========================
+# 🏋️ TRAINING
+# ========================
+def train_full(agent, source, n_jobs, folds, use_cache):
+    from sklearn.model_selection import GridSearchCV, StratifiedKFold, train_test_split
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    timings = {}
+    with stage(timings, 'load_features'):
+        X, y, watermark, cached = load_matrices(agent, source, use_cache)
+    with stage(timings, 'split'):
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+    with stage(timings, 'search'):
+        pipeline = Pipeline([('scale', StandardScaler()), ('clf', 'passthrough')])
+        search = GridSearchCV(pipeline, search_space(), scoring=SCORING, n_jobs=n_jobs, refit=True,
+                              cv=StratifiedKFold(folds, shuffle=True, random_state=RANDOM_STATE))
+        search.fit(X_train, y_train)
+    with stage(timings, 'evaluate'):
+        holdout = evaluate(search.best_estimator_, X_test, y_test)
+    with stage(timings, 'refit_all'):
+        # The served model sees every row; the hold-out score above is its estimate
+        model = search.best_estimator_.fit(X, y)
+    return model, {
+        'mode': 'full', 'source': source, 'rows': int(len(y)), 'watermark': watermark,
+        'feature_cache_hit': cached, 'params': describe(model),
+        'cv': {'folds': folds, 'scoring': SCORING, 'best_score': round(search.best_score_, 4),
+               'candidates': len(search.cv_results_['params'])},
+        'holdout': holdout,
+    }, timings
+
+
+def train_incremental(agent, source, previous):
+    import joblib
+
+    timings = {}
+    since = pd.Timestamp(previous['watermark'])
+    with stage(timings, 'load_previous'):
+        model = joblib.load(previous['path'])
+    with stage(timings, 'load_new_rows'):
+        X_new, y_new, watermark = matrices(read_rows(agent, source, since=since), agent)
+    if X_new.empty:
+        return None, {'mode': 'incremental', 'new_rows': 0}, timings
+
+    scaler, clf = model.steps[0][1], model.steps[-1][1]
+    before = evaluate(model, X_new, y_new)
+    mode = None
+    if hasattr(clf, 'partial_fit'):
+        # The scaler stays as fitted: the coefficients only mean something on that scale
+        fallback = copy.deepcopy(clf)
+        with stage(timings, 'partial_fit'):
+            clf.partial_fit(scaler.transform(X_new), y_new)
+        rows, mode = previous['rows'] + len(y_new), 'partial_fit'
+        if evaluate(model, X_new, y_new)['f1'] < before['f1']:
+            # A few SGD steps on drifted rows can undo the old fit; refit instead
+            model.steps[-1] = (model.steps[-1][0], fallback)
+            clf, mode = fallback, None
+    if mode is None:
+        # No (useful) partial_fit: refit on everything, starting from the previous solution
+        with stage(timings, 'load_features'):
+            X, y, watermark, _ = load_matrices(agent, source)
+        with stage(timings, 'warm_refit'):
+            clf.set_params(warm_start=True)
+            model.fit(X, y)
+            clf.set_params(warm_start=False)
+        rows, mode = int(len(y)), 'warm_refit'
+    return model, {
+        'mode': mode, 'source': source, 'rows': rows, 'new_rows': int(len(y_new)), 'watermark': watermark,
+        'parent': previous['version'], 'params': describe(model),
+        'new_rows_before': before, 'new_rows_after': evaluate(model, X_new, y_new),
+    }, timings
+
+
+def run_agent(agent, source, incremental, n_jobs, folds, use_cache, versions_dir, do_promote):
+    # One process per model; returns its manifest (or a skip note) for the report
+    start = time.perf_counter()
+    if incremental:
+        previous = latest_manifest(agent, versions_dir)
+        if previous is None:
+            return {'agent': agent, 'skipped': "no previous version; run a full training first"}
+        model, manifest, timings = train_incremental(agent, source, previous)
+        if model is None:
+            return {'agent': agent, 'skipped': f"no rows newer than {previous['watermark']}"}
+    else:
+        model, manifest, timings = train_full(agent, source, n_jobs, folds, use_cache)
+    with stage(timings, 'save'):
+        manifest = save_version(agent, model, dict(manifest, timings=timings), versions_dir)
+    if do_promote:
+        manifest['promoted_to'] = promote(manifest)
+    manifest['timings']['total'] = round(time.perf_counter() - start, 3)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tables', default=','.join(MODEL_FILES), help="comma-separated: health,safety,reminders")
+    parser.add_argument('--source', choices=['cleaned', 'db'], default='cleaned',
+                        help="cleaned_data (Parquet store if present) or the database")
+    parser.add_argument('--incremental', action='store_true', help="update the newest versions with new rows only")
+    parser.add_argument('--workers', type=int, default=0, help="model processes (default: one per model, up to the core count)")
+    parser.add_argument('--cv', type=int, default=CV_FOLDS, help="cross-validation folds")
+    parser.add_argument('--no-cache', action='store_true', help="rebuild feature matrices without the cache")
+    parser.add_argument('--promote', action='store_true', help="copy the new versions over models/*.pkl")
+    parser.add_argument('--versions-dir', default=VERSIONS_DIR)
+    args = parser.parse_args(argv)
+
+    agents = args.tables.split(',')
+    cores = os.cpu_count() or 1
+    workers = args.workers or max(1, min(len(agents), cores))
+    # Cores left for each model's cross-validation
+    n_jobs = max(1, cores // workers)
+
+    start = time.perf_counter()
+    jobs = [(agent, args.source, args.incremental, n_jobs, args.cv, not args.no_cache, args.versions_dir,
+             args.promote) for agent in agents]
+    if workers == 1:
+        results = [run_agent(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_agent, *zip(*jobs)))
+    wall = round(time.perf_counter() - start, 3)
+
+    report = {'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'), 'cores': cores,
+              'workers': workers, 'cv_jobs_per_model': n_jobs, 'wall_seconds': wall, 'models': results}
+    os.makedirs(args.versions_dir, exist_ok=True)
+    report_path = os.path.join(args.versions_dir, f"report-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json")
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+
+    for result in results:
+        if 'skipped' in result:
+            print(f"⏭️ {result['agent']}: {result['skipped']}")
+            continue
+        scores = result.get('holdout') or result.get('new_rows_after')
+        print(f"✅ {result['agent']}: {result['mode']} {result['params']['estimator']} v{result['version']} "
+              f"on {result['rows']} rows, accuracy {scores['accuracy']}, roc_auc {scores.get('roc_auc', '-')}"
+              f"{' (promoted)' if result.get('promoted_to') else ''}")
+        print("   " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in result['timings'].items()))
+    print(f"Total: {wall:.2f}s with {workers} worker(s) x {n_jobs} CV job(s) -> {report_path}")
+
+
+if __name__ == '__main__':
+    main()
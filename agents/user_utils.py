@@ -1,16 +1,8 @@
-import psycopg2
+from agents import db
 
 def get_user_ids():
-    conn = psycopg2.connect(
-        host="localhost",
-        database="elderly_care",
-        user="postgres",
-        password="system",
-        port=5432
-    )
-    cur = conn.cursor()
-    cur.execute("SELECT DISTINCT user_id FROM health_monitoring ORDER BY user_id;")
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+    # users is kept up to date by agents/ingest.py (see migrations/0003_users.sql)
+    with db.cursor() as cur:
+        cur.execute("SELECT user_id FROM users ORDER BY user_id;")
+        rows = cur.fetchall()
     return [row[0] for row in rows]
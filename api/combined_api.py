@@ -1,75 +1,210 @@
-from flask import Flask, jsonify
-import psycopg2
+from flask import Flask, Response, jsonify, request
 import datetime
+import heapq
+import itertools
+import operator
 
-app = Flask(__name__)
-
-# Connect to PostgreSQL once
-conn = psycopg2.connect(
-    dbname="elderly_care",
-    user="postgres",
-    password="system",
-    host="localhost",
-    port="5432"
-)
-cur = conn.cursor()
+from agents import db, fleet, metrics, partitions, respond
 
+app = Flask(__name__)
+metrics.instrument_flask(app)
+respond.init_flask(app)
+
+# ========================
+# 📄 PAGING & STREAMING
+# ========================
+# GET /health                      -> whole table, streamed as one JSON document
+# GET /health?format=ndjson        -> whole table, one JSON object per line
+# GET /health?limit=500            -> first page ordered by (timestamp, user_id)
+# GET /health?limit=500&after_timestamp=...&after_user_id=...  -> next page
+# Any mode accepts ?columns=user_id,timestamp,heart_rate for projection.
+# Responses carry an ETag from the table's newest timestamp, its version and
+# the query string; If-None-Match with it gets 304 before the table is read.
+# Months past retention are read back from archive/ (agents/partitions.py)
+# and merged in the same (timestamp, user_id) order, so paging and streaming
+# still cover the whole history.
+MAX_PAGE_SIZE = 5000
+STREAM_BATCH_SIZE = 1000
+TABLE_AGENTS = {table: agent for agent, table in fleet.TABLES.items()}
+
+_table_columns = {}
+
+
+def table_columns(table):
+    if table not in _table_columns:
+        with db.cursor() as cur:
+            cur.execute(f"SELECT * FROM {table} LIMIT 0")
+            _table_columns[table] = [desc[0] for desc in cur.description]
+    return _table_columns[table]
+
+
+def projection(table):
+    columns = table_columns(table)
+    requested = request.args.get('columns')
+    if not requested:
+        return columns
+    picked = [col.strip() for col in requested.split(',') if col.strip()]
+    unknown = [col for col in picked if col not in columns]
+    if unknown:
+        raise ValueError(f"unknown columns: {', '.join(unknown)}")
+    return picked
+
+
+def _sort_key(select):
+    return operator.itemgetter(select.index('timestamp'), select.index('user_id'))
+
+
+def merged_page(table, select, rows, after, limit):
+    agent = TABLE_AGENTS[table]
+    if not partitions.archived_months(agent):
+        return rows
+    archived = itertools.islice(partitions.archive_rows(agent, select, after), limit)
+    return list(itertools.islice(heapq.merge(archived, rows, key=_sort_key(select)), limit))
+
+
+def merged_batches(table, select, batches):
+    agent = TABLE_AGENTS[table]
+    if not partitions.archived_months(agent):
+        yield from batches
+        return
+    rows = heapq.merge(partitions.archive_rows(agent, select), itertools.chain.from_iterable(batches),
+                       key=_sort_key(select))
+    while batch := list(itertools.islice(rows, STREAM_BATCH_SIZE)):
+        yield batch
+
+
+def page_response(table, key, columns):
+    try:
+        limit = max(1, min(int(request.args.get("limit")), MAX_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    after_ts = request.args.get('after_timestamp')
+    after_user = request.args.get('after_user_id')
+    if (after_ts is None) != (after_user is None):
+        # Half a cursor would silently restart from the first page
+        return jsonify({"error": "after_timestamp and after_user_id must be given together"}), 400
+    if after_ts is not None:
+        # next.after_timestamp comes back as ISO 8601; parsed, it binds like any stored timestamp
+        try:
+            after_ts = datetime.datetime.fromisoformat(after_ts)
+        except ValueError:
+            return jsonify({"error": "after_timestamp must be an ISO 8601 timestamp"}), 400
+
+    # Keyset pagination: the sort keys ride along even if not projected
+    select = columns + [col for col in ('timestamp', 'user_id') if col not in columns]
+    query = f"SELECT {', '.join(select)} FROM {table}"
+    params = []
+    after = None
+    if after_ts is not None:
+        query += " WHERE (timestamp, user_id) > (%s, %s)"
+        after = (after_ts, after_user)
+        params = list(after)
+    query += " ORDER BY timestamp, user_id LIMIT %s"
+    params.append(limit)
+
+    with db.cursor() as cur:
+        cur.execute(query, params)
+        rows = cur.fetchall()
+    rows = merged_page(table, select, rows, after, limit)
+
+    records = [dict(zip(select, row)) for row in rows]
+    next_page = None
+    if len(rows) == limit:
+        last = records[-1]
+        next_page = {'after_timestamp': last['timestamp'], 'after_user_id': last['user_id']}
+    body = {key: [{col: rec[col] for col in columns} for rec in records], 'next': next_page}
+    with metrics.span('serialize'):
+        body = respond.dumps(body)
+    return Response(body, mimetype='application/json')
+
+
+def stream_rows(table, columns, ndjson):
+    # Runs after the request's hooks, so these spans are labelled '-' rather than by route.
+    # The sort keys ride along for the merge with archived months; zip() drops them again.
+    select = columns + [col for col in ('timestamp', 'user_id') if col not in columns]
+    query = f"SELECT {', '.join(select)} FROM {table} ORDER BY timestamp, user_id"
+    batches = (rows for _, rows in db.stream(query, batch_size=STREAM_BATCH_SIZE))
+    for rows in merged_batches(table, select, batches):
+        with metrics.span('serialize'):
+            if ndjson:
+                chunk = b''.join(respond.dumps(dict(zip(columns, row)), newline=True) for row in rows)
+            else:
+                chunk = b','.join(respond.dumps(dict(zip(columns, row))) for row in rows)
+        yield chunk
+
+
+def stream_response(table, key, columns):
+    if request.args.get('format') == 'ndjson':
+        return Response(stream_rows(table, columns, ndjson=True), mimetype='application/x-ndjson')
+
+    def document():
+        # Same envelope as before ({key: [...]}), built batch by batch
+        yield b'{' + respond.dumps(key) + b': ['
+        first = True
+        for chunk in stream_rows(table, columns, ndjson=False):
+            yield chunk if first else b',' + chunk
+            first = False
+        yield b']}'
+
+    return Response(document(), mimetype='application/json')
+
+
+def table_etag(table):
+    # The (timestamp, user_id) index answers MAX(timestamp) without a scan; the
+    # table's version (migration 0008) catches rows rewritten in place
+    with db.cursor() as cur:
+        cur.execute(f"SELECT MAX(timestamp), (SELECT version FROM table_versions WHERE table_name = %s) FROM {table}",
+                    (table,))
+        newest = tuple(cur.fetchone())
+    return respond.etag(table, request.query_string, newest)
+
+
+def table_response(table, key):
+    try:
+        columns = projection(table)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    tag = table_etag(table)
+    if respond.matches(request.headers.get('If-None-Match'), tag):
+        return Response(status=304, headers={'ETag': tag, 'Cache-Control': 'no-cache'})
+    if 'limit' in request.args:
+        response = page_response(table, key, columns)
+    else:
+        response = stream_response(table, key, columns)
+    if isinstance(response, Response):
+        response.headers['ETag'] = tag
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+# ========================
+# 🌐 ROUTES
+# ========================
 @app.route("/")
 def home():
     return jsonify({"message": "Elderly Care Multi-Agent API is running!"})
 
+@app.route("/metrics", methods=["GET"])
+def metrics_export():
+    return Response(metrics.render(pool=db.pool_stats()), content_type=metrics.CONTENT_TYPE)
+
 # Health Monitoring Endpoint
 @app.route("/health", methods=["GET"])
 def get_health_data():
-    cur.execute("SELECT * FROM health_monitoring")
-    data = cur.fetchall()
-    columns = [desc[0] for desc in cur.description]
-
-    result = []
-    for row in data:
-        row_dict = {}
-        for key, value in zip(columns, row):
-            row_dict[key] = str(value)
-        result.append(row_dict)
-
-    return jsonify({"health_monitoring": result})
+    return table_response("health_monitoring", "health_monitoring")
 
 
 # Daily Reminders Endpoint
 @app.route("/reminders", methods=["GET"])
 def get_reminders():
-    cur.execute("SELECT * FROM daily_reminder")
-    data = cur.fetchall()
-    columns = [desc[0] for desc in cur.description]
-
-    result = []
-    for row in data:
-        row_dict = {}
-        for key, value in zip(columns, row):
-            if isinstance(value, (datetime.time, datetime.date)):
-                value = str(value)
-            row_dict[key] = value
-        result.append(row_dict)
-
-    return jsonify({'daily_reminders': result})
+    return table_response("daily_reminder", "daily_reminders")
 
 
 # Safety Monitoring Endpoint
 @app.route("/safety", methods=["GET"])
 def get_safety_data():
-    cur.execute("SELECT * FROM safety_monitoring")
-    data = cur.fetchall()
-    columns = [desc[0] for desc in cur.description]
-
-    result = []
-    for row in data:
-        row_dict = {}
-        for key, value in zip(columns, row):
-            row_dict[key] = str(value)
-        result.append(row_dict)
-
-    return jsonify({"safety_monitoring": result})
+    return table_response("safety_monitoring", "safety_monitoring")
 
 
+# Start from the project root: python -m api.combined_api
 if __name__ == "__main__":
     app.run(debug=True, port=5001)
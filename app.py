@@ -2,8 +2,14 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import json
-import psycopg2
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from agents import db
 from agents.user_utils import get_user_ids
 
 st.set_page_config(
@@ -13,6 +19,17 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Agent API base URL, and how long a fetched response is reused. The page
+# re-checks the selected resident every ELDERLY_CARE_DASHBOARD_REFRESH
+# seconds in the background instead of refetching on every click.
+API_URL = os.environ.get("ELDERLY_CARE_API_URL", "http://localhost:5001")
+REFRESH_SECONDS = float(os.environ.get("ELDERLY_CARE_DASHBOARD_REFRESH", "30"))
+USER_LIST_TTL = float(os.environ.get("ELDERLY_CARE_DASHBOARD_USERS_TTL", "300"))
+API_TIMEOUT = 5
+# Trend charts: days of history and the most points drawn per vital
+HISTORY_DAYS = int(os.environ.get("ELDERLY_CARE_DASHBOARD_HISTORY_DAYS", "90"))
+HISTORY_POINTS = int(os.environ.get("ELDERLY_CARE_DASHBOARD_HISTORY_POINTS", "500"))
+TREND_VITALS = ["heart_rate", "bp_systolic", "bp_diastolic", "glucose_level", "spo2"]
 
 
 # Sidebar
@@ -20,53 +37,126 @@ st.sidebar.title("🏥 Health Monitoring Dashboard")
 page = st.sidebar.radio("Navigate", ["Dashboard", "Health Monitoring", "Safety Monitoring", "Daily Reminders"])
 st.sidebar.markdown("---")
 
-# PostgreSQL Connection
+# PostgreSQL Connection (pooled, shared with the API; settings come from ELDERLY_CARE_DSN)
 def get_connection():
-    return psycopg2.connect(
-        host="localhost",
-        database="elderly_care",
-        user="postgres",
-        password="system",
-        port=5432
-    )
-
-# Fetching user IDs from database using agent function
-try:
-    user_ids = get_user_ids()
-except Exception as e:
-    st.sidebar.error(f"❌ Failed to fetch users: {e}")
-    user_ids = ["No Users"]
-
-user_id = st.sidebar.selectbox("Select User", user_ids)
-st.sidebar.write(f"👤 Selected: {user_id}")
-
-# API Endpoints
-HEALTH_API = f"http://localhost:5001/health/user/{user_id}"
-SAFETY_API = f"http://localhost:5001/safety/user/{user_id}"
-DAILY_API = f"http://localhost:5001/reminders/user/{user_id}"
-
-# Safe JSON fetch function
-def safe_get_json(url, key):
+    return db.connection()
+
+# One keep-alive HTTP connection pool for every rerun and browser session
+@st.cache_resource
+def http_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+class ApiError(Exception):
+    pass
+
+def get_json(url):
+    response = http_session().get(url, timeout=API_TIMEOUT)
+    if response.status_code != 200 or not response.content:
+        raise ApiError(f"❌ Failed to fetch from API: {url}")
     try:
-        response = requests.get(url)
-        if response.status_code == 200 and response.content:
-            return response.json().get(key, [])
-        else:
-            st.error(f"❌ Failed to fetch from API: {url}")
-            return []
+        return response.json()
     except ValueError:
-        st.error(f"❌ Invalid JSON from API: {url}")
-        return []
+        raise ApiError(f"❌ Invalid JSON from API: {url}")
+
+# Failures raise, so only good responses are cached
+@st.cache_data(ttl=REFRESH_SECONDS, show_spinner=False)
+def fetch_json(url):
+    return get_json(url)
+
+@st.cache_data(ttl=USER_LIST_TTL, show_spinner=False)
+def load_user_ids():
+    return get_user_ids()
+
+# Building a Plotly figure costs 50–100 ms and is the bulk of a rerun; the
+# same data always draws the same chart, so figures are cached by their inputs
+@st.cache_resource(ttl=REFRESH_SECONDS, max_entries=64, show_spinner=False)
+def chart(kind, df, **options):
+    return getattr(px, kind)(df, **options)
+
+def summary_url(user_id):
+    # Latest health, safety and reminder rows in one call and one query
+    return f"{API_URL}/user/{user_id}/summary"
+
+def history_url(agent, user_id):
+    # Hourly min/mean/max from the rollup tables, downsampled on the server
+    return (f"{API_URL}/{agent}/history/{user_id}"
+            f"?days={HISTORY_DAYS}&bucket=1h&max_points={HISTORY_POINTS}")
+
+def trend_frame(history, names):
+    # Long format (timestamp, Vital Sign, min, mean, max) for the trend chart
+    frames = [pd.DataFrame(history["series"][name]).assign(**{"Vital Sign": name})
+              for name in names if history.get("series", {}).get(name, {}).get("timestamp")]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+# Safe JSON fetch function; `pending` is an already-started fetch of the same url
+def safe_get_json(url, pending=None):
+    try:
+        return pending.result() if pending is not None else fetch_json(url)
+    except ApiError as e:
+        st.error(str(e))
+        return {}
     except requests.exceptions.RequestException as e:
         st.error(f"❌ API request failed: {e}")
-        return []
+        return {}
+
+# The user list (database) and the selected resident's summary (API) are
+# independent once the selection is known from the previous run, so the
+# summary is fetched on a second thread while the user list loads.
+selected = st.session_state.get("user_id")
+ctx = get_script_run_ctx()
+with ThreadPoolExecutor(max_workers=1, initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx)) as pool:
+    pending = pool.submit(fetch_json, summary_url(selected)) if selected else None
+
+    # Fetching user IDs from database using agent function
+    try:
+        user_ids = load_user_ids()
+    except Exception as e:
+        st.sidebar.error(f"❌ Failed to fetch users: {e}")
+        user_ids = ["No Users"]
+
+    user_id = st.sidebar.selectbox("Select User", user_ids, key="user_id")
+    st.sidebar.write(f"👤 Selected: {user_id}")
+
+    # Fetched once per run; every page reads its part of the summary
+    SUMMARY_API = summary_url(user_id)
+    summary = safe_get_json(SUMMARY_API, pending if user_id == selected else None)
+
+# Background refresh: on its own timer, re-read the resident's summary and
+# rerun the page only when it changed. The last ETag goes back as
+# If-None-Match, so an unchanged summary is a bodiless 304.
+@st.fragment(run_every=REFRESH_SECONDS)
+def auto_refresh():
+    if time.monotonic() - st.session_state.get("refreshed_at", 0) < REFRESH_SECONDS:
+        return
+    st.session_state["refreshed_at"] = time.monotonic()
+    etags = st.session_state.setdefault("etags", {})
+    headers = {"If-None-Match": etags[SUMMARY_API]} if SUMMARY_API in etags else {}
+    try:
+        response = http_session().get(SUMMARY_API, headers=headers, timeout=API_TIMEOUT)
+        if response.status_code != 200:     # 304: nothing new
+            return
+        latest = response.json()
+    except (ValueError, requests.exceptions.RequestException):
+        return
+    if "ETag" in response.headers:
+        etags[SUMMARY_API] = response.headers["ETag"]
+    if latest != summary:
+        fetch_json.clear(SUMMARY_API)
+        st.rerun()
+
+st.session_state["refreshed_at"] = time.monotonic()
+auto_refresh()
 
 # Dashboard Overview
 if page == "Dashboard":
     st.title("📊 Overview Dashboard")
     st.markdown("#### Fetching data from API...")
 
-    health_data = safe_get_json(HEALTH_API, 'health_monitoring')
+    health_data = summary.get('health_monitoring') or []
     health_df = pd.DataFrame([health_data]) if isinstance(health_data, dict) else pd.DataFrame(health_data)
 
     if not health_df.empty:
@@ -98,7 +188,7 @@ if page == "Dashboard":
         health_df['hr_zone'] = pd.cut(health_df['heart_rate'], bins=[0, 60, 80, 100, 200],
                                     labels=["Low", "Normal", "Elevated", "High"])
 
-        fig = px.scatter(
+        fig = chart("scatter",
             health_df, x="bp_systolic", y="temperature",
             size="bp_diastolic", color="hr_zone",
             title="BP vs Temp colored by Heart Rate Zone",
@@ -120,7 +210,7 @@ if page == "Dashboard":
 # Health Monitoring Page
 elif page == "Health Monitoring":
     st.title("❤️ Health Monitoring")
-    health_data = safe_get_json(HEALTH_API, 'health_monitoring')
+    health_data = summary.get('health_monitoring') or []
     health_df = pd.DataFrame([health_data]) if isinstance(health_data, dict) else pd.DataFrame(health_data)
     st.dataframe(health_df)
 
@@ -144,33 +234,33 @@ elif page == "Health Monitoring":
             st.markdown(f"**Predicted Status:** {hr_status}")
 
         st.subheader("📊 Vital Signs Correlation")
-        fig = px.scatter_matrix(health_df,
+        fig = chart("scatter_matrix", health_df,
             dimensions=["bp_systolic", "bp_diastolic", "heart_rate", "temperature"],
             color="heart_rate",
             title="Correlation Between Vitals")
         st.plotly_chart(fig)
 
         st.subheader("📉 Trends Over Time")
-        melted_df = health_df.melt(id_vars="timestamp", value_vars=["heart_rate", "bp_systolic", "bp_diastolic", "temperature"],
-                                var_name="Vital Sign", value_name="Value")
-
-        fig_time = px.bar(
-            melted_df,
-            x="timestamp",
-            y="Value",
-            color="Vital Sign",
-            barmode="group",
-            title="Vital Signs Over Time (Grouped Bars)"
-        )
-        st.plotly_chart(fig_time)
+        trend_df = trend_frame(safe_get_json(history_url("health", user_id)), TREND_VITALS)
+        if trend_df.empty:
+            st.info("ℹ️ No history recorded for this user yet.")
+        else:
+            fig_time = chart("line",
+                trend_df,
+                x="timestamp",
+                y="mean",
+                color="Vital Sign",
+                hover_data=["min", "max"],
+                title=f"Hourly Averages, Last {HISTORY_DAYS} Days"
+            )
+            st.plotly_chart(fig_time)
 
 # Safety Monitoring Page
 elif page == "Safety Monitoring":
     st.title("🛡️ Safety Monitoring")
     try:
-        response = requests.get(SAFETY_API)
-        if response.status_code == 200 and response.content:
-            safety = response.json().get('safety_monitoring')
+        if summary:
+            safety = summary.get('safety_monitoring')
             if safety:
                 st.subheader("🚨 Safety Alert Details")
                 st.markdown(f"**📅 Time:** {safety.get('timestamp', 'N/A')}")
@@ -184,12 +274,12 @@ elif page == "Safety Monitoring":
                     "Type": ["Emergency Call", "No Call"],
                     "Count": [1 if safety.get('emergency_call') else 0, 1 if not safety.get('emergency_call') else 0]
                 })
-                fig = px.pie(emergency_df, names="Type", values="Count", title="Emergency Call Ratio")
+                fig = chart("pie", emergency_df, names="Type", values="Count", title="Emergency Call Ratio")
                 st.plotly_chart(fig)
 
                 st.subheader("📍 Event Type Breakdown")
                 event_df = pd.DataFrame({"Event Type": [safety.get('event_type')], "Count": [1]})
-                fig_event = px.bar(event_df, x="Event Type", y="Count", title="Type of Events Detected")
+                fig_event = chart("bar", event_df, x="Event Type", y="Count", title="Type of Events Detected")
                 st.plotly_chart(fig_event)
 
                 if safety.get('unsafe'):
@@ -207,9 +297,8 @@ elif page == "Safety Monitoring":
 elif page == "Daily Reminders":
     st.title("⏰ Daily Reminders")
     try:
-        response = requests.get(DAILY_API)
-        if response.status_code == 200 and response.content:
-            reminder = response.json().get('daily_reminders')
+        if summary:
+            reminder = summary.get('daily_reminders')
             if reminder:
                 df = pd.DataFrame([reminder])
                 st.dataframe(df)
@@ -224,7 +313,7 @@ elif page == "Daily Reminders":
                     "Missed": [int(not reminder.get('acknowledged'))]
                 })
                 st.subheader("📈 Acknowledgement Trend")
-                fig_summary = px.bar(summary_df.melt(), x="variable", y="value", color="variable", title="Acknowledged vs Missed")
+                fig_summary = chart("bar", summary_df.melt(), x="variable", y="value", color="variable", title="Acknowledged vs Missed")
                 st.plotly_chart(fig_summary)
             else:
                 st.markdown("### 😴 No Active Reminders")
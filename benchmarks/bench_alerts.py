@@ -0,0 +1,131 @@
+"""Caregiver alerts: sending inline in the request vs the dispatch queue (agents/alerts.py).
+
+Run from the project root (uses its own throwaway SQLite database and queue file):
+    python -m benchmarks.bench_alerts --latency 0.05 --failure-rate 0.1 --workers 16
+
+Every cleaned health reading with alert_triggered becomes an alert, repeated
+--repeats times 5 minutes apart as a device keeps reporting, and residents
+share --caregivers caregivers. The inline baseline does what a handler would
+have to do without the queue: call the notifier, then UPDATE
+caregiver_notified, one alert at a time. The queued path enqueues the same
+alerts in flush-sized batches and waits until every alert is delivered (or
+has failed) and written back. The notifier is the local stub with --latency
+seconds per call and --failure-rate simulated failures.
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+_dir = tempfile.mkdtemp(prefix='bench_alerts_')
+os.environ['ELDERLY_CARE_DSN'] = f"sqlite:///{os.path.join(_dir, 'alerts.db')}"
+
+from agents import alerts, db, ingest, migrate  # noqa: E402
+
+
+def setup(caregivers):
+    migrate.upgrade()
+    cleaned = pd.concat(ingest.read_clean_chunks('health'), ignore_index=True).dropna(subset=['timestamp'])
+    with db.cursor() as cur:
+        ingest.load_frame(cur, 'health', ingest.to_table_frame('health', cleaned))
+        cur.executemany("UPDATE users SET caregiver_id = %s WHERE user_id = %s;",
+                        [(f'CG{i % caregivers:03d}', user_id) for i, user_id in enumerate(cleaned['user_id'].unique())])
+    return cleaned[cleaned['alert_triggered'] == 1]
+
+
+def alert_list(flagged, repeats):
+    out = []
+    for k in range(repeats):
+        times = (flagged['timestamp'] + pd.Timedelta(minutes=5 * k)).dt.strftime(alerts.TIMESTAMP_FORMAT)
+        out += [{'agent': 'health', 'user_id': user_id, 'timestamp': ts, 'rule': 'alert_triggered',
+                 'severity': 'warning'} for user_id, ts in zip(flagged['user_id'], times)]
+    return out
+
+
+def reset_notified():
+    with db.cursor() as cur:
+        cur.execute("UPDATE health_monitoring SET caregiver_notified = FALSE;")
+
+
+def notified_count():
+    with db.cursor() as cur:
+        cur.execute("SELECT COUNT(*) FROM health_monitoring WHERE caregiver_notified;")
+        return cur.fetchone()[0]
+
+
+def inline(sample, notifier):
+    # One alert per "request": the outbound call, then its own UPDATE
+    loop = asyncio.new_event_loop()
+    start = time.perf_counter()
+    for alert in sample:
+        try:
+            loop.run_until_complete(notifier.send(alert))
+        except alerts.NotifierError:
+            continue
+        with db.cursor() as cur:
+            cur.execute("UPDATE health_monitoring SET caregiver_notified = TRUE WHERE user_id = %s AND timestamp = %s;",
+                        (alert['user_id'], alert['timestamp']))
+    loop.close()
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds per notifier call")
+    parser.add_argument('--failure-rate', type=float, default=0.1)
+    parser.add_argument('--workers', type=int, default=alerts.WORKERS)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--caregivers', type=int, default=100)
+    parser.add_argument('--rate', type=float, default=600, help="alerts per caregiver per minute")
+    parser.add_argument('--burst', type=int, default=alerts.BURST)
+    parser.add_argument('--batch', type=int, default=500, help="alerts per enqueue call (one ingestion flush)")
+    parser.add_argument('--inline-sample', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    flagged = setup(args.caregivers)
+    queued = alert_list(flagged, args.repeats)
+
+    reset_notified()
+    sample = queued[:args.inline_sample]
+    seconds = inline(sample, alerts.LocalNotifier(path=None, latency=args.latency,
+                                                  failure_rate=args.failure_rate, seed=1))
+    per_alert = seconds / len(sample)
+    print(f"inline: {1000 * per_alert:.1f} ms of handler time per alert, {1 / per_alert:.0f} alerts/s "
+          f"(measured on {len(sample)}; no dedup, no retries, {len(queued)} alerts would take {per_alert * len(queued):.0f}s)")
+
+    reset_notified()
+    dispatcher = alerts.Dispatcher(
+        queue=alerts.AlertQueue(os.path.join(_dir, 'queue.sqlite3')),
+        notifier=alerts.LocalNotifier(path=None, latency=args.latency, failure_rate=args.failure_rate, seed=1),
+        workers=args.workers, limiter=alerts.RateLimiter(args.rate, args.burst), backoff=0.05)
+    start = time.perf_counter()
+    for offset in range(0, len(queued), args.batch):
+        dispatcher.enqueue(queued[offset:offset + args.batch])
+    enqueue_seconds = time.perf_counter() - start
+    while True:
+        stats = dispatcher.stats()
+        if stats['queue_depth'] == 0 and stats['writeback_pending'] == 0:
+            break
+        time.sleep(0.05)
+    drained = time.perf_counter() - start
+    dispatcher.close()
+
+    print(f"queued: {1e6 * enqueue_seconds / len(queued):.1f} us of handler time per alert; "
+          f"{len(queued)} alerts -> {stats['enqueued']} queued, {stats['suppressed_duplicates']} duplicates dropped")
+    print(f"        drained in {drained:.2f}s ({stats['sent'] / drained:.0f} deliveries/s with {args.workers} in flight); "
+          f"{stats['retried']} retries, {stats['failed']} failed, {stats['rate_limited']} rate-limit deferrals")
+    latency = stats['dispatch_latency']
+    print(f"        enqueue -> delivered: p50 {latency['p50_ms']:.0f} ms, p99 {latency['p99_ms']:.0f} ms, "
+          f"max {latency['max_ms']:.0f} ms; caregiver_notified set on {notified_count()} readings")
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    finally:
+        db.close_pool()
+        shutil.rmtree(_dir, ignore_errors=True)
@@ -0,0 +1,192 @@
+"""Flask (threaded) vs the async app at high client concurrency.
+
+Run from the project root against a seeded database, e.g.
+    export ELDERLY_CARE_DSN=sqlite:///bench.db
+    python -m benchmarks.loadtest seed --scale 1
+    python -m benchmarks.bench_asgi --clients 200 --requests 4000 --workers 2
+
+Both servers are started as subprocesses on free ports and driven by the same
+minimal asyncio HTTP/1.1 client holding --clients connections open at once
+(a pooled client library would cost more CPU than the servers under test).
+Throughput is also reported per core: the Flask process is bound to one core
+by the GIL, the async server uses min(workers, CPUs).
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from urllib.error import URLError
+
+import numpy as np
+import pandas as pd
+
+from agents import ingest
+
+FLASK_CMD = "from agents.agents import app; app.run(host='127.0.0.1', port={port}, threaded=True)"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(kind, port, workers):
+    if kind == 'flask':
+        cmd = [sys.executable, '-c', FLASK_CMD.format(port=port)]
+    else:
+        cmd = [sys.executable, '-m', 'agents.serve', '--port', str(port), '--workers', str(workers)]
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1):
+                return proc
+        except (URLError, ConnectionError):
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"{kind} server did not start on port {port}")
+
+
+def request_mix(users):
+    # Half cheap cached lookups, half DB read + model call
+    mix = []
+    for i, user_id in enumerate(users):
+        agent = ('health', 'safety', 'reminders')[i % 3]
+        mix.append(('GET', f"/{agent}/user/{user_id}", None))
+        mix.append(('POST', f"/{agent}/auto_predict", {'user_id': user_id}))
+    return mix
+
+
+class Connection:
+    # One keep-alive HTTP/1.1 connection; reconnects when the server closes it
+    def __init__(self, port):
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection('127.0.0.1', self.port)
+        payload = json.dumps(body).encode() if body is not None else b''
+        head = (f"{method} {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(payload)}\r\n\r\n")
+        self.writer.write(head.encode() + payload)
+        try:
+            status, headers = await self._read_head()
+            if 'content-length' in headers:
+                await self.reader.readexactly(int(headers['content-length']))
+            elif headers.get('transfer-encoding') == 'chunked':
+                while True:
+                    size = int((await self.reader.readline()).strip(), 16)
+                    await self.reader.readexactly(size + 2)
+                    if size == 0:
+                        break
+            else:
+                await self.reader.read()
+                headers['connection'] = 'close'
+        except (ConnectionError, asyncio.IncompleteReadError):
+            self.close()
+            raise
+        if headers.get('connection') == 'close':
+            self.close()
+        return status
+
+    async def _read_head(self):
+        raw = await self.reader.readuntil(b'\r\n\r\n')
+        lines = raw.decode('latin-1').split('\r\n')
+        version, status = lines[0].split(' ')[:2]
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                key, value = line.split(':', 1)
+                headers[key.strip().lower()] = value.strip().lower()
+        if version == 'HTTP/1.0' and headers.get('connection') != 'keep-alive':
+            headers['connection'] = 'close'
+        return int(status), headers
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def drive(port, mix, clients, total):
+    latencies = np.zeros(total)
+    errors = 0
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async def worker():
+        nonlocal errors
+        conn = Connection(port)
+        while not queue.empty():
+            i = queue.get_nowait()
+            method, path, body = mix[i % len(mix)]
+            start = time.perf_counter()
+            try:
+                if await conn.request(method, path, body) >= 500:
+                    errors += 1
+            except (OSError, asyncio.IncompleteReadError):
+                errors += 1
+            latencies[i] = time.perf_counter() - start
+        conn.close()
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    wall = time.perf_counter() - wall_start
+
+    ms = latencies * 1000
+    return {
+        'requests': total,
+        'errors': errors,
+        'throughput_rps': round(total / wall, 1),
+        'p50_ms': round(float(np.percentile(ms, 50)), 2),
+        'p95_ms': round(float(np.percentile(ms, 95)), 2),
+        'p99_ms': round(float(np.percentile(ms, 99)), 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=4000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="async server worker processes")
+    parser.add_argument('--out', help="write the JSON report here")
+    args = parser.parse_args(argv)
+
+    path = os.path.join(ingest.CLEANED_DIR, ingest.SOURCES['health']['cleaned'])
+    mix = request_mix(pd.read_csv(path, usecols=['user_id'], nrows=1000)['user_id'].tolist())
+    cores = {'flask': 1, 'asgi': min(args.workers, os.cpu_count() or 1)}
+
+    results = {}
+    for kind in ('flask', 'asgi'):
+        port = free_port()
+        proc = start_server(kind, port, args.workers)
+        try:
+            asyncio.run(drive(port, mix, args.clients, min(200, args.requests)))  # warm-up
+            result = asyncio.run(drive(port, mix, args.clients, args.requests))
+        finally:
+            proc.terminate()
+            proc.wait()
+        result['cores'] = cores[kind]
+        result['throughput_per_core'] = round(result['throughput_rps'] / cores[kind], 1)
+        results[kind] = result
+        print(f"{kind:<6} {result['throughput_rps']:>8.1f} rps  {result['throughput_per_core']:>8.1f} rps/core  "
+              f"p50 {result['p50_ms']:>8.2f}  p95 {result['p95_ms']:>8.2f}  p99 {result['p99_ms']:>8.2f} ms  "
+              f"errors {result['errors']}", file=sys.stderr)
+
+    report = {'clients': args.clients, 'workers': args.workers, 'cpus': os.cpu_count(), 'results': results}
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
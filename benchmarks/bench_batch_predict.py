@@ -0,0 +1,69 @@
+"""Per-record cost of /<agent>/predict vs /<agent>/batch_predict.
+
+Run from the project root:  python -m benchmarks.bench_batch_predict
+No database is needed; payloads are built from cleaned_data/*.csv.
+"""
+import argparse
+import time
+import warnings
+
+import pandas as pd
+
+from agents.agents import app
+from agents.features import build_features
+
+DATASETS = {
+    'health': 'cleaned_data/cleaned_health_monitoring_dataset.csv',
+    'safety': 'cleaned_data/cleaned_safety_monitoring_dataset.csv',
+    'reminders': 'cleaned_data/cleaned_daily_reminder_dataset.csv',
+}
+
+
+def load_records(agent, n):
+    df = pd.read_csv(DATASETS[agent], nrows=n)
+    features = build_features(agent, df)
+    features.insert(0, 'user_id', df['user_id'])
+    return features.to_dict(orient='records')
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(sizes, repeat):
+    client = app.test_client()
+    for agent in DATASETS:
+        records = load_records(agent, max(sizes))
+        print(f"\n{agent}")
+        print(f"{'batch':>7} {'single loop µs/rec':>20} {'batch µs/rec':>14} {'speedup':>8}")
+        for size in sizes:
+            batch = records[:size]
+            # The single-record routes take bare features, no user_id
+            singles = [{k: v for k, v in rec.items() if k != 'user_id'} for rec in batch]
+
+            def single():
+                for rec in singles:
+                    client.post(f'/{agent}/predict', json=rec)
+
+            def batched():
+                resp = client.post(f'/{agent}/batch_predict', json={'records': batch})
+                assert resp.status_code == 200, resp.get_json()
+
+            loop_s = timed(single, 1 if size > 100 else repeat)
+            batch_s = timed(batched, repeat)
+            print(f"{size:>7} {1e6 * loop_s / size:>20.1f} {1e6 * batch_s / size:>14.1f} {loop_s / batch_s:>7.1f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='1,10,100,500,1000')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    # The single-record routes hand named frames to array-fitted models
+    warnings.filterwarnings('ignore', category=UserWarning)
+    run([int(s) for s in args.sizes.split(',')], args.repeat)
@@ -0,0 +1,53 @@
+"""API process cold start under each model warm-up mode.
+
+Run from the project root:
+    python -m benchmarks.bench_cold_start --runs 3
+
+Each run starts a fresh interpreter and times: importing agents.agents (what a
+worker pays before it can accept connections), the first /reminders/predict,
+and the first /health/user/<id> (a route that never touches a model).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROBE = r'''
+import json, time, warnings
+warnings.filterwarnings('ignore')
+t0 = time.perf_counter()
+from agents.agents import app
+t1 = time.perf_counter()
+client = app.test_client()
+client.post('/reminders/predict', json={'reminder_sent': 1, 'reminder_type_encoded': 2})
+t2 = time.perf_counter()
+client.get('/cache/stats')
+t3 = time.perf_counter()
+print(json.dumps({'import_s': t1 - t0, 'first_predict_s': t2 - t1, 'first_plain_route_s': t3 - t2}))
+'''
+
+
+def measure(mode):
+    env = dict(os.environ, ELDERLY_CARE_MODEL_WARMUP=mode)
+    out = subprocess.run([sys.executable, '-c', PROBE], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'mode':<12} {'import':>8} {'first predict':>14} {'import + predict':>17}  (median of {args.runs}, ms)")
+    for mode in ('lazy', 'background', 'eager'):
+        runs = [measure(mode) for _ in range(args.runs)]
+        imp = 1000 * statistics.median(r['import_s'] for r in runs)
+        first = 1000 * statistics.median(r['first_predict_s'] for r in runs)
+        total = 1000 * statistics.median(r['import_s'] + r['first_predict_s'] for r in runs)
+        print(f"{mode:<12} {imp:>8.0f} {first:>14.0f} {total:>17.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Streamlit rerun latency: switching pages and switching residents.
+
+Run from the project root against a seeded database (see benchmarks/loadtest.py):
+    ELDERLY_CARE_DSN=sqlite:///loadtest.db python -m benchmarks.bench_dashboard
+    git show <rev>:app.py > /tmp/app_before.py
+    ELDERLY_CARE_DSN=sqlite:///loadtest.db python -m benchmarks.bench_dashboard --app /tmp/app_before.py --app app.py
+
+Starts the agent API on --port (older app.py versions hard-code 5001) and
+drives each app script with Streamlit's AppTest. Every script runs in the
+same process, as reruns do on a Streamlit server. Each rerun is timed
+inside the script thread, so AppTest's own polling is left out. The timings
+include the script's database and HTTP calls and building the charts.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ["Dashboard", "Health Monitoring", "Safety Monitoring", "Daily Reminders"]
+
+warnings.filterwarnings('ignore')
+
+
+_script_ms = []
+
+
+def _time_script_runs():
+    # Wall time of each script execution, measured on the script thread
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.runtime.scriptrunner.script_runner import ScriptRunner
+    run_script = ScriptRunner._run_script
+
+    # AppTest compiles the script afresh on every run; a server compiles it once
+    shared, get_bytecode = ScriptCache(), ScriptCache.get_bytecode
+    ScriptCache.get_bytecode = lambda self, path: get_bytecode(shared, path)
+
+    def timed_run(self, rerun_data):
+        start = time.perf_counter()
+        try:
+            return run_script(self, rerun_data)
+        finally:
+            _script_ms.append(1000 * (time.perf_counter() - start))
+
+    ScriptRunner._run_script = timed_run
+
+
+def timed(at, action):
+    action()
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return _script_ms[-1]
+
+
+def bench(path, users, rounds):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.abspath(path), default_timeout=60)
+    first = timed(at, lambda: None)
+    page_ms, user_ms = [], []
+    for _ in range(rounds):
+        for page in PAGES[1:] + PAGES[:1]:
+            page_ms.append(timed(at, lambda: at.sidebar.radio[0].set_value(page)))
+        for user_id in users:
+            user_ms.append(timed(at, lambda: at.sidebar.selectbox[0].set_value(user_id)))
+    return first, page_ms, user_ms
+
+
+def describe(samples):
+    return f"mean {statistics.mean(samples):7.1f}  p50 {statistics.median(samples):7.1f}  max {max(samples):7.1f}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--app', action='append', help="app script to time (repeatable; default app.py)")
+    parser.add_argument('--users', type=int, default=5, help="residents cycled through per round")
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--port', type=int, default=5001)
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, ROOT)
+    os.environ['ELDERLY_CARE_API_URL'] = f"http://127.0.0.1:{args.port}"
+    from agents.user_utils import get_user_ids
+    from benchmarks.bench_asgi import start_server
+
+    users = get_user_ids()[:args.users]
+    _time_script_runs()
+    server = start_server('flask', args.port, 1)
+    try:
+        for path in args.app or [os.path.join(ROOT, 'app.py')]:
+            first, page_ms, user_ms = bench(path, users, args.rounds)
+            print(f"{path}")
+            print(f"  first run      {first:7.1f} ms")
+            print(f"  switch page    {describe(page_ms)}  ms ({len(page_ms)} reruns)")
+            print(f"  switch user    {describe(user_ms)}  ms ({len(user_ms)} reruns)")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    main()
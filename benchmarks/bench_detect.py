@@ -0,0 +1,107 @@
+"""Replay Dataset/*.csv through the streaming detectors (agents/detect.py).
+
+Run from the project root:
+    python -m benchmarks.bench_detect --residents 100000 --readings 20
+    python -m benchmarks.bench_detect --residents 2000 --check   # and compare with a pandas rolling reference
+
+The datasets hold one reading per device, so each simulated device streams
+--readings real rows (device u's k-th reading is dataset row (u + k*7919)
+mod N), --every minutes apart from its own dataset timestamp. Devices past
+the dataset's size are copies with a suffixed user_id. All devices are
+merged into one time-ordered stream and fed in --batch sized frames, as
+/<agent>/ingest submissions arrive. Reports sustained readings per second
+on this core, memory per resident and the events raised per rule.
+"""
+import argparse
+import resource
+import time
+
+import numpy as np
+import pandas as pd
+
+from agents import detect, ingest
+
+STRIDE = 7919
+
+
+def device_stream(agent, residents, readings, every):
+    cleaned = pd.concat(ingest.read_clean_chunks(agent), ignore_index=True).dropna(subset=['timestamp'])
+    n = len(cleaned)
+    device = np.repeat(np.arange(residents), readings)
+    k = np.tile(np.arange(readings), residents)
+    stream = cleaned.iloc[(device + k * STRIDE) % n].reset_index(drop=True)
+    base = cleaned.iloc[device % n]
+    copies = device // n
+    stream['user_id'] = np.where(copies == 0, base['user_id'].to_numpy(dtype=object),
+                                 base['user_id'].to_numpy(dtype=object) + '-' + copies.astype(str))
+    stream['timestamp'] = base['timestamp'].to_numpy() + pd.to_timedelta(k * every, unit='min')
+    return stream.sort_values('timestamp', kind='stable').reset_index(drop=True)
+
+
+def reference_events(stream):
+    # Health rules recomputed per resident with pandas rolling windows (no gaps in a replay)
+    expected = set()
+    for column, spec in detect.VITALS.items():
+        values = stream[column].astype('float32').astype(float)
+        rolling = values.groupby(stream['user_id']).rolling(detect.WINDOW, min_periods=1)
+        mean = rolling.mean().droplevel(0).sort_index()
+        std = rolling.std(ddof=0).droplevel(0).sort_index()
+        seen = values.groupby(stream['user_id']).cumcount() + 1
+        before_mean = mean.groupby(stream['user_id']).shift()
+        before_std = std.groupby(stream['user_id']).shift().clip(lower=spec['min_std'])
+        # pandas' rolling std carries float noise; readings exactly SPIKE_Z deviations out are not spikes
+        spike = (seen - 1 >= detect.MIN_READINGS) & ((values - before_mean).abs() > detect.SPIKE_Z * before_std + 1e-9)
+        state = pd.Series(0, index=stream.index)
+        if spec['low'] is not None:
+            state = state.mask(mean < spec['low'], 1)
+        if spec['high'] is not None:
+            state = state.mask(mean > spec['high'], 2)
+        state = state.where(seen >= detect.MIN_READINGS, 0)
+        changed = state.ne(state.groupby(stream['user_id']).shift().fillna(0)) & state.gt(0)
+        for i in stream.index[spike]:
+            expected.add((stream.at[i, 'user_id'], i, f'{column}_spike'))
+        for i in stream.index[changed]:
+            expected.add((stream.at[i, 'user_id'], i, f"{column}_{'low' if state[i] == 1 else 'high'}"))
+    return expected
+
+
+def replay(agent, stream, batch):
+    engine = detect.DETECTORS[agent]()
+    events = []
+    start = time.perf_counter()
+    for offset in range(0, len(stream), batch):
+        events += engine.process(stream.iloc[offset:offset + batch])
+    return engine, events, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--agents', default='health,safety')
+    parser.add_argument('--residents', type=int, default=100000)
+    parser.add_argument('--readings', type=int, default=20, help="readings per device")
+    parser.add_argument('--every', type=int, default=10, help="minutes between a device's readings")
+    parser.add_argument('--batch', type=int, default=100, help="readings per submitted frame")
+    parser.add_argument('--check', action='store_true', help="compare health events with a pandas reference")
+    args = parser.parse_args(argv)
+
+    print(f"{'agent':<8} {'readings':>9} {'residents':>9} {'seconds':>8} {'readings/s':>11} "
+          f"{'us/reading':>10} {'bytes/res':>9} {'events':>8}")
+    for agent in args.agents.split(','):
+        stream = device_stream(agent, args.residents, args.readings, args.every)
+        engine, events, seconds = replay(agent, stream, args.batch)
+        stats = engine.stats()
+        print(f"{agent:<8} {len(stream):>9} {stats['residents']:>9} {seconds:>8.2f} {len(stream) / seconds:>11.0f} "
+              f"{1e6 * seconds / len(stream):>10.1f} {stats['bytes_per_resident']:>9} {len(events):>8}")
+        print(f"{'':<8} detector state {stats['memory_bytes'] / 2**20:.1f} MB, "
+              f"in-loop {stats['us_per_reading']} us/reading; {stats['events_by_rule']}")
+        if args.check and agent == 'health':
+            times = stream['timestamp'].dt.strftime(detect.TIMESTAMP_FORMAT).tolist()
+            got = {(e['user_id'], e['timestamp'], e['rule']) for e in events}
+            expected = {(user_id, times[i], rule) for user_id, i, rule in reference_events(stream)}
+            print(f"{'':<8} {'✅' if got == expected else '❌'} pandas reference: {len(expected)} events, "
+                  f"{len(got - expected)} extra, {len(expected - got)} missing")
+    print(f"peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+
+if __name__ == '__main__':
+    main()
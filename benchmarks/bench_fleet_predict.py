@@ -0,0 +1,43 @@
+"""Per-user /<agent>/auto_predict loop vs one /<agent>/fleet_predict sweep.
+
+Run from the project root against the database in ELDERLY_CARE_DSN:
+    python -m benchmarks.bench_fleet_predict --users 1000
+The loop is timed over --users residents and extrapolated to the whole fleet.
+"""
+import argparse
+import json
+import time
+import warnings
+
+from agents.agents import app
+
+
+def run(agents, users):
+    client = app.test_client()
+    print(f"{'agent':<10} {'fleet size':>10} {'fleet sweep s':>14} {'loop s (extrap.)':>17} {'speedup':>8}")
+    for agent in agents:
+        start = time.perf_counter()
+        resp = client.post(f'/{agent}/fleet_predict')
+        body = resp.get_data()
+        fleet_s = time.perf_counter() - start
+        assert resp.status_code == 200, body[:200]
+        lines = body.splitlines()
+        if not lines:
+            print(f"{agent:<10} {'(empty)':>10}")
+            continue
+
+        user_ids = [json.loads(line)['user_id'] for line in lines[:users]]
+        start = time.perf_counter()
+        for user_id in user_ids:
+            client.post(f'/{agent}/auto_predict', json={'user_id': user_id})
+        loop_s = (time.perf_counter() - start) * len(lines) / len(user_ids)
+        print(f"{agent:<10} {len(lines):>10} {fleet_s:>14.3f} {loop_s:>17.2f} {loop_s / fleet_s:>7.1f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--agents', default='health,safety,reminders')
+    parser.add_argument('--users', type=int, default=500, help="residents to time in the per-user loop")
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore', category=UserWarning)
+    run(args.agents.split(','), args.users)
@@ -0,0 +1,140 @@
+"""90-day vitals chart: the history API against aggregating or shipping raw rows.
+
+Run from the project root (builds its own throwaway SQLite database):
+    python -m benchmarks.bench_history --densities 60,10,1
+
+Loads one synthetic resident per density (a reading every N minutes for
+--days days) through agents/ingest.load_frame, so the rollups are kept
+current the same way as in production. Each density is then charted five
+ways through the Flask test client. The rollup paths should cost about the
+same at every density, while the raw paths grow with the number of readings.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+_db_dir = tempfile.mkdtemp(prefix='bench_history_')
+os.environ['ELDERLY_CARE_DSN'] = f"sqlite:///{os.path.join(_db_dir, 'history.db')}"
+
+from agents import db, ingest, migrate, rollups  # noqa: E402
+from agents.agents import app  # noqa: E402
+from agents.records import health_record  # noqa: E402
+
+START = pd.Timestamp('2025-01-01')
+
+
+def resident_frame(user_id, every_minutes, days, seed=0):
+    rng = np.random.default_rng(seed)
+    timestamps = pd.date_range(START, START + pd.Timedelta(days=days), freq=f'{every_minutes}min', inclusive='left')
+    n = len(timestamps)
+    day = np.sin(np.arange(n) * 2 * np.pi * every_minutes / 1440)
+    heart_rate = (75 + 8 * day + rng.normal(0, 4, n)).round().astype(int)
+    bp_systolic = (125 + 10 * day + rng.normal(0, 6, n)).round(1)
+    glucose = (110 + rng.normal(0, 15, n)).round().astype(int)
+    spo2 = np.clip(97 + rng.normal(0, 1.5, n), 85, 100).round().astype(int)
+    abnormal = (heart_rate > 95) | (bp_systolic > 145) | (spo2 < 92)
+    return pd.DataFrame({
+        'user_id': user_id,
+        'timestamp': timestamps,
+        'heart_rate': heart_rate,
+        'temperature': (36.7 + rng.normal(0, 0.3, n)).round(1),
+        'bp_systolic': bp_systolic,
+        'bp_diastolic': (bp_systolic * 0.65).round(1),
+        'abnormal': abnormal,
+        'hr_alert': heart_rate > 95,
+        'bp_alert': bp_systolic > 145,
+        'glucose_level': glucose,
+        'glucose_alert': glucose > 140,
+        'spo2': spo2,
+        'spo2_alert': spo2 < 92,
+        'alert_triggered': abnormal,
+        'caregiver_notified': abnormal,
+    })
+
+
+def load(frame):
+    # One day per load, as a stream of micro-batches would arrive
+    with db.cursor() as cur:
+        for _, day in frame.groupby(frame['timestamp'].dt.floor('D')):
+            ingest.load_frame(cur, 'health', day)
+
+
+def timed(fn, repeat):
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = fn()
+        samples.append(1000 * (time.perf_counter() - start))
+    return statistics.median(samples), size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--densities', default='60,10,1', help="minutes between readings, one resident each")
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--max-points', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    migrate.upgrade()
+    client = app.test_client()
+    end = START + pd.Timedelta(days=args.days)
+    window = (START.to_pydatetime(), end.to_pydatetime())
+
+    print(f"{'readings':>9} {'path':<40} {'ms':>8} {'KB':>8} {'points':>7}")
+    for every in (int(m) for m in args.densities.split(',')):
+        user_id = f'B{every:04d}'
+        frame = resident_frame(user_id, every, args.days)
+        start = time.perf_counter()
+        load(frame)
+        load_s = time.perf_counter() - start
+
+        def api(query):
+            def call():
+                body = client.get(f"/health/history/{user_id}?start={START.date()}&end={end.date()}&{query}").data
+                return len(body), len(json.loads(body)['series']['heart_rate']['timestamp'])
+            return call
+
+        def raw_group_by():
+            with db.cursor() as cur:
+                cur.execute(f"""
+                    SELECT {rollups.bucket_sql('1h')}, {rollups.aggregate_sql('health')} FROM health_monitoring
+                    WHERE user_id = %s AND timestamp >= %s AND timestamp < %s
+                    GROUP BY {rollups.bucket_sql('1h')} ORDER BY 1;
+                """, (user_id,) + window)
+                rows = cur.fetchall()
+            return len(json.dumps(rows, default=str)), len(rows)
+
+        def raw_rows():
+            with db.cursor() as cur:
+                cur.execute("SELECT * FROM health_monitoring WHERE user_id = %s AND timestamp >= %s "
+                            "AND timestamp < %s ORDER BY timestamp;", (user_id,) + window)
+                rows = [health_record(row) for row in cur.fetchall()]
+            return len(json.dumps(rows, default=str)), len(rows)
+
+        for name, fn in (
+            ('history bucket=1d (rollup)', api('bucket=1d')),
+            ('history bucket=1h (rollup)', api('bucket=1h')),
+            (f'history bucket=1h max_points={args.max_points}', api(f'bucket=1h&max_points={args.max_points}')),
+            ('1h GROUP BY over raw readings', raw_group_by),
+            ('raw readings shipped to the client', raw_rows),
+        ):
+            ms, (size, points) = timed(fn, args.repeat)
+            print(f"{len(frame):>9} {name:<40} {ms:>8.1f} {size / 1024:>8.1f} {points:>7}")
+        print(f"{'':>9} (loaded in {load_s:.1f}s with rollup refresh)")
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    finally:
+        db.close_pool()
+        shutil.rmtree(_db_dir, ignore_errors=True)
@@ -0,0 +1,70 @@
+"""Per-reading insert + auto_predict vs micro-batched /ingest.
+
+Run from the project root (uses its own throwaway SQLite database):
+    python -m benchmarks.bench_ingest --readings 2000 --agent safety
+
+The baseline writes each reading with its own INSERT and then scores it with
+a separate POST /<agent>/auto_predict, as devices do today. The micro-batched
+path POSTs the same readings one at a time to /<agent>/ingest and waits for
+the buffer to drain.
+"""
+import argparse
+import os
+import tempfile
+import time
+import warnings
+
+import pandas as pd
+
+warnings.filterwarnings('ignore', category=UserWarning)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--agent', default='health', choices=['health', 'safety', 'reminders'])
+    parser.add_argument('--readings', type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench_ingest.db')
+    os.environ['ELDERLY_CARE_DSN'] = f"sqlite:///{path}"
+    from agents import db, ingest, migrate, realtime
+    from agents.agents import app
+    migrate.upgrade()
+    client = app.test_client()
+
+    cleaned = pd.read_csv(os.path.join(ingest.CLEANED_DIR, ingest.SOURCES[args.agent]['cleaned']),
+                          nrows=args.readings)
+    readings = cleaned.to_dict(orient='records')
+
+    # Baseline: N single-row writes, then N predict calls
+    start = time.perf_counter()
+    for reading in readings:
+        frame = ingest.to_table_frame(args.agent, realtime.readings_frame(args.agent, reading))
+        with db.cursor() as cur:
+            ingest.load_frame(cur, args.agent, frame)
+        client.post(f"/{args.agent}/auto_predict", json={'user_id': reading['user_id']})
+    baseline = time.perf_counter() - start
+
+    with db.cursor() as cur:
+        cur.execute(f"DELETE FROM {ingest.SOURCES[args.agent]['table']}")
+
+    # Micro-batched: N submissions, flushed by size/time with one predict per flush
+    start = time.perf_counter()
+    for reading in readings:
+        client.post(f"/{args.agent}/ingest", json=reading)
+    batcher = realtime.batcher(args.agent)
+    while batcher.stats()['pending']:
+        time.sleep(0.01)
+    batched = time.perf_counter() - start
+    stats = batcher.stats()
+
+    n = len(readings)
+    print(f"{args.agent}: {n} readings")
+    print(f"  insert + auto_predict per reading: {baseline:.2f}s  ({1e6 * baseline / n:.0f} µs/reading)")
+    print(f"  micro-batched ingest:              {batched:.2f}s  ({1e6 * batched / n:.0f} µs/reading, "
+          f"{stats['flushes']} flushes, last flush {stats['last_flush_ms']:.1f} ms)")
+    print(f"  speed-up: {baseline / batched:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Cost of the request metrics and profiler hooks (agents/metrics.py).
+
+Run from the project root (uses its own throwaway SQLite database):
+    python -m benchmarks.bench_metrics --requests 2000
+
+Drives three Flask routes through the test client with metrics off, with
+metrics on, and with metrics on plus ?profile=1 on every request, in
+interleaved rounds so drift hits every mode alike. Then times the pieces on
+their own: one span, one record_query, the ASGI middleware around an empty
+app, and the /metrics render.
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+import warnings
+
+import pandas as pd
+
+_dir = tempfile.mkdtemp(prefix='bench_metrics_')
+os.environ['ELDERLY_CARE_DSN'] = f"sqlite:///{os.path.join(_dir, 'metrics.db')}"
+os.environ['ELDERLY_CARE_SLOW_QUERY_LOG'] = os.path.join(_dir, 'slow_queries.jsonl')
+
+from agents import db, ingest, metrics, migrate  # noqa: E402
+from agents.features import build_features  # noqa: E402
+
+warnings.filterwarnings('ignore', category=UserWarning)
+
+MODES = (('off', False, False), ('on', True, False), ('on + profile', True, True))
+
+
+def setup(rows):
+    migrate.upgrade()
+    cleaned = pd.concat(ingest.read_clean_chunks('health'), ignore_index=True).dropna(subset=['timestamp']).head(rows)
+    with db.cursor() as cur:
+        ingest.load_frame(cur, 'health', ingest.to_table_frame('health', cleaned))
+    return cleaned
+
+
+def per_call_us(fn, count):
+    start = time.perf_counter()
+    for i in range(count):
+        fn(i)
+    return 1e6 * (time.perf_counter() - start) / count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000, help="requests per route and mode")
+    parser.add_argument('--rounds', type=int, default=4)
+    parser.add_argument('--rows', type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    cleaned = setup(args.rows)
+    users = cleaned['user_id'].unique().tolist()
+    records = build_features('health', cleaned.head(500)).to_dict(orient='records')
+
+    from agents import asgi
+    from agents.agents import app
+    client = app.test_client()
+    routes = {
+        'POST /health/predict': lambda i, q: client.post(f"/health/predict{q}", json=records[i % len(records)]),
+        'GET /health/user/<id>': lambda i, q: client.get(f"/health/user/{users[i % len(users)]}{q}"),
+        'GET /health/history/<id>': lambda i, q: client.get(f"/health/history/{users[i % len(users)]}{q}"),
+    }
+    per_round = max(1, args.requests // args.rounds)
+    results = {(route, mode): 0.0 for route in routes for mode, _, _ in MODES}
+    for fn in routes.values():
+        for i in range(50):
+            fn(i, '')
+    for _ in range(args.rounds):
+        for route, fn in routes.items():
+            for mode, enabled, profiled in MODES:
+                metrics.ENABLED, metrics.PROFILING = enabled, profiled
+                query = '?profile=1' if profiled else ''
+                results[route, mode] += per_call_us(lambda i: fn(i, query), per_round) / args.rounds
+    metrics.ENABLED, metrics.PROFILING = True, False
+
+    print(f"{'route':<26} {'off':>8} {'on':>8} {'on + profile':>13}  (µs/request through the Flask test client)")
+    for route in routes:
+        off, on, profiled = (results[route, mode] for mode, _, _ in MODES)
+        print(f"{route:<26} {off:>8.0f} {on:>8.0f} {profiled:>13.0f}   metrics +{on - off:.0f} µs ({100 * (on - off) / off:+.1f}%)")
+
+    def one_span(i):
+        with metrics.span('sql'):
+            pass
+
+    span_us = per_call_us(one_span, 100000)
+    query_us = per_call_us(lambda i: metrics.record_query("SELECT * FROM health_monitoring WHERE user_id = %s", ('D1000',), 0.001), 100000)
+
+    endpoint = next(route.endpoint for route in asgi.routes if route.path == '/health/history/{user_id}')
+
+    async def empty(scope, receive, send):
+        scope['endpoint'] = endpoint
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def discard(message):
+        pass
+
+    def scope(i):
+        return {'type': 'http', 'method': 'GET', 'path': f"/health/history/{users[i % len(users)]}",
+                'root_path': '', 'query_string': b'', 'headers': []}
+
+    middleware = metrics.ASGIMiddleware(empty, asgi._route_of)
+    loop = asyncio.new_event_loop()
+    bare_us = per_call_us(lambda i: loop.run_until_complete(empty(scope(i), None, discard)), 20000)
+    wrapped_us = per_call_us(lambda i: loop.run_until_complete(middleware(scope(i), None, discard)), 20000)
+    loop.close()
+    render_us = per_call_us(lambda i: metrics.render(pool=db.pool_stats()), 200)
+    series = metrics.render().count('_count{')
+    print(f"one span {span_us:.2f} µs; one record_query {query_us:.2f} µs; "
+          f"ASGI middleware +{wrapped_us - bare_us:.1f} µs per request; "
+          f"/metrics render {render_us / 1000:.2f} ms for {series} histograms")
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    finally:
+        db.close_pool()
+        shutil.rmtree(_dir, ignore_errors=True)
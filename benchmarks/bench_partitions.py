@@ -0,0 +1,175 @@
+"""Hot-path latency as history grows, with and without the retention job (agents/partitions.py).
+
+Run from the project root (builds two throwaway SQLite databases):
+    python -m benchmarks.bench_partitions --users 50 --steps 1,4,16,64
+
+Both databases receive the same synthetic health readings (one per resident
+every --every minutes), a month at a time, until they hold each step's number
+of months. One keeps everything in the table; the other runs the retention
+job after each step, keeping the last --hot-months months and archiving the
+rest to Parquet. At every step the queries behind the latest-reading routes
+are timed against both, then the archived data is read back the way the
+history API and the combined API do.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+_dir = tempfile.mkdtemp(prefix='bench_partitions_')
+os.environ['ELDERLY_CARE_DSN'] = f"sqlite:///{os.path.join(_dir, 'retained.db')}"
+os.environ['ELDERLY_CARE_ARCHIVE_DIR'] = os.path.join(_dir, 'archive')
+
+from agents import db, fleet, history, migrate, partitions, summary  # noqa: E402
+
+warnings.filterwarnings('ignore', category=UserWarning)
+
+FIRST_MONTH = pd.Timestamp('2020-01-01')
+COLUMNS = list(partitions.COLUMNS['health'])
+
+
+def month_rows(month, users, every, rng):
+    # One month of readings for every resident, as tuples in COLUMNS order
+    times = pd.date_range(month, month + pd.DateOffset(months=1), freq=f'{every}min', inclusive='left')
+    n = len(times) * len(users)
+    heart_rate = rng.normal(78, 9, n).round().astype(int)
+    bp_systolic = rng.normal(125, 10, n).round(1)
+    glucose = rng.normal(110, 15, n).round().astype(int)
+    spo2 = np.clip(rng.normal(97, 1.5, n), 85, 100).round().astype(int)
+    abnormal = (heart_rate > 95) | (bp_systolic > 145) | (spo2 < 92)
+    frame = pd.DataFrame({
+        'user_id': np.repeat(users, len(times)),
+        'timestamp': np.tile(times.strftime('%Y-%m-%d %H:%M:%S'), len(users)),
+        'heart_rate': heart_rate, 'temperature': rng.normal(36.7, 0.3, n).round(1),
+        'bp_systolic': bp_systolic, 'bp_diastolic': (bp_systolic * 0.65).round(1), 'abnormal': abnormal,
+        'hr_alert': heart_rate > 95, 'bp_alert': bp_systolic > 145, 'glucose_level': glucose,
+        'glucose_alert': glucose > 140, 'spo2': spo2, 'spo2_alert': spo2 < 92,
+        'alert_triggered': abnormal, 'caregiver_notified': False,
+    })
+    return list(frame[COLUMNS].astype(object).itertuples(index=False, name=None))
+
+
+def create_schema(conn):
+    cur = conn.cursor()
+    for _, _, path in migrate.discover('sqlite'):
+        with open(path, encoding='utf-8') as f:
+            for statement in migrate.split_statements(f.read()):
+                cur.execute(statement)
+    conn.commit()
+
+
+def insert(conn, rows):
+    cur = conn.cursor()
+    cur.executemany(f"INSERT INTO health_monitoring ({', '.join(COLUMNS)}) "
+                    f"VALUES ({', '.join(['%s'] * len(COLUMNS))});", rows)
+    conn.commit()
+
+
+def timed_us(fn, repeat):
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(1e6 * (time.perf_counter() - start))
+    return statistics.median(samples)
+
+
+def hot_queries(user_id):
+    return [
+        ('latest 10 (GET /health)', "SELECT * FROM health_monitoring ORDER BY timestamp DESC LIMIT 10;", ()),
+        ('user latest (auto_predict)', fleet.user_latest_query('health'), (user_id,)),
+        ('user newest (history ETag)', history.newest_query('health'), (user_id, user_id)),
+        ('user summary', summary.summary_query(1), (user_id,)),
+        ('fleet latest (all residents)', fleet.fleet_latest_query('health'), ()),
+    ]
+
+
+def query_us(conn, query, params, repeat):
+    cur = conn.cursor()
+
+    def run():
+        cur.execute(query, params)
+        cur.fetchall()
+    return timed_us(run, repeat)
+
+
+def size_mb(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path) / 1e6
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names) / 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--every', type=int, default=60, help="minutes between a resident's readings")
+    parser.add_argument('--steps', default='1,4,16,64', help="months of history held at each step")
+    parser.add_argument('--hot-months', type=int, default=2, help="months the retention job keeps in the table")
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args(argv)
+
+    migrate.upgrade()
+    unbounded_path = os.path.join(_dir, 'unbounded.db')
+    unbounded = db.connect(f"sqlite:///{unbounded_path}")
+    create_schema(unbounded)
+    retained = db.connect(os.environ['ELDERLY_CARE_DSN'])
+    users = [f'P{i:05d}' for i in range(args.users)]
+    rng = np.random.default_rng(0)
+    loaded = 0
+    total_rows = 0
+
+    print(f"{args.users} residents, a reading every {args.every} min; retention keeps {args.hot_months} month(s) hot")
+    for months in (int(step) for step in args.steps.split(',')):
+        while loaded < months:
+            rows = month_rows(FIRST_MONTH + pd.DateOffset(months=loaded), users, args.every, rng)
+            insert(unbounded, rows)
+            insert(retained, rows)
+            total_rows += len(rows)
+            loaded += 1
+        first_hot = (FIRST_MONTH + pd.DateOffset(months=max(0, loaded - args.hot_months))).to_pydatetime()
+        start = time.perf_counter()
+        archived = sum(rows for _, rows in partitions.archive('health', first_hot))
+        archive_s = time.perf_counter() - start
+        with db.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM health_monitoring;")
+            hot_rows = cur.fetchone()[0]
+
+        print(f"\n{months} month(s): {total_rows:,} readings, {hot_rows:,} hot after retention "
+              f"(archived {archived:,} in {archive_s:.1f}s; unbounded db {size_mb(unbounded_path):.0f} MB, "
+              f"archive {size_mb(partitions.ARCHIVE_DIR):.1f} MB)")
+        print(f"  {'query':<30} {'unbounded µs':>13} {'retained µs':>12}")
+        for name, query, params in hot_queries(users[len(users) // 2]):
+            repeat = max(3, args.repeat // 10) if 'fleet' in name else args.repeat
+            print(f"  {name:<30} {query_us(unbounded, query, params, repeat):>13,.0f} "
+                  f"{query_us(retained, query, params, repeat):>12,.0f}")
+
+        # The same reads through the history and paging code, hot day vs archived day
+        hot_day = pd.Timestamp(first_hot) + pd.Timedelta(days=3)
+        old_day = FIRST_MONTH + pd.Timedelta(days=3)
+        for label, day in (('hot', hot_day), ('archived' if loaded > args.hot_months else 'hot', old_day)):
+            options = {'start': day.isoformat(), 'end': (day + pd.Timedelta(days=1)).isoformat(), 'bucket': '1m'}
+            us = timed_us(lambda: history.fetch_history('health', users[0], options), max(3, args.repeat // 5))
+            print(f"  {f'history 1m, {label} day ({day:%Y-%m-%d})':<44} {us / 1000:>8.1f} ms")
+        if partitions.archived_months('health'):
+            select = ['user_id', 'timestamp', 'heart_rate']
+            us = timed_us(lambda: list(zip(range(1000), partitions.archive_rows('health', select))), 5)
+            print(f"  {'first 1,000 archived rows in paging order':<44} {us / 1000:>8.1f} ms")
+
+    unbounded.close()
+    retained.close()
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    finally:
+        db.close_pool()
+        shutil.rmtree(_dir, ignore_errors=True)
@@ -0,0 +1,196 @@
+"""Simulated-clock run of the reminder scheduler (agents/reminders.py).
+
+Run from the project root:
+    python -m benchmarks.bench_reminders --schedules 1000000 --days 2
+    python -m benchmarks.bench_reminders --schedules 100000 --write-sample 50000   # and time the reminder_sent upserts
+
+Builds --schedules daily schedules (4 reminder types per synthetic resident,
+schedule times drawn from Dataset/daily_reminder.csv), loads them into one
+scheduler and steps a simulated clock from one due second to the next for
+--days days. The clock jumps, so each reminder's firing skew is the real
+time between the start of its tick and its batch reaching the sink. Between
+ticks, --changes schedule changes arrive in flush-sized frames. The firing
+run keeps reminder_sent in memory only; --write-sample times the writer's
+bulk upserts into a throwaway SQLite database against one UPDATE per
+reminder.
+"""
+import argparse
+import os
+import resource
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+_dir = tempfile.mkdtemp(prefix='bench_reminders_')
+os.environ['ELDERLY_CARE_DSN'] = f"sqlite:///{os.path.join(_dir, 'reminders.db')}"
+
+from agents import db, ingest, migrate, reminders  # noqa: E402
+from agents.features import REMINDER_TYPES  # noqa: E402
+
+START = pd.Timestamp('2025-02-03')
+STRIDE = 7919
+
+
+class CountingSink:
+    # Records when each batch arrives so skew can be measured per reminder
+    def __init__(self):
+        self.count = 0
+        self.batches = []
+
+    def deliver(self, reminders):
+        self.count += len(reminders)
+        self.batches.append((time.perf_counter(), len(reminders)))
+
+
+def schedules(count, seed=0):
+    times = pd.concat(ingest.read_clean_chunks('reminders'), ignore_index=True)['schedule_time'].to_numpy()
+    residents = -(-count // len(REMINDER_TYPES))
+    user = np.repeat(np.arange(residents), len(REMINDER_TYPES))[:count]
+    kind = np.tile(np.arange(len(REMINDER_TYPES)), residents)[:count]
+    return pd.DataFrame({
+        'user_id': pd.Series(user).map('R{:07d}'.format),
+        'timestamp': START + pd.to_timedelta(kind, unit='s'),
+        'reminder_type': np.array(REMINDER_TYPES)[kind],
+        'schedule_time': times[(np.arange(count) * STRIDE + seed) % len(times)],
+        'reminder_sent': False,
+        'acknowledged': False,
+    })
+
+
+def run(scheduler, sink, days, changes, change_frame, seed=0):
+    # Step the simulated clock through every due second; apply schedule changes between ticks
+    rng = np.random.default_rng(seed)
+    end = int((START + pd.Timedelta(days=days) - reminders.EPOCH).total_seconds())
+    users = scheduler.users
+    times = pd.Series(pd.to_timedelta(np.arange(6 * 2, 22 * 2 + 1) * 1800, unit='s')).astype(str).str[-8:].tolist()
+    ticks, skews, change_seconds = [], [], 0.0
+    sent_changes = 0
+    while True:
+        now = scheduler.next_due()
+        if now is None or now >= end:
+            break
+        scheduler.clock = lambda: now
+        sink.batches.clear()
+        start = time.perf_counter()
+        fired = scheduler.fire(now)
+        ticks.append((time.perf_counter() - start, fired))
+        for arrived, size in sink.batches:
+            skews.append((arrived - start, size))
+        if sent_changes < changes:
+            # A frame of residents moving one reminder to another half hour from today on
+            slots = rng.integers(0, len(users), change_frame)
+            frame = pd.DataFrame({
+                'user_id': [users[s] for s in slots],
+                'timestamp': pd.Timestamp(reminders._format(now)),
+                'reminder_type': [REMINDER_TYPES[scheduler.kind[s]] for s in slots],
+                'schedule_time': [times[i] for i in rng.integers(0, len(times), change_frame)],
+                'reminder_sent': False,
+            })
+            start = time.perf_counter()
+            scheduler.schedule(frame)
+            change_seconds += time.perf_counter() - start
+            sent_changes += change_frame
+    return ticks, skews, sent_changes, change_seconds
+
+
+def write_sample(count):
+    # reminder_sent for count fired reminders: the writer's bulk upserts vs one UPDATE each
+    migrate.upgrade()
+    frame = schedules(count, seed=1)
+    with db.cursor() as cur:
+        ingest.load_frame(cur, 'reminders', ingest.to_table_frame('reminders', frame))
+    # Fire day one (marks the pending rows) and day two (adds a sent row each)
+    fired = []
+    sink = CountingSink()
+    sink.deliver = fired.extend
+    scheduler = reminders.ReminderScheduler(sink=sink, grace=2 * reminders.DAY)
+    scheduler.schedule(frame)
+    day = int((START - reminders.EPOCH).total_seconds())
+    scheduler.fire(day + reminders.DAY - 1)
+    scheduler.fire(day + 2 * reminders.DAY - 1)
+    marked, added = fired[:count], fired[count:]
+    start = time.perf_counter()
+    for i in range(0, len(fired), reminders.WRITE_BATCH):
+        scheduler._write(fired[i:i + reminders.WRITE_BATCH])
+    bulk = time.perf_counter() - start
+    # The same upserts again without the rollup refresh load_frame also does
+    table_df = ingest.to_table_frame('reminders', pd.DataFrame(fired).assign(
+        timestamp=lambda df: pd.to_datetime(df['timestamp']), reminder_sent=True, acknowledged=False)[frame.columns])
+    start = time.perf_counter()
+    with db.cursor() as cur:
+        for i in range(0, len(table_df), reminders.WRITE_BATCH):
+            ingest._executemany_upsert(cur, 'daily_reminder', table_df.iloc[i:i + reminders.WRITE_BATCH])
+    upsert = time.perf_counter() - start
+    sample = added[:5000]
+    start = time.perf_counter()
+    with db.cursor() as cur:
+        for r in sample:
+            cur.execute("UPDATE daily_reminder SET reminder_sent = TRUE WHERE user_id = %s AND timestamp = %s;",
+                        (r['user_id'], r['timestamp']))
+    single = time.perf_counter() - start
+    with db.cursor() as cur:
+        cur.execute("SELECT COUNT(*) FROM daily_reminder WHERE reminder_sent;")
+        stored = cur.fetchone()[0]
+    rows = len(marked) + len(added)
+    print(f"reminder_sent for {len(marked)} pending rows and {len(added)} next-day rows: "
+          f"writer {rows / bulk:,.0f} rows/s with rollups, {rows / upsert:,.0f} rows/s for the upserts alone; "
+          f"one UPDATE per reminder {len(sample) / single:,.0f} rows/s; {stored} rows sent")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--schedules', type=int, default=1000000)
+    parser.add_argument('--days', type=int, default=2)
+    parser.add_argument('--batch', type=int, default=reminders.BATCH_SIZE)
+    parser.add_argument('--changes', type=int, default=100000, help="schedule changes applied during the run")
+    parser.add_argument('--change-frame', type=int, default=500, help="changes per frame (one ingestion flush)")
+    parser.add_argument('--write-sample', type=int, default=0, help="also time reminder_sent upserts for this many")
+    args = parser.parse_args(argv)
+
+    frame = schedules(args.schedules)
+    sink = CountingSink()
+    scheduler = reminders.ReminderScheduler(sink=sink, batch_size=args.batch, store=False)
+    scheduler._risks()
+    start = time.perf_counter()
+    scheduler.schedule(frame)
+    load = time.perf_counter() - start
+    memory = scheduler.memory_bytes()
+    print(f"loaded {len(scheduler.users):,} schedules in {load:.2f}s; "
+          f"{memory / 2**20:.0f} MB of scheduler state ({memory / len(scheduler.users):.0f} bytes per schedule)")
+
+    ticks, skews, changes, change_seconds = run(scheduler, sink, args.days, args.changes, args.change_frame)
+    fire_seconds = sum(seconds for seconds, _ in ticks)
+    sizes = np.array([size for _, size in skews])
+    values = np.repeat([skew for skew, _ in skews], sizes)
+    p50, p99 = np.percentile(values, [50, 99]) if len(values) else (0.0, 0.0)
+    busiest = max(ticks, key=lambda t: t[1])
+    print(f"fired {sink.count:,} reminders over {args.days} simulated days in {len(ticks)} ticks, "
+          f"{fire_seconds:.2f}s of firing ({sink.count / fire_seconds:,.0f} reminders/s); missed {scheduler.missed}")
+    print(f"firing skew: p50 {1000 * p50:.0f} ms, p99 {1000 * p99:.0f} ms, max {1000 * values.max():.0f} ms; "
+          f"busiest tick {busiest[1]:,} reminders in {1000 * busiest[0]:.0f} ms")
+    print(f"{changes:,} schedule changes in frames of {args.change_frame}: "
+          f"{1e6 * change_seconds / max(changes, 1):.1f} us per change, {scheduler.rescheduled:,} rescheduled")
+
+    # What polling every second would cost instead: one scan of every next-fire time per second
+    due = np.frombuffer(scheduler.due, dtype=np.int64)
+    start = time.perf_counter()
+    for _ in range(20):
+        np.flatnonzero(due <= due.min())
+    scan = (time.perf_counter() - start) / 20
+    print(f"polling instead: {1000 * scan:.2f} ms per scan of {len(due):,} schedules, "
+          f"{86400 * scan:.0f}s of CPU per day at one scan per second (firing took {fire_seconds / args.days:.1f}s per day)")
+    print(f"peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+    if args.write_sample:
+        write_sample(args.write_sample)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    finally:
+        db.close_pool()
+        shutil.rmtree(_dir, ignore_errors=True)
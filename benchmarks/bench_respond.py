@@ -0,0 +1,144 @@
+"""Read endpoints: JSON encoding, conditional GET and compression (agents/respond.py).
+
+Run from the project root (uses its own throwaway SQLite database):
+    python -m benchmarks.bench_respond --requests 300
+
+Loads cleaned_data plus one resident with a reading every 10 minutes for 90
+days, then:
+- encodes each route's response body with the stdlib json module (a
+  default= hook for datetimes, as api/combined_api.py had) and with the
+  encoder the routes use now;
+- drives the routes through the Flask test clients as a dashboard would:
+  no compression, gzip, zstd (when zstandard is installed), and a repeat
+  poll sending the ETag back. CPU is process time per request (server and
+  test client share the process); bytes are the body on the wire.
+"""
+import argparse
+import datetime
+import decimal
+import json
+import os
+import shutil
+import tempfile
+import time
+import warnings
+
+import pandas as pd
+
+_dir = tempfile.mkdtemp(prefix='bench_respond_')
+os.environ['ELDERLY_CARE_DSN'] = f"sqlite:///{os.path.join(_dir, 'respond.db')}"
+
+from agents import db, history, ingest, migrate, respond, summary  # noqa: E402
+
+warnings.filterwarnings('ignore', category=UserWarning)
+
+RESIDENT = 'R0000001'
+
+
+def setup():
+    migrate.upgrade()
+    frames = {agent: pd.concat(ingest.read_clean_chunks(agent), ignore_index=True).dropna(subset=['timestamp'])
+              for agent in ('health', 'safety', 'reminders')}
+    # A dense resident for the history chart: 90 days at one reading per 10 minutes
+    dense = frames['health'].sample(90 * 144, replace=True, random_state=0).reset_index(drop=True)
+    dense['user_id'] = RESIDENT
+    dense['timestamp'] = pd.date_range('2025-01-01', periods=len(dense), freq='10min')
+    frames['health'] = pd.concat([frames['health'], dense], ignore_index=True)
+    with db.cursor() as cur:
+        for agent, frame in frames.items():
+            ingest.load_frame(cur, agent, ingest.to_table_frame(agent, frame))
+
+
+# ========================
+# 🧾 ENCODERS
+# ========================
+def _old_default(value):
+    # api/combined_api.py's to_json before this change
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep=' ')
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    raise TypeError(type(value).__name__)
+
+
+def stdlib_dumps(obj):
+    # jsonify's settings (sorted, compact, trailing newline) on the stdlib encoder
+    return (json.dumps(obj, default=_old_default, sort_keys=True, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+def per_call(fn, count):
+    wall, cpu = time.perf_counter(), time.process_time()
+    for _ in range(count):
+        fn()
+    return 1e6 * (time.perf_counter() - wall) / count, 1e6 * (time.process_time() - cpu) / count
+
+
+def bodies(user_id):
+    # The objects each route serializes, built once from the database
+    with db.cursor() as cur:
+        cur.execute("SELECT * FROM health_monitoring ORDER BY timestamp DESC LIMIT 10;")
+        latest = [dict(zip([d[0] for d in cur.description][:7], row[:7])) for row in cur.fetchall()]
+        cur.execute("SELECT * FROM health_monitoring ORDER BY timestamp, user_id LIMIT 5000;")
+        columns = [d[0] for d in cur.description]
+        page = {'health_monitoring': [dict(zip(columns, row)) for row in cur.fetchall()], 'next': None}
+    return {
+        'GET /health (10 rows)': {'health_monitoring': latest},
+        'GET /user/<id>/summary': summary.fetch_summaries([user_id])[0],
+        'GET /health/history (90d, 1h)': history.fetch_history('health', RESIDENT, {'days': '90', 'bucket': '1h'}),
+        'table page (5000 rows)': page,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=300, help="requests per route and mode")
+    args = parser.parse_args(argv)
+
+    setup()
+    user_id = 'D1000'
+    print(f"encoder: {'orjson ' + respond.orjson.__version__ if respond.orjson else 'stdlib json (orjson not installed)'}")
+    print(f"{'body':<30} {'stdlib µs':>10} {'now µs':>8} {'speed-up':>9} {'bytes':>11}")
+    for name, obj in bodies(user_id).items():
+        count = max(20, args.requests)
+        before, _ = per_call(lambda: stdlib_dumps(obj), count)
+        now, _ = per_call(lambda: respond.dumps(obj, newline=True), count)
+        print(f"{name:<30} {before:>10,.0f} {now:>8,.0f} {before / now:>8.1f}x {len(respond.dumps(obj)):>11,}")
+
+    from agents.agents import app
+    from api.combined_api import app as tables_app
+    agent_client, table_client = app.test_client(), tables_app.test_client()
+    routes = [
+        ('GET /health/user/<id>', agent_client, f"/health/user/{user_id}"),
+        ('GET /user/<id>/summary', agent_client, f"/user/{user_id}/summary"),
+        ('GET /health/history/<id>', agent_client, f"/health/history/{RESIDENT}?days=90&bucket=1h"),
+        ('GET /health?limit=5000', table_client, "/health?limit=5000"),
+        ('GET /health?format=ndjson', table_client, "/health?format=ndjson"),
+    ]
+    modes = [('identity', {}), ('gzip', {'Accept-Encoding': 'gzip'})]
+    if respond.zstandard is not None:
+        modes.append(('zstd', {'Accept-Encoding': 'zstd'}))
+
+    print(f"\n{'route':<26} {'mode':<10} {'CPU µs/req':>11} {'wall µs/req':>12} {'bytes':>11}")
+    for name, client, url in routes:
+        # Table streams are large; fewer requests keep the run short
+        count = max(5, args.requests // (20 if 'ndjson' in url or 'limit' in url else 1))
+        for mode, headers in modes:
+            size = len(client.get(url, headers=headers).data)
+            wall, cpu = per_call(lambda: client.get(url, headers=headers).data, count)
+            print(f"{name:<26} {mode:<10} {cpu:>11,.0f} {wall:>12,.0f} {size:>11,}")
+        tag = client.get(url).headers['ETag']
+        headers = {'If-None-Match': tag, 'Accept-Encoding': 'gzip'}
+        response = client.get(url, headers=headers)
+        assert response.status_code == 304, response.status_code
+        wall, cpu = per_call(lambda: client.get(url, headers=headers).data, max(20, args.requests))
+        print(f"{name:<26} {'304':<10} {cpu:>11,.0f} {wall:>12,.0f} {len(response.data):>11,}")
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    finally:
+        db.close_pool()
+        shutil.rmtree(_dir, ignore_errors=True)
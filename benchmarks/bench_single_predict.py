@@ -0,0 +1,61 @@
+"""Single-record inference: DataFrame + sklearn vs the compiled fast path.
+
+Run from the project root:
+    python -m benchmarks.bench_single_predict --records 2000
+
+Times the model call alone (what the predict routes did before vs
+scoring.predict_record now) and the full POST /<agent>/predict round trip
+through the Flask test client.
+"""
+import argparse
+import os
+import time
+import warnings
+
+import pandas as pd
+
+from agents import ingest, scoring
+from agents.features import build_features
+from agents.registry import registry
+
+warnings.filterwarnings('ignore', category=UserWarning)
+
+
+def per_call_us(fn, records):
+    start = time.perf_counter()
+    for rec in records:
+        fn(rec)
+    return 1e6 * (time.perf_counter() - start) / len(records)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    from agents.agents import app
+    client = app.test_client()
+
+    print(f"{'agent':<10} {'DataFrame+sklearn':>18} {'compiled':>10} {'speed-up':>9} {'route before':>13} {'route now':>10}  (µs/record)")
+    for agent, label in (('health', 'abnormal_prediction'), ('safety', 'unsafe_prediction'),
+                         ('reminders', 'acknowledged_prediction')):
+        cleaned = pd.read_csv(os.path.join(ingest.CLEANED_DIR, ingest.SOURCES[agent]['cleaned']), nrows=args.records)
+        records = build_features(agent, cleaned).to_dict(orient='records')
+        model = registry.get(agent)
+
+        def sklearn_path(rec):
+            return int(model.predict(scoring.model_inputs(model, pd.DataFrame([rec])))[0])
+
+        def compiled_path(rec):
+            return scoring.predict_record(agent, rec)
+
+        before = per_call_us(sklearn_path, records)
+        after = per_call_us(compiled_path, records)
+        route_now = per_call_us(lambda rec: client.post(f"/{agent}/predict", json=rec), records[:500])
+        # The route minus the compiled call plus the old model call
+        route_before = route_now - after + before
+        print(f"{agent:<10} {before:>18.1f} {after:>10.1f} {before / after:>8.0f}x {route_before:>13.0f} {route_now:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
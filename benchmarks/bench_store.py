@@ -0,0 +1,124 @@
+"""Cleaned-data load time and memory: pd.read_csv vs the Parquet store.
+
+Run from the project root (writes scaled copies to a temp directory):
+    python -m benchmarks.bench_store --scales 1,10,100 --agent health
+
+Scaling works as in benchmarks/loadtest.py: replica k repeats every cleaned
+reading shifted k*30 days later, so each resident's history grows. Every
+scale is written as one CSV and as a Parquet store (agents/store.py). Each
+read then runs in a fresh process, so its memory is its own. "RSS +MB" is
+the resident memory the loaded frame holds on to, and "peak +MB" is how far
+the load pushed peak memory past what the imports alone needed.
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from agents import ingest, store
+
+DAYS_PER_REPLICA = 30
+
+
+def write_scaled(agent, scale, directory):
+    cleaned = pd.read_csv(os.path.join(ingest.CLEANED_DIR, ingest.SOURCES[agent]['cleaned']),
+                          parse_dates=['timestamp'])
+    csv_path = os.path.join(directory, ingest.SOURCES[agent]['cleaned'])
+    writer = store.MonthlyWriter(agent, os.path.join(directory, 'parquet'))
+    for replica in range(scale):
+        shifted = cleaned.copy()
+        shifted['timestamp'] = shifted['timestamp'] + pd.Timedelta(days=DAYS_PER_REPLICA * replica)
+        shifted.to_csv(csv_path, mode='w' if replica == 0 else 'a', header=(replica == 0), index=False)
+        writer.add(shifted)
+    return csv_path, writer.close()
+
+
+def cases(agent, csv_path, root, user_id, month_start):
+    # name -> zero-argument loader; each runs in its own process
+    projection = ['user_id', 'timestamp', list(store.COLUMNS[agent])[2]]
+    month_end = month_start + pd.offsets.MonthBegin(1)
+    return {
+        'csv full': lambda: pd.read_csv(csv_path, parse_dates=['timestamp']),
+        'parquet full': lambda: store.load(agent, root=root),
+        'csv 3 columns': lambda: pd.read_csv(csv_path, usecols=projection, parse_dates=['timestamp']),
+        'parquet 3 columns': lambda: store.load(agent, columns=projection, root=root),
+        'csv one resident': lambda: (lambda df: df[df['user_id'] == user_id])(
+            pd.read_csv(csv_path, parse_dates=['timestamp'])),
+        'parquet one resident': lambda: store.load(agent, user_ids=[user_id], root=root),
+        'csv one month': lambda: (lambda df: df[(df['timestamp'] >= month_start) & (df['timestamp'] < month_end)])(
+            pd.read_csv(csv_path, parse_dates=['timestamp'])),
+        'parquet one month': lambda: store.load(agent, start=month_start, end=month_end, root=root),
+    }
+
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+
+def measure(args):
+    # Child process: one load, reported as JSON on stdout
+    csv_path = os.path.join(args.dir, ingest.SOURCES[args.agent]['cleaned'])
+    loader = cases(args.agent, csv_path, os.path.join(args.dir, 'parquet'), args.user,
+                   pd.Timestamp(args.month))[args.measure]
+    rss, peak = rss_mb(), resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    df = loader()
+    seconds = time.perf_counter() - start
+    print(json.dumps({'seconds': seconds, 'rss_mb': rss_mb() - rss, 'rows': len(df),
+                      'peak_mb': (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - peak) / 1024}))
+
+
+def du(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', default='1,10,100')
+    parser.add_argument('--agent', default='health', choices=list(ingest.SOURCES))
+    parser.add_argument('--user', default='D1000')
+    parser.add_argument('--month', default='2025-01-01', help="first day of the month read by the month cases")
+    parser.add_argument('--measure', help=argparse.SUPPRESS)
+    parser.add_argument('--dir', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.measure:
+        return measure(args)
+    if not store.available():
+        sys.exit("❌ pyarrow is not installed (pip install pyarrow)")
+
+    directory = tempfile.mkdtemp(prefix='bench_store_')
+    try:
+        print(f"{'scale':>5} {'rows':>9} {'path':<22} {'ms':>9} {'RSS +MB':>8} {'peak +MB':>9} {'rows out':>9}")
+        for scale in (int(s) for s in args.scales.split(',')):
+            shutil.rmtree(directory)
+            os.makedirs(directory)
+            start = time.perf_counter()
+            csv_path, rows = write_scaled(args.agent, scale, directory)
+            written = time.perf_counter() - start
+            for name in cases(args.agent, csv_path, '', args.user, pd.Timestamp(args.month)):
+                out = subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.bench_store', '--measure', name, '--dir', directory,
+                     '--agent', args.agent, '--user', args.user, '--month', args.month],
+                    check=True, capture_output=True, text=True)
+                result = json.loads(out.stdout.strip().splitlines()[-1])
+                print(f"{scale:>5} {rows:>9} {name:<22} {1000 * result['seconds']:>9.1f} "
+                      f"{result['rss_mb']:>8.1f} {result['peak_mb']:>9.1f} {result['rows']:>9}")
+            print(f"{'':>5} on disk: CSV {du(csv_path) / 2**20:.1f} MB, "
+                  f"Parquet {du(os.path.join(directory, 'parquet')) / 2**20:.1f} MB (written in {written:.1f}s)")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
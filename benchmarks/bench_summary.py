@@ -0,0 +1,89 @@
+"""Per-resident dashboard load: three /<agent>/user/<id> calls vs one summary.
+
+Run from the project root against a seeded database (see benchmarks/loadtest.py):
+    ELDERLY_CARE_DSN=sqlite:///loadtest.db python -m benchmarks.bench_summary --users 200
+
+The latest-reading cache is switched off so every request reaches the
+database. Each path is timed through the Flask test client; database queries
+are counted from the pool metrics. Over real HTTP each saved call also saves
+a network round trip, which this in-process timing does not include.
+"""
+import argparse
+import os
+import time
+
+os.environ['ELDERLY_CARE_CACHE_SIZE'] = '0'
+
+from agents import db  # noqa: E402
+from agents.agents import app  # noqa: E402
+
+
+def run(fn, user_ids):
+    queries = db.get_pool().metrics.query.count
+    start = time.perf_counter()
+    calls = 0
+    for user_id in user_ids:
+        calls += fn(user_id)
+    elapsed = time.perf_counter() - start
+    return {
+        'ms_per_user': 1000 * elapsed / len(user_ids),
+        'http_calls': calls / len(user_ids),
+        'db_queries': (db.get_pool().metrics.query.count - queries) / len(user_ids),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    client = app.test_client()
+    with db.cursor() as cur:
+        cur.execute("SELECT user_id FROM users ORDER BY user_id LIMIT %s;", (args.users,))
+        user_ids = [row[0] for row in cur.fetchall()]
+
+    def separate(user_id):
+        for agent in ('health', 'safety', 'reminders'):
+            client.get(f"/{agent}/user/{user_id}")
+        return 3
+
+    def separate_with_predictions(user_id):
+        for agent in ('health', 'safety', 'reminders'):
+            client.get(f"/{agent}/user/{user_id}")
+            client.post(f"/{agent}/auto_predict", json={'user_id': user_id})
+        return 6
+
+    def combined(user_id):
+        client.get(f"/user/{user_id}/summary")
+        return 1
+
+    def combined_with_predictions(user_id):
+        client.get(f"/user/{user_id}/summary?predict=1")
+        return 1
+
+    def bulk(chunk):
+        client.post("/users/summary", json={'user_ids': chunk, 'predict': True})
+        return 1
+
+    separate(user_ids[0])   # warm the models and the pool
+    combined_with_predictions(user_ids[0])
+
+    print(f"{len(user_ids)} residents")
+    print(f"{'path':<34} {'ms/user':>8} {'HTTP calls':>11} {'DB queries':>11}")
+    for name, fn, ids in (
+        ('3 x /<agent>/user/<id>', separate, user_ids),
+        ('/user/<id>/summary', combined, user_ids),
+        ('3 x user + 3 x auto_predict', separate_with_predictions, user_ids),
+        ('/user/<id>/summary?predict=1', combined_with_predictions, user_ids),
+    ):
+        result = run(fn, ids)
+        print(f"{name:<34} {result['ms_per_user']:>8.2f} {result['http_calls']:>11.1f} {result['db_queries']:>11.1f}")
+
+    chunks = [user_ids[i:i + 100] for i in range(0, len(user_ids), 100)]
+    result = run(bulk, chunks)
+    print(f"{'/users/summary (100 per call)':<34} {result['ms_per_user'] / 100:>8.2f} "
+          f"{result['http_calls'] / 100:>11.2f} {result['db_queries'] / 100:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+"""Load-test and latency benchmark suite for the agent API.
+
+Run from the project root:
+    # 1. seed a local database at 10x the cleaned_data size
+    ELDERLY_CARE_DSN=sqlite:///bench.db python -m benchmarks.loadtest seed --scale 10
+    # 2. drive every route (in-process, or against a running server with --base-url)
+    ELDERLY_CARE_DSN=sqlite:///bench.db python -m benchmarks.loadtest run --concurrency 8 --out after.json
+    # 3. flag regressions between two runs
+    python -m benchmarks.loadtest compare before.json after.json --threshold 0.10
+
+Scaling adds history: replica k repeats every reading shifted k*30 days later,
+so the user count stays fixed while each user's history grows.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from agents import db, ingest, migrate
+from agents.features import build_features
+
+CLEANED = {agent: os.path.join(ingest.CLEANED_DIR, source['cleaned']) for agent, source in ingest.SOURCES.items()}
+
+
+# ========================
+# 🌱 SEEDING
+# ========================
+def seed(scale, days_per_replica=30):
+    migrate.upgrade()
+    for agent, path in CLEANED.items():
+        cleaned = pd.read_csv(path, parse_dates=['timestamp'])
+        start = time.perf_counter()
+        with db.cursor() as cur:
+            for replica in range(scale):
+                shifted = cleaned.copy()
+                shifted['timestamp'] = shifted['timestamp'] + pd.Timedelta(days=days_per_replica * replica)
+                ingest.load_frame(cur, agent, ingest.to_table_frame(agent, shifted))
+        print(f"🌱 {agent}: {len(cleaned) * scale} rows in {time.perf_counter() - start:.2f}s")
+
+
+# ========================
+# 🎯 ROUTES
+# ========================
+def build_routes(sample_users=200):
+    payloads = {}
+    users = {}
+    for agent, path in CLEANED.items():
+        cleaned = pd.read_csv(path, nrows=sample_users)
+        users[agent] = cleaned['user_id'].tolist()
+        payloads[agent] = build_features(agent, cleaned).to_dict(orient='records')
+
+    routes = []
+    for agent in CLEANED:
+        routes += [
+            (f"GET /{agent}", 'GET', lambda i, a=agent: (f"/{a}", None)),
+            (f"GET /{agent}/user/<id>", 'GET',
+             lambda i, a=agent: (f"/{a}/user/{users[a][i % len(users[a])]}", None)),
+            (f"POST /{agent}/predict", 'POST',
+             lambda i, a=agent: (f"/{a}/predict", payloads[a][i % len(payloads[a])])),
+            (f"POST /{agent}/auto_predict", 'POST',
+             lambda i, a=agent: (f"/{a}/auto_predict", {'user_id': users[a][i % len(users[a])]})),
+        ]
+    return routes
+
+
+class InProcessClient:
+    # One Flask test client per thread; no server or network involved
+    def __init__(self):
+        from agents.agents import app
+        self._app = app
+        self._local = threading.local()
+
+    def request(self, method, path, body):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self._app.test_client()
+        resp = client.open(path, method=method, json=body)
+        resp.get_data()
+        return resp.status_code
+
+
+class HttpClient:
+    def __init__(self, base_url):
+        import requests
+        self._base_url = base_url.rstrip('/')
+        self._local = threading.local()
+        self._requests = requests
+
+    def request(self, method, path, body):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = self._requests.Session()
+        resp = session.request(method, self._base_url + path, json=body)
+        return resp.status_code
+
+
+# ========================
+# 🏃 RUNNER
+# ========================
+def drive(client, method, make_request, concurrency, requests_per_route):
+    latencies = np.zeros(requests_per_route)
+    errors = [0]
+    counter = iter(range(requests_per_route))
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            path, body = make_request(i)
+            start = time.perf_counter()
+            try:
+                status = client.request(method, path, body)
+            except Exception:
+                status = 599
+            latencies[i] = time.perf_counter() - start
+            # 404 is a valid answer for users without readings
+            if status >= 500:
+                with lock:
+                    errors[0] += 1
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    wall = time.perf_counter() - wall_start
+
+    ms = latencies * 1000
+    return {
+        'requests': requests_per_route,
+        'errors': errors[0],
+        'throughput_rps': round(requests_per_route / wall, 1),
+        'mean_ms': round(float(ms.mean()), 3),
+        'p50_ms': round(float(np.percentile(ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(ms, 95)), 3),
+        'p99_ms': round(float(np.percentile(ms, 99)), 3),
+    }
+
+
+def run(args):
+    client = HttpClient(args.base_url) if args.base_url else InProcessClient()
+    selected = [r for r in build_routes() if not args.routes or any(p in r[0] for p in args.routes.split(','))]
+    results = {}
+    for name, method, make_request in selected:
+        drive(client, method, make_request, 1, min(10, args.requests))  # warm-up
+        results[name] = drive(client, method, make_request, args.concurrency, args.requests)
+        r = results[name]
+        print(f"{name:<32} {r['throughput_rps']:>9.1f} rps  p50 {r['p50_ms']:>8.2f}  "
+              f"p95 {r['p95_ms']:>8.2f}  p99 {r['p99_ms']:>8.2f} ms  errors {r['errors']}", file=sys.stderr)
+
+    report = {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'target': args.base_url or 'in-process',
+            'backend': db.backend(),
+            'concurrency': args.concurrency,
+            'requests_per_route': args.requests,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+        },
+        'routes': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+# ========================
+# ⚖️ COMPARE
+# ========================
+def compare(base_path, new_path, threshold):
+    with open(base_path) as f:
+        base = json.load(f)['routes']
+    with open(new_path) as f:
+        new = json.load(f)['routes']
+
+    regressions = []
+    print(f"{'route':<32} {'p95 before':>11} {'p95 after':>10} {'rps before':>11} {'rps after':>10}")
+    for name in sorted(set(base) & set(new)):
+        b, n = base[name], new[name]
+        flags = []
+        if n['p95_ms'] > b['p95_ms'] * (1 + threshold):
+            flags.append('p95')
+        if n['p99_ms'] > b['p99_ms'] * (1 + threshold):
+            flags.append('p99')
+        if n['throughput_rps'] < b['throughput_rps'] * (1 - threshold):
+            flags.append('throughput')
+        if n['errors'] > b['errors']:
+            flags.append('errors')
+        marker = f"  ❌ {', '.join(flags)}" if flags else ''
+        print(f"{name:<32} {b['p95_ms']:>11.2f} {n['p95_ms']:>10.2f} {b['throughput_rps']:>11.1f} "
+              f"{n['throughput_rps']:>10.1f}{marker}")
+        if flags:
+            regressions.append((name, flags))
+    for name in sorted(set(base) - set(new)):
+        print(f"{name:<32} missing from {new_path}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_seed = sub.add_parser('seed', help="load cleaned_data/*.csv at a multiple of its size")
+    p_seed.add_argument('--scale', type=int, default=1, help="1, 10, 100, ...")
+
+    p_run = sub.add_parser('run', help="drive every route and report latency percentiles as JSON")
+    p_run.add_argument('--base-url', help="e.g. http://127.0.0.1:5001 (default: in-process)")
+    p_run.add_argument('--concurrency', type=int, default=4)
+    p_run.add_argument('--requests', type=int, default=500, help="requests per route")
+    p_run.add_argument('--routes', help="comma-separated substrings to select routes, e.g. user,auto")
+    p_run.add_argument('--out', help="write the JSON report here instead of stdout")
+
+    p_cmp = sub.add_parser('compare', help="flag regressions between two run reports")
+    p_cmp.add_argument('before')
+    p_cmp.add_argument('after')
+    p_cmp.add_argument('--threshold', type=float, default=0.10, help="allowed relative slowdown")
+
+    args = parser.parse_args(argv)
+    if args.command == 'seed':
+        seed(args.scale)
+    elif args.command == 'run':
+        run(args)
+    else:
+        regressions = compare(args.before, args.after, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} route(s) regressed beyond {args.threshold:.0%}.")
+            sys.exit(1)
+        print("No regressions.")
+
+
+if __name__ == '__main__':
+    main()
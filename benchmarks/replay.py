@@ -0,0 +1,342 @@
+"""Accelerated replay of Dataset/*.csv through real-time ingestion, timing each reading until it is stored or alerted.
+
+Run from the project root (uses its own throwaway SQLite database, alert queue and spill directory):
+    python -m benchmarks.replay --devices 100000 --speeds 1,10,100,1000 --duration 20
+    python -m benchmarks.replay --devices 10000 --speeds 3000,10000,30000,100000   # look for the ceiling
+
+The three datasets are merged into one stream ordered by timestamp. Devices
+past the dataset's residents are copies with a suffixed user_id, each copy
+shifted by a fraction of the dataset's time span so copies do not report in
+lockstep; once the stream runs out it starts over one span later. Each stage
+plays --duration seconds at --speed x real time: every --tick seconds the
+readings now due are posted per agent as one columnar batch through
+realtime.readings_frame and a MicroBatcher (the /<agent>/ingest path), so
+micro-batching, model scoring, the upsert, streaming detection and alert
+dispatch all run as they do in the server. The notifier is the local stub
+with --latency seconds per call; caregiver rate limits are off unless --rate
+is given.
+
+After each stage the tool waits for every reading to be stored and every
+alert to be delivered, then reports latency from a reading's arrival (its
+submission) to its stored prediction (the flush commit) and to its
+caregiver alert (the notifier call). A stage keeps up when submission never
+falls more than --max-lag seconds behind schedule, nothing is refused with
+backpressure and both p99s stay under --max-lag; the ramp stops at the
+first stage that does not, and the last one that did gives the sustained
+readings per second.
+"""
+import argparse
+import math
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+_dir = tempfile.mkdtemp(prefix='replay_')
+os.environ['ELDERLY_CARE_DSN'] = f"sqlite:///{os.path.join(_dir, 'replay.db')}"
+os.environ['ELDERLY_CARE_SPILL_DIR'] = os.path.join(_dir, 'spill')
+
+from agents import alerts, db, ingest, migrate, realtime  # noqa: E402
+from agents.registry import registry  # noqa: E402
+
+AGENTS = ['health', 'safety', 'reminders']
+# Set by the system once a reading is stored, so devices do not send them
+STORED_ONLY = {'caregiver_notified', 'acknowledged'}
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+# ========================
+# 📼 DEVICE STREAM
+# ========================
+class Stream:
+    # All devices' readings in timestamp order. Position p is reading p % n of
+    # lap p // n, which is lap * span seconds later than the first lap.
+    def __init__(self, devices, dataset_dir=ingest.DATASET_DIR):
+        sources = {}
+        for agent in AGENTS:
+            cleaned = pd.concat(ingest.read_clean_chunks(agent, dataset_dir), ignore_index=True)
+            columns = realtime.REQUIRED_COLUMNS[agent] + [
+                col for col in realtime.OPTIONAL_DEFAULTS[agent] if col in cleaned.columns and col not in STORED_ONLY]
+            sources[agent] = cleaned.dropna(subset=realtime.REQUIRED_COLUMNS[agent])[columns]
+        self.first = min(df['timestamp'].min() for df in sources.values())
+        last = max(df['timestamp'].max() for df in sources.values())
+        self.span = int((last - self.first).total_seconds()) + 60
+        residents = sorted(set().union(*(df['user_id'] for df in sources.values())))
+        rank = {user_id: i for i, user_id in enumerate(residents)}
+        self.residents = len(residents)
+        self.devices = devices
+        copies = math.ceil(devices / len(residents))
+
+        self.columns = {}
+        self.seconds = {}
+        agent_codes, rows, offsets = [], [], []
+        for code, (agent, df) in enumerate(sources.items()):
+            device = df['user_id'].map(rank).to_numpy()
+            offset = ((df['timestamp'] - self.first).dt.total_seconds()).to_numpy(dtype=np.int64)
+            parts, seconds = [], []
+            for copy in range(copies):
+                keep = device + copy * len(residents) < devices
+                part = df[keep].copy()
+                if copy:
+                    part['user_id'] = part['user_id'] + f'-{copy}'
+                parts.append(part)
+                seconds.append((offset[keep] + copy * self.span // copies) % self.span)
+            frame = pd.concat(parts, ignore_index=True)
+            self.columns[agent] = {col: frame[col].to_numpy(dtype=object)
+                                   for col in frame.columns if col != 'timestamp'}
+            self.seconds[agent] = np.concatenate(seconds)
+            agent_codes.append(np.full(len(frame), code, dtype=np.int8))
+            rows.append(np.arange(len(frame)))
+            offsets.append(self.seconds[agent])
+        offsets = np.concatenate(offsets)
+        order = np.argsort(offsets, kind='stable')
+        self.offsets = offsets[order]
+        self.agent_codes = np.concatenate(agent_codes)[order]
+        self.rows = np.concatenate(rows)[order]
+        self.n = len(self.offsets)
+
+    def offset(self, position):
+        # Seconds into the replay at which reading `position` is sent
+        lap, i = divmod(position, self.n)
+        return lap * self.span + int(self.offsets[i])
+
+    def due(self, seconds):
+        # Position of the first reading sent after `seconds` into the replay
+        lap, within = divmod(seconds, self.span)
+        return int(lap) * self.n + int(np.searchsorted(self.offsets, within, side='right'))
+
+    def per_second(self):
+        return self.n / self.span
+
+    def payloads(self, start, stop):
+        # Columnar /<agent>/ingest bodies for readings [start, stop), with each reading's epoch second
+        positions = np.arange(start, stop)
+        laps, within = np.divmod(positions, self.n)
+        codes, rows = self.agent_codes[within], self.rows[within]
+        first = int(self.first.timestamp())
+        for code, agent in enumerate(AGENTS):
+            mask = codes == code
+            if not mask.any():
+                continue
+            picked = rows[mask]
+            seconds = first + self.seconds[agent][picked] + laps[mask] * self.span
+            payload = {col: values[picked].tolist() for col, values in self.columns[agent].items()}
+            payload['timestamp'] = pd.to_datetime(seconds, unit='s').strftime(TIMESTAMP_FORMAT).tolist()
+            yield agent, payload, seconds
+
+
+# ========================
+# ⏱️ LATENCY TRACKING
+# ========================
+class Tracker:
+    # When each replayed reading arrived, keyed by (agent, user_id, epoch second),
+    # and (arrival, latency) pairs as readings are stored and alerts delivered
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.arrivals = {}
+        self.stored = ([], [])
+        self.alerted = ([], [])
+
+    def arrive(self, agent, user_ids, seconds, now):
+        keys = [(agent, user_id, int(s)) for user_id, s in zip(user_ids, seconds)]
+        with self.lock:
+            self.arrivals.update(dict.fromkeys(keys, now))
+        return keys
+
+    def forget(self, keys):
+        with self.lock:
+            for key in keys:
+                self.arrivals.pop(key, None)
+
+    def _record(self, pairs, keys, now):
+        with self.lock:
+            arrived = [self.arrivals.get(key) for key in keys]
+            arrived = [a for a in arrived if a is not None]
+            pairs[0].extend(arrived)
+            pairs[1].extend(now - a for a in arrived)
+
+    def store(self, agent, batch):
+        seconds = batch['timestamp'].to_numpy().astype('datetime64[s]').astype(np.int64)
+        self._record(self.stored, [(agent, user_id, int(s)) for user_id, s in zip(batch['user_id'], seconds)],
+                     time.perf_counter())
+
+    def alert(self, alert):
+        seconds = int(pd.Timestamp(alert['timestamp']).timestamp())
+        self._record(self.alerted, [(alert['agent'], alert['user_id'], seconds)], time.perf_counter())
+
+    def latencies(self, pairs, start, end):
+        # Latencies of readings that arrived in [start, end)
+        with self.lock:
+            arrived, latency = np.array(pairs[0]), np.array(pairs[1])
+        return latency[(arrived >= start) & (arrived < end)] if len(arrived) else latency
+
+
+class TimedBatcher(realtime.MicroBatcher):
+    # Stamps every reading once its flush (prediction and upsert) has committed
+    def __init__(self, agent, tracker, **kwargs):
+        super().__init__(agent, **kwargs)
+        self.tracker = tracker
+
+    def _write(self, batch):
+        super()._write(batch)
+        self.tracker.store(self.agent, batch)
+
+
+class TimedNotifier(alerts.LocalNotifier):
+    # The local stub notifier, stamping every alert that reaches it
+    def __init__(self, tracker, latency, failure_rate):
+        super().__init__(path=None, latency=latency, failure_rate=failure_rate, seed=1)
+        self.tracker = tracker
+
+    async def send(self, alert):
+        await super().send(alert)
+        self.tracker.alert(alert)
+
+
+# ========================
+# 🎬 STAGES
+# ========================
+def play(stream, batchers, tracker, position, speed, duration, tick):
+    # Submit readings as they fall due for `duration` seconds; returns the next position and the stage's counts
+    wall_start = time.perf_counter()
+    data_start = stream.offset(position)
+    counts = {'offered': 0, 'accepted': 0, 'rejected': 0, 'max_lag': 0.0}
+    while True:
+        now = time.perf_counter()
+        elapsed = now - wall_start
+        if elapsed >= duration:
+            break
+        stop = stream.due(data_start + elapsed * speed)
+        if stop > position:
+            scheduled = wall_start + (stream.offset(position) - data_start) / speed
+            for agent, payload, seconds in stream.payloads(position, stop):
+                frame = realtime.readings_frame(agent, payload)
+                keys = tracker.arrive(agent, frame['user_id'], seconds, time.perf_counter())
+                try:
+                    batchers[agent].submit(frame)
+                    counts['accepted'] += len(frame)
+                except realtime.Backpressure:
+                    tracker.forget(keys)
+                    counts['rejected'] += len(frame)
+            counts['offered'] += stop - position
+            counts['max_lag'] = max(counts['max_lag'], time.perf_counter() - scheduled)
+            position = stop
+        time.sleep(max(0.0, tick - (time.perf_counter() - now)))
+    return position, counts
+
+
+def drain(batchers, dispatcher, timeout):
+    # Wait until every accepted reading is stored and every queued alert settled; returns seconds waited or None
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        stored = all(b.stats()['flushed_rows'] == b.stats()['accepted'] for b in batchers.values())
+        if stored and dispatcher.stats()['queue_depth'] == 0:
+            return time.perf_counter() - start
+        time.sleep(0.05)
+    return None
+
+
+def percentiles(latency):
+    if not len(latency):
+        return "none"
+    p50, p95, p99 = np.percentile(latency, [50, 95, 99]) * 1000
+    return (f"p50 {p50:,.0f} ms, p95 {p95:,.0f} ms, p99 {p99:,.0f} ms, "
+            f"max {latency.max() * 1000:,.0f} ms ({len(latency):,})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--devices', type=int, default=100000)
+    parser.add_argument('--speeds', default='1,10,100,1000', help="x real time, one stage each, in order")
+    parser.add_argument('--duration', type=float, default=20.0, help="seconds of wall time per stage")
+    parser.add_argument('--tick', type=float, default=0.05, help="seconds between submissions")
+    parser.add_argument('--max-lag', type=float, default=5.0, help="seconds behind schedule that count as backlog")
+    parser.add_argument('--drain', type=float, default=120.0, help="seconds to wait for a stage to be stored and sent")
+    parser.add_argument('--flush-size', type=int, default=realtime.FLUSH_SIZE)
+    parser.add_argument('--flush-interval', type=float, default=realtime.FLUSH_INTERVAL)
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds per notifier call")
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--workers', type=int, default=alerts.WORKERS)
+    parser.add_argument('--rate', type=float, default=0, help="alerts per caregiver per minute (0: no limit)")
+    args = parser.parse_args(argv)
+
+    migrate.upgrade()
+    for agent in realtime.FLAG_COLUMNS:
+        registry.get(agent)
+    start = time.perf_counter()
+    stream = Stream(args.devices)
+    print(f"{stream.devices:,} devices ({stream.residents:,} residents x {math.ceil(stream.devices / stream.residents)}), "
+          f"{stream.n:,} readings over {stream.span / 86400:.1f} days ({stream.per_second():.3f}/s at 1x); "
+          f"built in {time.perf_counter() - start:.1f}s")
+
+    tracker = Tracker()
+    dispatcher = alerts.Dispatcher(
+        queue=alerts.AlertQueue(os.path.join(_dir, 'alerts.sqlite3')),
+        notifier=TimedNotifier(tracker, args.latency, args.failure_rate),
+        workers=args.workers, limiter=alerts.RateLimiter(args.rate, alerts.BURST))
+    # Flushes queue their alerts through the shared dispatcher
+    with alerts._dispatcher_lock:
+        alerts._dispatcher = dispatcher
+    batchers = {agent: TimedBatcher(agent, tracker, flush_size=args.flush_size, flush_interval=args.flush_interval,
+                                    spill_dir=os.environ['ELDERLY_CARE_SPILL_DIR']) for agent in AGENTS}
+
+    position = 0
+    sustained = None
+    backlogged = False
+    try:
+        for speed in (float(s) for s in args.speeds.split(',')):
+            before = dispatcher.stats()
+            stage_start = time.perf_counter()
+            position, counts = play(stream, batchers, tracker, position, speed, args.duration, args.tick)
+            stage_end = time.perf_counter()
+            waited = drain(batchers, dispatcher, args.drain)
+            after = dispatcher.stats()
+            stored = tracker.latencies(tracker.stored, stage_start, stage_end)
+            alerted = tracker.latencies(tracker.alerted, stage_start, stage_end)
+            rate = counts['accepted'] / args.duration
+
+            print(f"\n{speed:g}x: {counts['offered']:,} readings in {args.duration:g}s "
+                  f"({counts['offered'] / args.duration:,.1f} offered/s, {rate:,.1f} accepted/s); "
+                  f"up to {counts['max_lag']:.2f}s behind schedule, {counts['rejected']:,} refused")
+            print(f"  arrival -> stored   {percentiles(stored)}")
+            print(f"  arrival -> alerted  {percentiles(alerted)}; "
+                  f"{after['suppressed_duplicates'] - before['suppressed_duplicates']:,} duplicates dropped, "
+                  f"{after['failed'] - before['failed']:,} failed")
+            problems = []
+            if waited is None:
+                problems.append(f"not drained after {args.drain:g}s")
+            if counts['max_lag'] > args.max_lag:
+                problems.append("submission fell behind")
+            if counts['rejected']:
+                problems.append("backpressure")
+            for name, latency in (('stored', stored), ('alerted', alerted)):
+                if len(latency) and np.percentile(latency, 99) > args.max_lag:
+                    problems.append(f"{name} p99 over {args.max_lag:g}s")
+            if problems:
+                print(f"  backlog: {', '.join(problems)}")
+                backlogged = True
+                break
+            print(f"  keeps up (drained in {waited:.1f}s)")
+            sustained = (speed, rate)
+    finally:
+        for b in batchers.values():
+            b.close()
+        alerts.close()
+
+    if sustained is None:
+        print("\nno stage kept up")
+    else:
+        print(f"\nsustained: {sustained[1]:,.1f} readings/s at {sustained[0]:g}x with {stream.devices:,} devices"
+              + ("" if backlogged else " (every stage kept up; add faster --speeds to find the ceiling)"))
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    finally:
+        db.close_pool()
+        shutil.rmtree(_dir, ignore_errors=True)
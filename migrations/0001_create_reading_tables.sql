@@ -0,0 +1,44 @@
+-- Reading tables for the three agents.
+-- Leading columns keep the positional layout agents/agents.py reads with SELECT *;
+-- the rest mirror cleaned_data/*.csv (see agents/ingest.py for the renames).
+
+CREATE TABLE IF NOT EXISTS health_monitoring (
+    user_id TEXT NOT NULL,
+    timestamp TIMESTAMP NOT NULL,
+    heart_rate INTEGER,
+    temperature REAL,
+    bp_systolic REAL,
+    bp_diastolic REAL,
+    abnormal BOOLEAN,
+    hr_alert BOOLEAN,
+    bp_alert BOOLEAN,
+    glucose_level INTEGER,
+    glucose_alert BOOLEAN,
+    spo2 INTEGER,
+    spo2_alert BOOLEAN,
+    alert_triggered BOOLEAN,
+    caregiver_notified BOOLEAN
+);
+
+CREATE TABLE IF NOT EXISTS safety_monitoring (
+    user_id TEXT NOT NULL,
+    timestamp TIMESTAMP NOT NULL,
+    event_type TEXT,
+    location TEXT,
+    emergency_call BOOLEAN DEFAULT FALSE,
+    unsafe BOOLEAN,
+    fall_detected BOOLEAN,
+    impact_force_level TEXT,
+    post_fall_inactivity_duration INTEGER,
+    alert_triggered BOOLEAN,
+    caregiver_notified BOOLEAN
+);
+
+CREATE TABLE IF NOT EXISTS daily_reminder (
+    user_id TEXT NOT NULL,
+    timestamp TIMESTAMP NOT NULL,
+    reminder_type TEXT,
+    schedule_time TIME,
+    reminder_sent BOOLEAN,
+    acknowledged BOOLEAN
+);
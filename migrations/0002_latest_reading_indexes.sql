@@ -0,0 +1,24 @@
+-- (user_id, timestamp DESC): the latest-reading lookups in agents/agents.py
+-- (WHERE user_id = ... ORDER BY timestamp DESC LIMIT 1) and the fleet window
+-- (PARTITION BY user_id ORDER BY timestamp DESC) read straight off this index.
+-- It is UNIQUE so it also backs the ingestion upserts' ON CONFLICT (user_id, timestamp).
+CREATE UNIQUE INDEX IF NOT EXISTS health_monitoring_user_ts_idx
+    ON health_monitoring (user_id, timestamp DESC);
+CREATE UNIQUE INDEX IF NOT EXISTS safety_monitoring_user_ts_idx
+    ON safety_monitoring (user_id, timestamp DESC);
+CREATE UNIQUE INDEX IF NOT EXISTS daily_reminder_user_ts_idx
+    ON daily_reminder (user_id, timestamp DESC);
+
+-- auto_predict_reminder only looks at reminders that were actually sent
+CREATE INDEX IF NOT EXISTS daily_reminder_sent_user_ts_idx
+    ON daily_reminder (user_id, timestamp DESC)
+    WHERE reminder_sent = TRUE;
+
+-- Table-wide ORDER BY timestamp DESC LIMIT 10 lists and the combined API's
+-- keyset pagination on (timestamp, user_id)
+CREATE INDEX IF NOT EXISTS health_monitoring_ts_user_idx
+    ON health_monitoring (timestamp, user_id);
+CREATE INDEX IF NOT EXISTS safety_monitoring_ts_user_idx
+    ON safety_monitoring (timestamp, user_id);
+CREATE INDEX IF NOT EXISTS daily_reminder_ts_user_idx
+    ON daily_reminder (timestamp, user_id);
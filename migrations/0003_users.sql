@@ -0,0 +1,17 @@
+-- One row per resident so the dashboard's user list no longer scans
+-- health_monitoring. agents/ingest.py registers new users as it loads.
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- (WHERE TRUE keeps SQLite from reading ON CONFLICT as a join constraint)
+INSERT INTO users (user_id)
+SELECT user_id FROM (
+    SELECT user_id FROM health_monitoring
+    UNION
+    SELECT user_id FROM safety_monitoring
+    UNION
+    SELECT user_id FROM daily_reminder
+) known WHERE TRUE
+ON CONFLICT (user_id) DO NOTHING;
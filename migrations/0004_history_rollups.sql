@@ -0,0 +1,59 @@
+-- Per-user hourly ('1h') and daily ('1d') aggregates behind the history API
+-- (agents/history.py). Means are sum / n so buckets can be recomputed exactly;
+-- agents/rollups.py keeps them current as readings are loaded.
+
+CREATE TABLE IF NOT EXISTS health_rollup (
+    user_id TEXT NOT NULL,
+    bucket_size TEXT NOT NULL,
+    bucket_start TIMESTAMP NOT NULL,
+    readings INTEGER NOT NULL,
+    heart_rate_n INTEGER,
+    heart_rate_sum DOUBLE PRECISION,
+    heart_rate_min DOUBLE PRECISION,
+    heart_rate_max DOUBLE PRECISION,
+    bp_systolic_n INTEGER,
+    bp_systolic_sum DOUBLE PRECISION,
+    bp_systolic_min DOUBLE PRECISION,
+    bp_systolic_max DOUBLE PRECISION,
+    bp_diastolic_n INTEGER,
+    bp_diastolic_sum DOUBLE PRECISION,
+    bp_diastolic_min DOUBLE PRECISION,
+    bp_diastolic_max DOUBLE PRECISION,
+    glucose_level_n INTEGER,
+    glucose_level_sum DOUBLE PRECISION,
+    glucose_level_min DOUBLE PRECISION,
+    glucose_level_max DOUBLE PRECISION,
+    spo2_n INTEGER,
+    spo2_sum DOUBLE PRECISION,
+    spo2_min DOUBLE PRECISION,
+    spo2_max DOUBLE PRECISION,
+    alerts INTEGER,
+    abnormal INTEGER,
+    PRIMARY KEY (user_id, bucket_size, bucket_start)
+);
+
+CREATE TABLE IF NOT EXISTS safety_rollup (
+    user_id TEXT NOT NULL,
+    bucket_size TEXT NOT NULL,
+    bucket_start TIMESTAMP NOT NULL,
+    readings INTEGER NOT NULL,
+    post_fall_inactivity_duration_n INTEGER,
+    post_fall_inactivity_duration_sum DOUBLE PRECISION,
+    post_fall_inactivity_duration_min DOUBLE PRECISION,
+    post_fall_inactivity_duration_max DOUBLE PRECISION,
+    falls INTEGER,
+    alerts INTEGER,
+    unsafe INTEGER,
+    emergency_calls INTEGER,
+    PRIMARY KEY (user_id, bucket_size, bucket_start)
+);
+
+CREATE TABLE IF NOT EXISTS reminder_rollup (
+    user_id TEXT NOT NULL,
+    bucket_size TEXT NOT NULL,
+    bucket_start TIMESTAMP NOT NULL,
+    readings INTEGER NOT NULL,
+    sent INTEGER,
+    acknowledged INTEGER,
+    PRIMARY KEY (user_id, bucket_size, bucket_start)
+);
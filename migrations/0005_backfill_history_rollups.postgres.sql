@@ -0,0 +1,100 @@
+-- Backfill the rollups from the readings already loaded (postgres bucket
+-- expressions); later loads refresh them through agents/rollups.py.
+
+INSERT INTO health_rollup (
+    user_id, bucket_size, bucket_start, readings, heart_rate_n, heart_rate_sum,
+    heart_rate_min, heart_rate_max, bp_systolic_n, bp_systolic_sum,
+    bp_systolic_min, bp_systolic_max, bp_diastolic_n, bp_diastolic_sum,
+    bp_diastolic_min, bp_diastolic_max, glucose_level_n, glucose_level_sum,
+    glucose_level_min, glucose_level_max, spo2_n, spo2_sum, spo2_min, spo2_max,
+    alerts, abnormal
+)
+SELECT user_id, '1h', date_trunc('hour', timestamp),
+       COUNT(*),
+       COUNT(heart_rate), SUM(heart_rate), MIN(heart_rate), MAX(heart_rate),
+       COUNT(bp_systolic), SUM(bp_systolic), MIN(bp_systolic), MAX(bp_systolic),
+       COUNT(bp_diastolic), SUM(bp_diastolic), MIN(bp_diastolic), MAX(bp_diastolic),
+       COUNT(glucose_level), SUM(glucose_level), MIN(glucose_level), MAX(glucose_level),
+       COUNT(spo2), SUM(spo2), MIN(spo2), MAX(spo2),
+       SUM(CASE WHEN alert_triggered THEN 1 ELSE 0 END),
+       SUM(CASE WHEN abnormal THEN 1 ELSE 0 END)
+FROM health_monitoring
+GROUP BY user_id, date_trunc('hour', timestamp)
+ON CONFLICT (user_id, bucket_size, bucket_start) DO NOTHING;
+
+INSERT INTO health_rollup (
+    user_id, bucket_size, bucket_start, readings, heart_rate_n, heart_rate_sum,
+    heart_rate_min, heart_rate_max, bp_systolic_n, bp_systolic_sum,
+    bp_systolic_min, bp_systolic_max, bp_diastolic_n, bp_diastolic_sum,
+    bp_diastolic_min, bp_diastolic_max, glucose_level_n, glucose_level_sum,
+    glucose_level_min, glucose_level_max, spo2_n, spo2_sum, spo2_min, spo2_max,
+    alerts, abnormal
+)
+SELECT user_id, '1d', date_trunc('day', timestamp),
+       COUNT(*),
+       COUNT(heart_rate), SUM(heart_rate), MIN(heart_rate), MAX(heart_rate),
+       COUNT(bp_systolic), SUM(bp_systolic), MIN(bp_systolic), MAX(bp_systolic),
+       COUNT(bp_diastolic), SUM(bp_diastolic), MIN(bp_diastolic), MAX(bp_diastolic),
+       COUNT(glucose_level), SUM(glucose_level), MIN(glucose_level), MAX(glucose_level),
+       COUNT(spo2), SUM(spo2), MIN(spo2), MAX(spo2),
+       SUM(CASE WHEN alert_triggered THEN 1 ELSE 0 END),
+       SUM(CASE WHEN abnormal THEN 1 ELSE 0 END)
+FROM health_monitoring
+GROUP BY user_id, date_trunc('day', timestamp)
+ON CONFLICT (user_id, bucket_size, bucket_start) DO NOTHING;
+
+INSERT INTO safety_rollup (
+    user_id, bucket_size, bucket_start, readings,
+    post_fall_inactivity_duration_n, post_fall_inactivity_duration_sum,
+    post_fall_inactivity_duration_min, post_fall_inactivity_duration_max, falls,
+    alerts, unsafe, emergency_calls
+)
+SELECT user_id, '1h', date_trunc('hour', timestamp),
+       COUNT(*),
+       COUNT(post_fall_inactivity_duration), SUM(post_fall_inactivity_duration), MIN(post_fall_inactivity_duration), MAX(post_fall_inactivity_duration),
+       SUM(CASE WHEN fall_detected THEN 1 ELSE 0 END),
+       SUM(CASE WHEN alert_triggered THEN 1 ELSE 0 END),
+       SUM(CASE WHEN unsafe THEN 1 ELSE 0 END),
+       SUM(CASE WHEN emergency_call THEN 1 ELSE 0 END)
+FROM safety_monitoring
+GROUP BY user_id, date_trunc('hour', timestamp)
+ON CONFLICT (user_id, bucket_size, bucket_start) DO NOTHING;
+
+INSERT INTO safety_rollup (
+    user_id, bucket_size, bucket_start, readings,
+    post_fall_inactivity_duration_n, post_fall_inactivity_duration_sum,
+    post_fall_inactivity_duration_min, post_fall_inactivity_duration_max, falls,
+    alerts, unsafe, emergency_calls
+)
+SELECT user_id, '1d', date_trunc('day', timestamp),
+       COUNT(*),
+       COUNT(post_fall_inactivity_duration), SUM(post_fall_inactivity_duration), MIN(post_fall_inactivity_duration), MAX(post_fall_inactivity_duration),
+       SUM(CASE WHEN fall_detected THEN 1 ELSE 0 END),
+       SUM(CASE WHEN alert_triggered THEN 1 ELSE 0 END),
+       SUM(CASE WHEN unsafe THEN 1 ELSE 0 END),
+       SUM(CASE WHEN emergency_call THEN 1 ELSE 0 END)
+FROM safety_monitoring
+GROUP BY user_id, date_trunc('day', timestamp)
+ON CONFLICT (user_id, bucket_size, bucket_start) DO NOTHING;
+
+INSERT INTO reminder_rollup (
+    user_id, bucket_size, bucket_start, readings, sent, acknowledged
+)
+SELECT user_id, '1h', date_trunc('hour', timestamp),
+       COUNT(*),
+       SUM(CASE WHEN reminder_sent THEN 1 ELSE 0 END),
+       SUM(CASE WHEN acknowledged THEN 1 ELSE 0 END)
+FROM daily_reminder
+GROUP BY user_id, date_trunc('hour', timestamp)
+ON CONFLICT (user_id, bucket_size, bucket_start) DO NOTHING;
+
+INSERT INTO reminder_rollup (
+    user_id, bucket_size, bucket_start, readings, sent, acknowledged
+)
+SELECT user_id, '1d', date_trunc('day', timestamp),
+       COUNT(*),
+       SUM(CASE WHEN reminder_sent THEN 1 ELSE 0 END),
+       SUM(CASE WHEN acknowledged THEN 1 ELSE 0 END)
+FROM daily_reminder
+GROUP BY user_id, date_trunc('day', timestamp)
+ON CONFLICT (user_id, bucket_size, bucket_start) DO NOTHING;
@@ -0,0 +1,3 @@
+-- Who receives a resident's alerts (agents/alerts.py). Residents without a
+-- caregiver go to ELDERLY_CARE_DEFAULT_CAREGIVER.
+ALTER TABLE users ADD COLUMN caregiver_id TEXT;
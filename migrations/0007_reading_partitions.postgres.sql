@@ -0,0 +1,57 @@
+-- Monthly range partitions on timestamp for the three reading tables
+-- (agents/partitions.py). Each table is rebuilt as a partitioned parent with
+-- one <table>_YYYY_MM partition per month from its oldest reading through the
+-- current month; `python -m agents.partitions` creates the months ahead and
+-- ingestion creates any month a load reaches. Indexes defined on the parent
+-- (the 0002 ones, same names) cascade to every partition, including future ones.
+
+DO $$
+DECLARE
+    parent TEXT;
+    month DATE;
+    last_month DATE;
+BEGIN
+    FOREACH parent IN ARRAY ARRAY['health_monitoring', 'safety_monitoring', 'daily_reminder'] LOOP
+        EXECUTE format('ALTER TABLE %I RENAME TO %I', parent, parent || '_unpartitioned');
+        EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS) PARTITION BY RANGE (timestamp)',
+                       parent, parent || '_unpartitioned');
+        EXECUTE format('SELECT date_trunc(''month'', MIN(timestamp))::date, date_trunc(''month'', MAX(timestamp))::date FROM %I',
+                       parent || '_unpartitioned') INTO month, last_month;
+        month := COALESCE(month, date_trunc('month', now())::date);
+        last_month := GREATEST(COALESCE(last_month, month), date_trunc('month', now())::date);
+        WHILE month <= last_month LOOP
+            EXECUTE format('CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                           parent || '_' || to_char(month, 'YYYY_MM'), parent, month, (month + interval '1 month')::date);
+            month := (month + interval '1 month')::date;
+        END LOOP;
+        EXECUTE format('INSERT INTO %I SELECT * FROM %I', parent, parent || '_unpartitioned');
+        EXECUTE format('DROP TABLE %I', parent || '_unpartitioned');
+    END LOOP;
+END
+$$;
+
+CREATE UNIQUE INDEX IF NOT EXISTS health_monitoring_user_ts_idx
+    ON health_monitoring (user_id, timestamp DESC);
+CREATE UNIQUE INDEX IF NOT EXISTS safety_monitoring_user_ts_idx
+    ON safety_monitoring (user_id, timestamp DESC);
+CREATE UNIQUE INDEX IF NOT EXISTS daily_reminder_user_ts_idx
+    ON daily_reminder (user_id, timestamp DESC);
+CREATE INDEX IF NOT EXISTS daily_reminder_sent_user_ts_idx
+    ON daily_reminder (user_id, timestamp DESC)
+    WHERE reminder_sent = TRUE;
+CREATE INDEX IF NOT EXISTS health_monitoring_ts_user_idx
+    ON health_monitoring (timestamp, user_id);
+CREATE INDEX IF NOT EXISTS safety_monitoring_ts_user_idx
+    ON safety_monitoring (timestamp, user_id);
+CREATE INDEX IF NOT EXISTS daily_reminder_ts_user_idx
+    ON daily_reminder (timestamp, user_id);
+
+-- Months moved to archive/ by the retention job, one row per Parquet file.
+-- A file is renamed into place only after its row commits.
+CREATE TABLE IF NOT EXISTS archived_partitions (
+    path TEXT PRIMARY KEY,
+    table_name TEXT NOT NULL,
+    month TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
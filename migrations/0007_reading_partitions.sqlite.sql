@@ -0,0 +1,13 @@
+-- SQLite has no table partitioning: the stand-in keeps one table per agent
+-- and agents/partitions.py treats each month's timestamp range as its
+-- partition (archival deletes the range through the (timestamp, user_id) index).
+
+-- Months moved to archive/ by the retention job, one row per Parquet file.
+-- A file is renamed into place only after its row commits.
+CREATE TABLE IF NOT EXISTS archived_partitions (
+    path TEXT PRIMARY KEY,
+    table_name TEXT NOT NULL,
+    month TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,15 @@
+-- Change counters for conditional GETs (agents/respond.py). ETags built from
+-- keys and MAX(timestamp) miss updates that keep a row's key: the
+-- caregiver_notified and reminder_sent write-backs, acknowledgements and
+-- re-ingested corrections. Every write bumps the resident's data_version and
+-- its table's version (agents/ingest.py touch()).
+ALTER TABLE users ADD COLUMN data_version BIGINT NOT NULL DEFAULT 0;
+
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name TEXT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO table_versions (table_name)
+VALUES ('health_monitoring'), ('safety_monitoring'), ('daily_reminder')
+ON CONFLICT (table_name) DO NOTHING;
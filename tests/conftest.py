@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# Tests run against a throwaway SQLite database, never the configured one.
+# Set before any agents module is imported: agents/db.py reads it at import.
+os.environ['ELDERLY_CARE_DSN'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='elderly-care-tests-'), 'test.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,49 @@
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from agents import ingest
+from agents.compiled import PIPELINE_TARGETS, compile_model
+from agents.features import build_features, record_features
+from agents.registry import FEATURE_ORDER, MODEL_DIR, MODEL_FILES
+
+
+@pytest.fixture(scope='module', params=list(MODEL_FILES))
+def cleaned(request):
+    agent = request.param
+    df = pd.read_csv(os.path.join(ingest.CLEANED_DIR, ingest.SOURCES[agent]['cleaned']))
+    return agent, df, build_features(agent, df)
+
+
+def assert_matches(model, compiled, features, cleaned_df, agent):
+    # Arrays, probabilities and single records all agree with sklearn on every row
+    X = features.to_numpy(dtype=float)
+    sk_inputs = features if getattr(model, 'feature_names_in_', None) is not None else X
+    expected = model.predict(sk_inputs)
+    np.testing.assert_array_equal(compiled.predict(X), expected)
+    np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(sk_inputs)[:, 1], rtol=0, atol=1e-9)
+    # Single records go through the pure-Python feature builder, as auto_predict does
+    single = [compiled.predict_one(record_features(agent, row)) for row in cleaned_df.to_dict(orient='records')]
+    np.testing.assert_array_equal(np.asarray(single), expected)
+
+
+def test_compiled_matches_stored_model(cleaned):
+    agent, df, features = cleaned
+    model = joblib.load(os.path.join(MODEL_DIR, MODEL_FILES[agent]))
+    compiled = compile_model(model, FEATURE_ORDER[agent])
+    if compiled is None:
+        pytest.skip(f"{type(model).__name__} has no compiled form; sklearn path is used")
+    assert_matches(model, compiled, features, df, agent)
+
+
+def test_compiled_matches_scaled_pipeline(cleaned):
+    agent, df, features = cleaned
+    pipeline = make_pipeline(StandardScaler(), LogisticRegression(max_iter=1000))
+    pipeline.fit(features, df[PIPELINE_TARGETS[agent]])
+    assert_matches(pipeline, compile_model(pipeline), features, df, agent)
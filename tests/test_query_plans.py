@@ -0,0 +1,7 @@
+from agents import db, migrate
+
+
+def test_hot_queries_use_indexes():
+    assert db.backend() == 'sqlite'
+    migrate.upgrade()
+    assert migrate.check_plans(verbose=False) == []